@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import httpx
+from google.auth import jwt as google_jwt
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+MAX_AGE_REGEX = re.compile(r"max-age=(\d+)")
+
+
+def token_digest(token: str) -> str:
+    """Cache key for a bearer token, so raw tokens are never kept as dictionary keys."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Small in-process LRU whose entries also carry their own expiry time.
+
+    Used for decoded app tokens (each entry lives until the token's `exp`) and
+    for user profiles (fixed TTL, dropped explicitly when the user is written).
+    Holds at most `max_entries`, evicting the least recently used first.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        if value is None or expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class GoogleCertCache:
+    """
+    Google's OAuth2 signing certificates, fetched with the shared async HTTP client
+    and kept for as long as their Cache-Control `max-age` allows, so ID tokens are
+    verified locally without a blocking download on every login.
+    """
+
+    def __init__(self, url: str = GOOGLE_CERTS_URL, default_max_age: float = 3600.0, min_refresh_interval: float = 60.0):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self._certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _lifetime(self, response: httpx.Response) -> float:
+        match = MAX_AGE_REGEX.search(response.headers.get("cache-control", ""))
+        max_age = float(match.group(1)) if match else self.default_max_age
+        try:
+            max_age -= float(response.headers.get("age", 0))
+        except ValueError:
+            pass
+        return max(max_age, 0.0)
+
+    async def get(self, client: httpx.AsyncClient, force_refresh: bool = False) -> Dict[str, str]:
+        if not force_refresh and time.time() < self._expires_at:
+            return self._certs
+        async with self._lock:
+            # Another login may have refreshed the certificates while we waited.
+            if not force_refresh and time.time() < self._expires_at:
+                return self._certs
+            response = await client.get(self.url)
+            response.raise_for_status()
+            self._certs = response.json()
+            self._fetched_at = time.time()
+            self._expires_at = self._fetched_at + self._lifetime(response)
+            return self._certs
+
+    async def verify(self, client: httpx.AsyncClient, id_token: str, audience: str, clock_skew_in_seconds: int = 60) -> dict:
+        """Verifies a Google ID token's signature, audience, expiry and issuer; raises ValueError if invalid."""
+        certs = await self.get(client)
+        key_id = google_jwt.decode_header(id_token).get("kid")
+        if key_id and key_id not in certs and time.time() - self._fetched_at > self.min_refresh_interval:
+            # Google rotated its keys before our copy expired (rate-limited so unknown key ids can't force fetches).
+            certs = await self.get(client, force_refresh=True)
+        idinfo = google_jwt.decode(id_token, certs=certs, audience=audience, clock_skew_in_seconds=clock_skew_in_seconds)
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+        return idinfo
@@ -0,0 +1,145 @@
+"""
+Local stand-ins for the Google services the pipeline calls, for load benchmarks.
+
+Each fake takes a `FakeBackend` describing its latency and failure rate. The
+Document AI and Gemini fakes are plain objects handed to `ClientPool` through its
+`factory` hook; the profiler is a small FastAPI app served on localhost.
+"""
+import asyncio
+import io
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from fastapi import FastAPI, HTTPException
+from google.api_core import exceptions as api_exceptions
+from google.cloud import documentai
+from pydantic import BaseModel
+from pypdf import PdfReader
+
+SENTENCE_REGEX = re.compile(r"[^.]+\.")
+CATEGORIES = ["Obligations", "Audit_Records", "Rights", "Enforcement_Penalties", "Disclosure_Reporting", "Governance_Risk"]
+SECTIONS = ["Compliance & Regulatory", "Disclosure & Reporting", "Governance & Risk"]
+FILLER = (
+    "The employer shall maintain audit records of every transaction for seven years. "
+    "Returns are due by 31/07/2025 and the provisions come into force from 12 March 2024. "
+    "Any contravention shall attract a penalty as prescribed under section 14 of the Code. "
+)
+
+
+@dataclass
+class FakeBackend:
+    """Latency (seconds, plus up to `jitter`, plus `per_unit` per page/1k chars) and failure probability."""
+    latency: float = 0.2
+    jitter: float = 0.05
+    per_unit: float = 0.0
+    failure_rate: float = 0.0
+
+    def delay(self, units: float = 0.0) -> float:
+        return self.latency + random.uniform(0, self.jitter) + self.per_unit * units
+
+    def should_fail(self) -> bool:
+        return random.random() < self.failure_rate
+
+
+class FakeDocumentProcessorServiceClient:
+    """Answers `process_document` with synthetic per-page text after a simulated OCR delay."""
+
+    def __init__(self, backend: FakeBackend, chars_per_page: int = 1800):
+        self.backend = backend
+        self.chars_per_page = chars_per_page
+        self.calls = 0
+
+    def process_document(self, request: documentai.ProcessRequest) -> documentai.ProcessResponse:
+        self.calls += 1
+        content = request.raw_document.content
+        pages = len(PdfReader(io.BytesIO(content)).pages) if request.raw_document.mime_type == "application/pdf" else 1
+        time.sleep(self.backend.delay(pages))
+        if self.backend.should_fail():
+            raise api_exceptions.ServiceUnavailable("Fake Document AI: simulated outage")
+
+        text, page_protos = "", []
+        for number in range(1, pages + 1):
+            page_text = f"Page {number}. " + (FILLER * (self.chars_per_page // len(FILLER) + 1))[: self.chars_per_page] + "\n"
+            segment = documentai.Document.TextAnchor.TextSegment(start_index=len(text), end_index=len(text) + len(page_text))
+            page_protos.append(documentai.Document.Page(
+                page_number=number,
+                layout=documentai.Document.Page.Layout(text_anchor=documentai.Document.TextAnchor(text_segments=[segment])),
+            ))
+            text += page_text
+        return documentai.ProcessResponse(document=documentai.Document(text=text, pages=page_protos))
+
+
+class _Chunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Echoes the text of a translation prompt back, optionally as a stream of chunks."""
+
+    def __init__(self, backend: FakeBackend, stream_chunk_chars: int = 400):
+        self.backend = backend
+        self.stream_chunk_chars = stream_chunk_chars
+        self.calls = 0
+
+    @staticmethod
+    def _source_text(prompt: str) -> str:
+        parts = prompt.split("---")
+        return parts[1].strip() if len(parts) >= 3 else prompt
+
+    def generate_content(self, prompt: str, generation_config: Optional[dict] = None, stream: bool = False):
+        self.calls += 1
+        text = self._source_text(prompt)
+        if not stream:
+            time.sleep(self.backend.delay(len(text) / 1000))
+            if self.backend.should_fail():
+                raise api_exceptions.ServiceUnavailable("Fake Gemini: simulated outage")
+            return _Chunk(text)
+        return self._stream(text)
+
+    def _stream(self, text: str) -> Iterator[_Chunk]:
+        pieces = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)] or [""]
+        time.sleep(self.backend.latency + random.uniform(0, self.backend.jitter))
+        if self.backend.should_fail():
+            raise api_exceptions.ServiceUnavailable("Fake Gemini: simulated outage")
+        for piece in pieces:
+            time.sleep(self.backend.per_unit * len(piece) / 1000)
+            yield _Chunk(piece)
+
+
+class _ProfileRequest(BaseModel):
+    text: str
+    max_len: int = 384
+    stride: int = 128
+    batch_size: int = 16
+
+
+def create_profiler_app(backend: FakeBackend) -> FastAPI:
+    """A stand-in for the Cloud Run profiler: one clause per sentence, one date per sentence mentioning one."""
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.post("/profile")
+    async def profile(request: _ProfileRequest):
+        app.state.calls += 1
+        await asyncio.sleep(backend.delay(len(request.text) / 1000))
+        if backend.should_fail():
+            raise HTTPException(status_code=503, detail="Fake profiler: simulated outage")
+        clauses, dates = [], []
+        for i, match in enumerate(SENTENCE_REGEX.finditer(request.text)):
+            sentence = match.group(0).strip()
+            clauses.append({
+                "text": sentence, "start": match.start(), "end": match.end(), "confidence": 0.6 + (i % 4) / 10,
+                "category": CATEGORIES[i % len(CATEGORIES)], "section": SECTIONS[i % len(SECTIONS)],
+            })
+            if "due by" in sentence or "into force" in sentence:
+                dates.append({"text": sentence.split()[-1].rstrip("."), "evidence": sentence, "start": match.start(), "end": match.end()})
+        return {
+            "document_type": None, "jurisdiction": "India", "statutes_or_codes": ["Code on Wages, 2019"],
+            "clauses": clauses, "important_dates": dates,
+        }
+
+    return app
@@ -0,0 +1,304 @@
+"""
+End-to-end load benchmark for /api/upload_and_stream with local fake backends.
+
+Runs the real FastAPI app under uvicorn on localhost. Document AI and Gemini are
+replaced by the fakes in `benchmarks.fakes`, and PROFILER_URL points at a local
+profiler stub. Concurrent uploads of synthetic PDFs are driven through the job
+event stream. The report covers throughput, end-to-end latency, time to first
+SSE event and to first `translation_delta`, per-stage p50/p95/p99 (from the
+stages' own `elapsed_seconds`) and peak RSS of the process.
+
+Run from backend/:
+
+    python -m benchmarks.run_benchmark --uploads 40 --concurrency 8 --pages 5,20,60
+
+Other app settings (JOB_WORKERS, CLIENT_POOL_SIZE, ...) are read from the
+environment as usual; the harness only fills in dummies for required ones.
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import resource
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+from benchmarks.fakes import (
+    FakeBackend, FakeDocumentProcessorServiceClient, FakeGenerativeModel, FILLER, create_profiler_app
+)
+
+# Required settings that have no meaning for a local benchmark.
+BENCHMARK_ENV = {
+    "DATABASE_URL": "unused", "SECRET_KEY": "benchmark-secret-key-of-sufficient-length", "ALGORITHM": "HS256",
+    "GOOGLE_CLIENT_ID": "unused", "GOOGLE_CLIENT_SECRET": "unused", "REDIRECT_URI": "http://localhost",
+    "REDIRECT_RESPONSE": "http://localhost", "FRONTEND_URL": '["http://localhost"]',
+    "GOOGLE_APPLICATION_CREDENTIALS": "unused", "GCP_PROJECT_ID": "benchmark", "GCP_LOCATION_FOR_DOCAI": "us",
+    "GCP_LOCATION_For_docai": "us", "DOCAI_PROCESSOR_ID": "benchmark", "GCP_LOCATION_FOR_VERTEXAI": "us",
+    "GCP_LOCATION_For_vertexai": "us", "GOOGLE_CLOUD_PROJECT": "benchmark",
+    # Firestore is only touched by the auth endpoints (and the startup email backfill, off here);
+    # the emulator host avoids credential lookup.
+    "FIRESTORE_EMULATOR_HOST": "localhost:8681",
+    "EMAIL_INDEX_BACKFILL_ON_STARTUP": "false",
+}
+
+
+# ======================================================
+# 📄 SYNTHETIC DOCUMENTS
+# ======================================================
+def make_pdf(pages: int, text_layer: bool = True) -> bytes:
+    """
+    A PDF of `pages` pages. With `text_layer`, each page carries unique Helvetica text;
+    without it, each page only draws an image, like a scan, so it has to go to OCR.
+    """
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    nonce = uuid.uuid4().hex  # Unique content per upload, so the result cache never short-circuits a run.
+    for number in range(1, pages + 1):
+        page = writer.add_blank_page(612, 792)
+        stream = DecodedStreamObject()
+        if text_layer:
+            lines = [f"Document {nonce} page {number}."] + [FILLER[i:i + 90] for i in range(0, len(FILLER), 90)] * 6
+            body = " ".join(f"({line.replace('(', '').replace(')', '')}) '" for line in lines)
+            stream.set_data(f"BT /F1 10 Tf 14 TL 54 740 Td {body} ET".encode("latin-1"))
+            resources = {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        else:
+            image = DecodedStreamObject()
+            image.set_data(f"{nonce}{number:06d}".encode("ascii")[:64].ljust(64, b"\0"))
+            image.update({
+                NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+                NameObject("/Width"): NumberObject(8), NameObject("/Height"): NumberObject(8),
+                NameObject("/ColorSpace"): NameObject("/DeviceGray"), NameObject("/BitsPerComponent"): NumberObject(8),
+            })
+            stream.set_data(b"q 612 0 0 792 0 0 cm /Im1 Do Q")
+            resources = {NameObject("/XObject"): DictionaryObject({NameObject("/Im1"): writer._add_object(image)})}
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject(resources)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+# ======================================================
+# 🖥️ IN-PROCESS SERVERS
+# ======================================================
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """Runs an ASGI app under uvicorn on its own thread and event loop."""
+
+    def __init__(self, app, port: int):
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start.")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+# ======================================================
+# 📈 LOAD GENERATION
+# ======================================================
+@dataclass
+class UploadResult:
+    pages: int
+    status: str = "ok"
+    latency: float = 0.0
+    first_event: Optional[float] = None
+    first_translation: Optional[float] = None
+    stages: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+async def run_upload(client: httpx.AsyncClient, pdf: bytes, pages: int) -> UploadResult:
+    result = UploadResult(pages=pages)
+    began = time.perf_counter()
+    try:
+        response = await client.post("/api/upload_and_stream", files=[("files", (f"bench-{pages}p.pdf", pdf, "application/pdf"))])
+        if response.status_code == 429:
+            result.status, result.error = "rejected", response.text
+            return result
+        response.raise_for_status()
+        async with client.stream("GET", response.json()["events_url"]) as stream:
+            event = None
+            async for line in stream.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    if result.first_event is None:
+                        result.first_event = time.perf_counter() - began
+                    data = json.loads(line[len("data:"):])
+                    if event == "translation_delta" and result.first_translation is None:
+                        result.first_translation = time.perf_counter() - began
+                    elif event is None and "stage" in data and "elapsed_seconds" in data:
+                        result.stages[data["stage"]] = data["elapsed_seconds"]
+                    elif event == "file_error":
+                        result.status, result.error = "failed", data.get("error")
+                    elif event == "error":
+                        result.status, result.error = "failed", result.error or data.get("error")
+                elif not line:
+                    event = None
+    except Exception as e:
+        result.status, result.error = "failed", f"{type(e).__name__}: {e}"
+    result.latency = time.perf_counter() - began
+    return result
+
+
+async def drive(base_url: str, uploads: int, concurrency: int, sizes: List[int], text_layer: bool) -> Tuple[List[UploadResult], float]:
+    # Documents are generated up front so their cost stays out of the measured window.
+    documents = [(sizes[i % len(sizes)], make_pdf(sizes[i % len(sizes)], text_layer)) for i in range(uploads)]
+    limit = asyncio.Semaphore(concurrency)
+    timeout = httpx.Timeout(600.0, connect=10.0)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=httpx.Limits(max_connections=concurrency * 2 + 4)) as client:
+        async def one(pages: int, pdf: bytes) -> UploadResult:
+            async with limit:
+                return await run_upload(client, pdf, pages)
+
+        began = time.perf_counter()
+        results = await asyncio.gather(*(one(pages, pdf) for pages, pdf in documents))
+        return list(results), time.perf_counter() - began
+
+
+# ======================================================
+# 🧾 REPORT
+# ======================================================
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarise(results: List[UploadResult], wall: float) -> dict:
+    ok = [r for r in results if r.status == "ok"]
+    dist = lambda values: {f"p{p}": round(percentile(values, p), 3) for p in (50, 95, 99)}
+    stages = defaultdict(list)
+    for r in ok:
+        for stage, seconds in r.stages.items():
+            stages[stage].append(seconds)
+    errors = defaultdict(int)
+    for r in results:
+        if r.error:
+            errors[r.error[:120]] += 1
+    return {
+        "uploads": len(results),
+        "completed": len(ok),
+        "failed": sum(1 for r in results if r.status == "failed"),
+        "rejected": sum(1 for r in results if r.status == "rejected"),
+        "wall_seconds": round(wall, 3),
+        "throughput_docs_per_s": round(len(ok) / wall, 3) if wall else 0.0,
+        "throughput_pages_per_s": round(sum(r.pages for r in ok) / wall, 3) if wall else 0.0,
+        "latency_seconds": dist([r.latency for r in ok]),
+        "time_to_first_event_seconds": dist([r.first_event for r in results if r.first_event is not None]),
+        "time_to_first_translation_seconds": dist([r.first_translation for r in ok if r.first_translation is not None]),
+        "stage_seconds": {stage: dist(values) for stage, values in stages.items()},
+        # ru_maxrss is KiB on Linux (bytes on macOS); covers the app, the stub and the load generator.
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024 * 1024), 1),
+        "errors": dict(errors),
+    }
+
+
+def print_report(summary: dict) -> None:
+    print(f"\nuploads={summary['uploads']} completed={summary['completed']} failed={summary['failed']} "
+          f"rejected={summary['rejected']} wall={summary['wall_seconds']}s")
+    print(f"throughput: {summary['throughput_docs_per_s']} docs/s, {summary['throughput_pages_per_s']} pages/s")
+    print(f"peak RSS: {summary['peak_rss_mb']} MB\n")
+    rows = [("end-to-end", summary["latency_seconds"]), ("first SSE event", summary["time_to_first_event_seconds"]),
+            ("first translation delta", summary["time_to_first_translation_seconds"])]
+    rows += [(f"stage: {stage}", dist) for stage, dist in summary["stage_seconds"].items()]
+    print(f"{'':<24}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, dist in rows:
+        print(f"{name:<24}{dist['p50']:>10}{dist['p95']:>10}{dist['p99']:>10}")
+    for error, count in summary["errors"].items():
+        print(f"  {count} x {error}")
+
+
+# ======================================================
+# 🚀 ENTRY POINT
+# ======================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--uploads", type=int, default=20, help="Total uploads to run.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Uploads in flight at once.")
+    parser.add_argument("--pages", default="5,20,60", help="Comma-separated PDF sizes (pages), cycled across uploads.")
+    parser.add_argument("--no-text-layer", action="store_true", help="Generate image-only (scan-like) pages.")
+    for name, latency, per_unit in (("docai", 0.3, 0.02), ("model", 0.4, 0.05), ("profiler", 0.3, 0.01)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency, help=f"Base {name} latency (s).")
+        parser.add_argument(f"--{name}-per-unit", type=float, default=per_unit, help=f"Extra {name} latency per page / 1k chars (s).")
+        parser.add_argument(f"--{name}-jitter", type=float, default=0.1, help=f"Uniform {name} jitter (s).")
+        parser.add_argument(f"--{name}-failure-rate", type=float, default=0.0, help=f"Probability a {name} call fails.")
+    parser.add_argument("--json", help="Also write the summary to this file.")
+    return parser.parse_args(argv)
+
+
+def _backend(args, name: str) -> FakeBackend:
+    return FakeBackend(
+        latency=getattr(args, f"{name}_latency"), jitter=getattr(args, f"{name}_jitter"),
+        per_unit=getattr(args, f"{name}_per_unit"), failure_rate=getattr(args, f"{name}_failure_rate"),
+    )
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    profiler_port, app_port = _free_port(), _free_port()
+    for key, value in BENCHMARK_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["PROFILER_URL"] = f"http://127.0.0.1:{profiler_port}/profile"
+
+    import main as app_module  # Imported late: Settings are read from the environment at import time.
+
+    docai_backend, model_backend = _backend(args, "docai"), _backend(args, "model")
+    app_module.app.state.client_pool_options = {
+        "factory": lambda config, credentials: (
+            FakeDocumentProcessorServiceClient(docai_backend), FakeGenerativeModel(model_backend)
+        ),
+        "authenticator": lambda config: None,
+    }
+    app_module.app.state.id_token_options = {"fetcher": lambda request, audience: "benchmark-token"}
+
+    sizes = [int(p) for p in args.pages.split(",") if p.strip()]
+    with ServerThread(create_profiler_app(_backend(args, "profiler")), profiler_port), ServerThread(app_module.app, app_port):
+        results, wall = asyncio.run(drive(
+            f"http://127.0.0.1:{app_port}", args.uploads, args.concurrency, sizes, not args.no_text_layer
+        ))
+
+    summary = summarise(results, wall)
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import zlib
+from typing import Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Brotli is optional; without it clients are offered gzip only.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/event-stream", "text/")
+# Content codings this process can produce, in order of preference.
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks "br" or "gzip" from an Accept-Encoding header (br first when installed), or None."""
+    offered = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            offered[coding.strip().lower()] = quality
+    for coding in SUPPORTED_ENCODINGS:
+        if offered.get(coding, offered.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Z_SYNC_FLUSH ends every chunk on a byte boundary the client can decode right away.
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.process(data) + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    """
+    Negotiated gzip / brotli compression for JSON and SSE responses.
+
+    Unlike Starlette's GZipMiddleware, streamed bodies are flushed after every
+    chunk, so each SSE event reaches the client (and is decodable) as soon as it is
+    sent, while later events still benefit from the shared compression window.
+    Single-chunk responses under `minimum_size` bytes are sent as they are.
+    """
+
+    def __init__(
+        self, app: ASGIApp, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 5,
+        compressible_types: Tuple[str, ...] = COMPRESSIBLE_TYPES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.compressible_types = compressible_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(self, encoding, send))
+
+
+class _CompressingSend:
+    """The `send` callable for one response: holds back its start until the first body chunk decides."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor = None
+        self.decided = False
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "")
+        return "content-encoding" not in headers and content_type.startswith(self.middleware.compressible_types)
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body, more_body = message.get("body", b""), message.get("more_body", False)
+        if not self.decided:
+            self.decided = True
+            headers = MutableHeaders(scope=self.start)
+            if self._compressible(headers) and (more_body or len(body) >= self.middleware.minimum_size):
+                if self.encoding == "br":
+                    self.compressor = _BrotliCompressor(self.middleware.brotli_quality)
+                else:
+                    self.compressor = _GzipCompressor(self.middleware.gzip_level)
+                del headers["content-length"]
+                headers["content-encoding"] = self.encoding
+                headers.add_vary_header("Accept-Encoding")
+            await self.send(self.start)
+
+        if self.compressor is not None:
+            message = {**message, "body": self.compressor.compress(body, final=not more_body)}
+        await self.send(message)
@@ -14,36 +14,149 @@
 # async def get_user_data(user_id:str):
 #     return await users.find_one({"_id": ObjectId(user_id)})
 # 1. Import the main 'firestore' module
+import hashlib
+import time
+from typing import Optional
+
+from google.api_core.exceptions import AlreadyExists
 from google.cloud import firestore
 
-# When running on Cloud Run, the client automatically finds the
-# correct project and credentials from the environment.
-# No connection string or setup is needed.
+from auth_cache import TTLCache
+from settings.config import settings
 
-# 2. Instantiate the AsyncClient class from the firestore module
-db = firestore.AsyncClient()
-users_ref = db.collection("users")
+
+class EmailAlreadyRegisteredError(Exception): pass
 
 
-async def get_user_data(user_id: str):
+# ID of the `user_emails` document written once every existing user has been indexed.
+# Email keys are 64 hex digits, so it can never collide with one.
+EMAIL_INDEX_COMPLETE = "backfill-complete"
+
+
+def email_key(email: str) -> str:
+    """Document ID of an email's index entry (hashed: emails may contain '/', which IDs cannot)."""
+    return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()
+
+
+class UserStore:
     """
-    Fetches a user document from Firestore by its unique ID.
+    User documents in `users`, plus one `user_emails/{email_key}` index document per
+    email pointing at its user. Registering writes both in one batch whose `create`
+    fails if the email is taken, so signup is a single atomic round trip and login is
+    a direct document get. Takes the Firestore client as an argument so it can run
+    against the emulator or an in-memory fake.
     """
-    # In Firestore, you get a document directly by its ID.
-    # There's no need to convert the ID to an ObjectId.
-    doc_ref = users_ref.document(user_id)
-    doc = await doc_ref.get()
 
-    if not doc.exists:
+    def __init__(self, db, cache: Optional[TTLCache] = None):
+        self.db = db
+        self.users_ref = db.collection("users")
+        self.emails_ref = db.collection("user_emails")
+        # Per-process cache of user documents; entries are dropped whenever this process writes the user.
+        self.cache = cache if cache is not None else TTLCache(max_entries=settings.USER_CACHE_SIZE)
+        self._email_index_complete = False
+
+    async def get(self, user_id: str):
+        """
+        Fetches a user document from Firestore by its unique ID.
+        Served from the cache when possible; missing users are not cached.
+        """
+        cached = self.cache.get(user_id)
+        if cached is not None:
+            return dict(cached)
+
+        # In Firestore, you get a document directly by its ID.
+        # There's no need to convert the ID to an ObjectId.
+        doc = await self.users_ref.document(user_id).get()
+        if not doc.exists:
+            return None
+        return self._remember(doc)
+
+    def _remember(self, doc) -> dict:
+        # Combine the document data with its ID for a consistent data structure.
+        user_data = doc.to_dict()
+        if user_data is None:
+            user_data = {}
+        user_data["id"] = doc.id
+        self.cache.set(doc.id, user_data, time.time() + settings.USER_CACHE_TTL_SECONDS)
+        return dict(user_data)
+
+    async def get_by_email(self, email: str):
+        index = await self.emails_ref.document(email_key(email)).get()
+        if index.exists:
+            return await self.get(index.to_dict()["user_id"])
+        # Users created before the email index existed: find them once and index them.
+        async for doc in self.users_ref.where("email", "==", email).limit(1).stream():
+            await self._index_email(email, doc.id)
+            return self._remember(doc)
+        return None
+
+    async def get_by_google_id(self, google_id: str):
+        async for doc in self.users_ref.where("google_id", "==", google_id).limit(1).stream():
+            return self._remember(doc)
         return None
-    
-    
 
-    # Combine the document data with its ID for a consistent data structure.
-    user_data = doc.to_dict()
+    async def create(self, user_data: dict, email: Optional[str] = None) -> str:
+        """
+        Adds a user document and returns its ID. With `email`, the email index entry is
+        created in the same batch; raises `EmailAlreadyRegisteredError` if it exists.
+        """
+        if email is not None and not await self.email_index_complete():
+            # Until the backfill has run, users created before the index may have no entry.
+            async for doc in self.users_ref.where("email", "==", email).limit(1).stream():
+                await self._index_email(email, doc.id)
+                raise EmailAlreadyRegisteredError(f"Email {email} is already registered.")
+        user_ref = self.users_ref.document()  # ID is generated client-side, no round trip.
+        batch = self.db.batch()
+        batch.create(user_ref, user_data)
+        if email is not None:
+            batch.create(self.emails_ref.document(email_key(email)), {"email": email, "user_id": user_ref.id})
+        try:
+            await batch.commit()
+        except AlreadyExists as e:
+            raise EmailAlreadyRegisteredError(f"Email {email} is already registered.") from e
+        self.cache.invalidate(user_ref.id)
+        return user_ref.id
+
+    async def update(self, user_id: str, fields: dict) -> None:
+        """Updates a user document and drops any cached copy of it."""
+        await self.users_ref.document(user_id).update(fields)
+        self.cache.invalidate(user_id)
+
+    async def _index_email(self, email: str, user_id: str) -> None:
+        try:
+            await self.emails_ref.document(email_key(email)).create({"email": email, "user_id": user_id})
+        except AlreadyExists:
+            pass
+
+    async def email_index_complete(self) -> bool:
+        """Whether the backfill has finished, so the index alone answers duplicate checks."""
+        if not self._email_index_complete:
+            self._email_index_complete = (await self.emails_ref.document(EMAIL_INDEX_COMPLETE).get()).exists
+        return self._email_index_complete
+
+    async def backfill_email_index(self) -> int:
+        """
+        Indexes every existing user's email, then marks the index complete. Idempotent,
+        and a no-op once the marker exists; the app runs it at startup. Returns how many
+        entries were written or already present.
+        """
+        if await self.email_index_complete():
+            return 0
+        count = 0
+        async for doc in self.users_ref.stream():
+            email = (doc.to_dict() or {}).get("email")
+            if email:
+                await self._index_email(email, doc.id)
+                count += 1
+        await self.emails_ref.document(EMAIL_INDEX_COMPLETE).set({"users_indexed": count, "completed_at": time.time()})
+        self._email_index_complete = True
+        return count
 
-    if user_data is None:
-        user_data = {}
 
-    user_data["id"] = doc.id
-    return user_data
+# When running on Cloud Run, the client automatically finds the
+# correct project and credentials from the environment.
+# No connection string or setup is needed.
+
+# 2. Instantiate the AsyncClient class from the firestore module
+db = firestore.AsyncClient()
+user_store = UserStore(db)
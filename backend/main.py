@@ -1,27 +1,20 @@
-from ast import Try
 from mimetypes import init
 
 import asyncio
-import uuid
+import threading
+import time
 import os
 from fastapi.responses import StreamingResponse
-import json
 
-from fastapi import FastAPI,Request, HTTPException, Depends, status, Response,UploadFile, File
+from fastapi import FastAPI,Request, HTTPException, Depends, status, Response,UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
-from typing import List, cast, IO
-
-# --- Google Cloud and Auth Imports ---
-from google.cloud import firestore
-import google.auth
-import google.auth.transport.requests
-import google.oauth2.id_token
-# ---
+from typing import Awaitable, Callable, List, Optional, cast, IO
 
 from models import User,UserOut
 import httpx
 from pydantic import ValidationError
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
 from settings.config import settings
 import jwt
 from contextlib import asynccontextmanager
@@ -29,29 +22,149 @@ from datetime import datetime, timezone, timedelta
 
 from passlib.context import CryptContext
 
+from scripts.extract_and_translate_pipeline import MAX_BACKOFF_SECONDS, PipelineConfig, PipelineError, ProgressCallback
+from scripts.client_pool import ClientPool
+from scripts.stage_executor import StageExecutor
+from scripts.admission import AdmissionController
+from scripts.result_cache import ResultCache, config_fingerprint, stage_config, stage_key
+from scripts.profiler_client import (
+    CircuitBreaker, CircuitOpenError, Hedger, IdTokenCache, create_http_client, is_retryable_profiler_error,
+    merge_window_profiles, plan_profile_windows, window_fragment
+)
+from scripts.progress import STAGE_MESSAGES, ProgressReporter
+from scripts.jobs import JobManager, JobNotFoundError, JobQueueFullError, MemoryJobStore, SQLiteJobStore
+from scripts.uploads import SpooledUpload, UploadTooLargeError, extract_upload, spool_upload
+from scripts import serialization
+from scripts.serialization import FastJSONResponse, dumps_str
+from compression import SUPPORTED_ENCODINGS, CompressionMiddleware
+from auth_cache import GoogleCertCache, TTLCache, token_digest
+
 # --- Firestore Client Initialization ---
 # This replaces the MongoDB client. It authenticates automatically on GCP.
-db = firestore.AsyncClient()
-users_ref = db.collection("users")
+from firestore_db import EmailAlreadyRegisteredError, UserStore, user_store
 # ---
 
+# Decoded app tokens, keyed by token hash; each entry expires with its token.
+token_cache = TTLCache(max_entries=settings.AUTH_TOKEN_CACHE_SIZE)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+async def backfill_email_index(users: UserStore) -> None:
+    try:
+        count = await users.backfill_email_index()
+        print(f"App startup: email index complete ({count} existing user(s) indexed).")
+    except Exception as e:
+        print(f"App startup: email index backfill failed, will retry on next start: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("App startup: Firestore client initialized.")
     # Programmatic index creation is not needed for Firestore in this way.
     # Indexes should be managed via the Google Cloud Console.
+
+    app.state.user_store = user_store
+    encodings = ", ".join(SUPPORTED_ENCODINGS) if settings.COMPRESSION_ENABLED else "none"
+    print(f"App startup: JSON serializer '{serialization.serializer_name()}', response compression: {encodings}.")
+    if settings.JSON_SERIALIZER == "auto" and serialization.serializer_name() != "orjson":
+        logger.warning("orjson is not installed; falling back to the standard json module.")
+    if settings.COMPRESSION_ENABLED and "br" not in SUPPORTED_ENCODINGS:
+        logger.warning("brotli is not installed; responses are compressed with gzip only.")
+    # Until this has run, registration also checks `users` for legacy emails (see UserStore.create).
+    backfill_task = asyncio.create_task(backfill_email_index(user_store)) if settings.EMAIL_INDEX_BACKFILL_ON_STARTUP else None
+
+    app.state.stage_executor = StageExecutor(
+        max_workers=settings.STAGE_EXECUTOR_MAX_WORKERS,
+        stage_limits={"extraction": settings.EXTRACTION_CONCURRENCY, "translation": settings.TRANSLATION_CONCURRENCY},
+    )
+
+    # Process-wide limits on calls to Document AI, Gemini and the profiler.
+    app.state.admission = AdmissionController(
+        thread_limits={"docai": settings.DOCAI_MAX_CONCURRENT_CALLS, "gemini": settings.GEMINI_MAX_CONCURRENT_CALLS},
+        async_limits={"profiler": settings.PROFILER_MAX_CONCURRENT_CALLS},
+        max_waiting=settings.BACKEND_MAX_WAITING_CALLS,
+    )
+
+    # One keep-alive (HTTP/2 when available) client and ID-token cache for all outbound calls.
+    app.state.http_client = create_http_client(
+        timeout=settings.PROFILER_TIMEOUT_SECONDS,
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        http2=settings.HTTP2_ENABLED,
+    )
+    # Benchmarks swap in fake backends through `client_pool_options` / `id_token_options` (see benchmarks/).
+    app.state.id_token_cache = IdTokenCache(
+        refresh_margin=settings.ID_TOKEN_REFRESH_MARGIN_SECONDS, **getattr(app.state, "id_token_options", {})
+    )
+    app.state.google_certs = GoogleCertCache()
+    # Tail-latency hedging and fail-fast for the GPU profiler.
+    app.state.profiler_hedger = Hedger(
+        percentile=settings.PROFILER_HEDGE_PERCENTILE,
+        min_delay=settings.PROFILER_HEDGE_MIN_DELAY_SECONDS,
+        budget=settings.PROFILER_HEDGE_BUDGET,
+    )
+    app.state.profiler_breaker = CircuitBreaker(
+        failure_threshold=settings.PROFILER_BREAKER_FAILURE_THRESHOLD, reset_timeout=settings.PROFILER_BREAKER_RESET_SECONDS
+    )
+
+    app.state.result_cache = ResultCache(
+        max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+        ttl=settings.RESULT_CACHE_TTL_SECONDS,
+        disk_dir=settings.RESULT_CACHE_DIR,
+        disk_max_bytes=settings.RESULT_CACHE_DISK_MAX_BYTES,
+    )
+
+    # Uploads run as background jobs; their events are kept so clients can reconnect and resume.
+    job_store = SQLiteJobStore(settings.JOB_STORE_PATH) if settings.JOB_STORE == "sqlite" else MemoryJobStore()
+    app.state.job_manager = JobManager(
+        job_store, workers=settings.JOB_WORKERS, max_queue=settings.JOB_QUEUE_MAX, retention=settings.JOB_RETENTION_SECONDS
+    )
+    app.state.job_manager.start()
+
+    # Document AI / Vertex AI clients are built once here and borrowed per request.
+    app.state.client_pool = None
+    health_task = None
+    try:
+        pool = ClientPool(
+            PipelineConfig.from_env(),
+            size=settings.CLIENT_POOL_SIZE,
+            max_age=settings.CLIENT_MAX_AGE_SECONDS,
+            acquire_timeout=settings.CLIENT_ACQUIRE_TIMEOUT_SECONDS,
+            **getattr(app.state, "client_pool_options", {}),
+        )
+        await pool.start()
+        app.state.client_pool = pool
+        health_task = asyncio.create_task(pool.run_health_checks(settings.CLIENT_HEALTH_CHECK_INTERVAL_SECONDS))
+    except PipelineError as e:
+        print(f"App startup: pipeline clients unavailable: {e}")
     yield
     # No explicit client.close() is needed for the Firestore async client.
+    await app.state.job_manager.close()
+    if health_task:
+        health_task.cancel()
+    if backfill_task:
+        backfill_task.cancel()
+    if app.state.client_pool:
+        await app.state.client_pool.close()
+    app.state.stage_executor.shutdown()
+    await app.state.id_token_cache.close()
+    await app.state.http_client.aclose()
     print("App shutdown")
 
-app = FastAPI(lifespan=lifespan)
+serialization.use(settings.JSON_SERIALIZER)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 FRONTEND_URL = settings.FRONTEND_URL
 
 
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_BYTES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=FRONTEND_URL,
@@ -75,6 +188,10 @@ def verify_app_token(request: Request) -> str:
     token = request.cookies.get("token")
     if not token:
         raise credentials_exception
+    digest = token_digest(token)
+    user_id = token_cache.get(digest)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
@@ -82,6 +199,8 @@ def verify_app_token(request: Request) -> str:
             raise credentials_exception
     except (jwt.PyJWTError, ValidationError) as e:
         raise credentials_exception from e
+    # Tokens without an `exp` claim are re-verified every hour.
+    token_cache.set(digest, user_id, payload.get("exp", datetime.now(timezone.utc).timestamp() + 3600))
     return user_id
 
 def hash_password(password: str) -> str:
@@ -91,16 +210,79 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 # --- Service-to-Service Authentication ---
-PROFILER_URL = "https://doc-profiler-gpu-service-918379302610.asia-southeast1.run.app/profile"
+PROFILER_URL = settings.PROFILER_URL
+PROFILER_OPTIONS = {"max_len": 384, "stride": 128, "batch_size": 16}
+PROFILER_WINDOWING = {"window_chars": settings.PROFILER_WINDOW_CHARS, "overlap_chars": settings.PROFILER_WINDOW_OVERLAP_CHARS}
+
+async def _post_profile(text_to_profile: str, headers: dict) -> dict:
+    payload = {"text": text_to_profile, **PROFILER_OPTIONS}
+    client: httpx.AsyncClient = app.state.http_client
+    admission: AdmissionController = app.state.admission
+    breaker: CircuitBreaker = app.state.profiler_breaker
+    hedger: Hedger = app.state.profiler_hedger
+
+    async def request() -> dict:
+        breaker.before_call()
+        began = None
+        try:
+            async with admission.async_slot("profiler"):
+                logger.info(f"Sending text to profiler at {PROFILER_URL}...")
+                began = time.perf_counter()
+                response = await client.post(PROFILER_URL, json=payload, headers=headers)
+                response.raise_for_status()
+                profile = response.json()
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            if began is not None:
+                # A losing hedge took at least this long; leaving it out would skew the percentile low.
+                hedger.observe(time.perf_counter() - began)
+            raise
+        except Exception as e:
+            # Only outages count against the circuit; a 4xx still means the service is up.
+            if is_retryable_profiler_error(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        hedger.observe(time.perf_counter() - began)
+        return profile
+
+    async def attempt() -> dict:
+        return await hedger.call(request) if settings.PROFILER_HEDGING_ENABLED else await request()
+
+    # Timeouts, dropped connections, 429 and 5xx from a scaling Cloud Run service are retried.
+    retrying = AsyncRetrying(
+        stop=stop_after_attempt(settings.PROFILER_MAX_RETRIES + 1),
+        wait=wait_random_exponential(multiplier=settings.PROFILER_RETRY_BACKOFF_SECONDS, max=MAX_BACKOFF_SECONDS),
+        retry=retry_if_exception(is_retryable_profiler_error),
+        before_sleep=lambda state: logger.warning(
+            f"Profiler request failed: {state.outcome.exception()!r}. Retrying in {state.next_action.sleep:.1f}s..."
+        ),
+        reraise=True,
+    )
+    try:
+        profile = await retrying(attempt)
+        logger.info("Successfully received profile from model.")
+        return profile
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)) from e
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code == 403:
+            logger.error("Request to profiler failed with 403 Forbidden. This is an authentication/permission issue.")
+        raise HTTPException(status_code=exc.response.status_code, detail=f"Error calling profiling service: {exc.response.text}") from exc
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while calling the profiler: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {str(e)}")
 
-async def profile_text_remotely(text_to_profile: str) -> dict:
-    headers = {}
+async def profile_text_remotely(
+    text_to_profile: str,
+    progress: Optional[ProgressCallback] = None,
+    on_fragment: Optional[Callable[[dict], Awaitable[None]]] = None,
+) -> dict:
     try:
-        credentials, project = google.auth.default()
-        auth_req = google.auth.transport.requests.Request()
-        token = google.oauth2.id_token.fetch_id_token(auth_req, PROFILER_URL)
+        token = await app.state.id_token_cache.get(PROFILER_URL)
         headers = {"Authorization": f"Bearer {token}"}
-        logger.info("Successfully generated authentication token for Cloud Run.")
     except Exception as e:
         logger.error(f"Failed to generate authentication token: {e}")
         raise HTTPException(
@@ -108,45 +290,50 @@ async def profile_text_remotely(text_to_profile: str) -> dict:
             detail=f"Could not generate credentials to call the profiling service: {e}"
         )
 
-    payload = {"text": text_to_profile, "max_len": 384, "stride": 128, "batch_size": 16}
-    timeout_config = httpx.Timeout(300.0)
-
-    try:
-        async with httpx.AsyncClient(timeout=timeout_config) as client:
-            logger.info(f"Sending text to profiler at {PROFILER_URL}...")
-            response = await client.post(PROFILER_URL, json=payload, headers=headers)
-            response.raise_for_status()
-            logger.info("Successfully received profile from model.")
-            return response.json()
-    except httpx.HTTPStatusError as exc:
-        if exc.response.status_code == 403:
-            logger.error("Request to profiler failed with 403 Forbidden. This is an authentication/permission issue.")
-        raise HTTPException(status_code=exc.response.status_code, detail=f"Error calling profiling service: {exc.response.text}") from exc
-    except Exception as e:
-        logger.error(f"An unexpected error occurred while calling the profiler: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {str(e)}")
+    # Long documents are profiled as overlapping windows in parallel, then merged back.
+    windows = plan_profile_windows(text_to_profile, settings.PROFILER_WINDOW_CHARS, settings.PROFILER_WINDOW_OVERLAP_CHARS)
+    if len(windows) > 1:
+        logger.info(f"Profiling {len(windows)} overlapping window(s) concurrently...")
+    limit = asyncio.Semaphore(settings.PROFILER_MAX_CONCURRENT_WINDOWS)
+
+    finished = 0
+
+    async def profile_window(k: int, window_text: str) -> dict:
+        nonlocal finished
+        async with limit:
+            profile = await _post_profile(window_text, headers)
+        finished += 1
+        if progress:
+            progress(finished, len(windows))
+        # Windows that finish early are handed on as fragments so partial results can be shown.
+        if on_fragment and len(windows) > 1:
+            await on_fragment(window_fragment(windows, k, profile))
+        return profile
+
+    profiles = await asyncio.gather(*(profile_window(k, window_text) for k, (_, window_text) in enumerate(windows)))
+    return merge_window_profiles(windows, list(profiles))
 
 # --- User Management Endpoints (Migrated to Firestore) ---
 
+def get_user_store(request: Request) -> UserStore:
+    return request.app.state.user_store
+
 @app.post("/auth/register")
-async def register(user: User):
-    query = users_ref.where("email", "==", user.email).limit(1)
-    docs = [doc async for doc in query.stream()]
-    if docs:
-        raise HTTPException(status_code=400, detail="Email already registered")
+async def register(user: User, users: UserStore = Depends(get_user_store)):
     if user.password is None:
         raise ValueError("Password is missing")
     user.password = hash_password(user.password)
-    timestamp, doc_ref = await users_ref.add(user.model_dump())
-    return {"id": doc_ref.id}
+    # The email index entry is created with the user, so a taken email fails the whole write.
+    try:
+        user_id = await users.create(user.model_dump(), email=user.email)
+    except EmailAlreadyRegisteredError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return {"id": user_id}
 
 @app.post("/auth/login")
-async def login(email: str, password: str, response: Response):
-    user_doc, user_id = None, None
-    query = users_ref.where("email", "==", email).limit(1)
-    async for doc in query.stream():
-        user_doc = doc.to_dict()
-        user_id = doc.id
+async def login(email: str, password: str, response: Response, users: UserStore = Depends(get_user_store)):
+    user_doc = await users.get_by_email(email)
+    user_id = user_doc["id"] if user_doc else None
     
     if not user_doc or not verify_password(password, user_doc.get("password", "")):
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -168,35 +355,42 @@ async def google_login():
     return RedirectResponse(google_auth_url)
 
 @app.get("/auth/google/callback")
-async def google_callback(request: Request, response: Response):
+async def google_callback(request: Request, response: Response, users: UserStore = Depends(get_user_store)):
     code = request.query_params.get("code")
     if not code:
         raise HTTPException(status_code=400, detail="No code in callback")
 
     token_url = "https://oauth2.googleapis.com/token"
+    client: httpx.AsyncClient = request.app.state.http_client
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(token_url, data={
-                "code": code, "client_id": settings.GOOGLE_CLIENT_ID,
-                "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                "redirect_uri": settings.REDIRECT_URI, "grant_type": "authorization_code",
-            })
-            resp.raise_for_status()
-            token_data = resp.json()
+        resp = await client.post(token_url, data={
+            "code": code, "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "redirect_uri": settings.REDIRECT_URI, "grant_type": "authorization_code",
+        })
+        resp.raise_for_status()
+        token_data = resp.json()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Google token exchange failed: {e}")
 
     id_token_str = token_data.get("id_token")
     try:
-        idinfo = google.oauth2.id_token.verify_oauth2_token(id_token_str, google.auth.transport.requests.Request(), settings.GOOGLE_CLIENT_ID,clock_skew_in_seconds=60)
+        # Verified locally against signing certs cached per their Cache-Control lifetime.
+        idinfo = await request.app.state.google_certs.verify(client, id_token_str, settings.GOOGLE_CLIENT_ID, clock_skew_in_seconds=60)
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid Google token : {e}")
 
     google_id = idinfo["sub"]
-    user_id = None
-    query = users_ref.where("google_id", "==", google_id).limit(1)
-    async for doc in query.stream():
-        user_id = doc.id
+    existing = await users.get_by_google_id(google_id)
+    user_id = existing["id"] if existing else None
+    if existing:
+        # Keep the name and picture shown by /auth/me in step with the Google account.
+        changed = {
+            field: value for field, value in (("username", idinfo.get("name")), ("profile_pic", idinfo.get("picture")))
+            if value and existing.get(field) != value
+        }
+        if changed:
+            await users.update(user_id, changed)
 
     if not user_id:
         new_user = User(
@@ -204,90 +398,345 @@ async def google_callback(request: Request, response: Response):
             google_id=google_id, profile_pic=idinfo.get("picture"),
             created_at=datetime.now(timezone.utc)
         )
-        timestamp, doc_ref = await users_ref.add(new_user.model_dump())
-        user_id = doc_ref.id
+        try:
+            user_id = await users.create(new_user.model_dump(), email=new_user.email)
+        except EmailAlreadyRegisteredError:
+            # The email already belongs to a password account; keep the Google account separate, as before.
+            user_id = await users.create(new_user.model_dump())
 
     app_token = create_app_token(user_id)
     response = RedirectResponse(url=settings.REDIRECT_RESPONSE)
     response.set_cookie(key="token", value=app_token, httponly=True, samesite="lax", secure=True)
     return response
 
-async def get_user_data_firestore(user_id: str):
-    doc_ref = users_ref.document(user_id)
-    doc = await doc_ref.get()
-    if not doc.exists:
-        return None
-    user_data = doc.to_dict()
-    if user_data is None:
-        user_data = {}
-    user_data["id"] = doc.id
-    return user_data
-
 @app.get("/auth/me", response_model=UserOut)
-async def get_me(user_id: str = Depends(verify_app_token)):
-    user_data = await get_user_data_firestore(user_id)
+async def get_me(user_id: str = Depends(verify_app_token), users: UserStore = Depends(get_user_store)):
+    user_data = await users.get(user_id)
     if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
     return user_data
 
 
-from scripts.extract_and_translate_pipeline import PipelineConfig,initialize_clients,extraction_agent,translate_text, logger
-from scripts.refinement import refine
+from scripts.extract_and_translate_pipeline import language_mix, translate_text, logger
+from scripts.refinement import IncrementalRefiner, refine
+
+def get_client_pool(request: Request) -> ClientPool:
+    pool = getattr(request.app.state, "client_pool", None)
+    if pool is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Pipeline clients are not available.")
+    return pool
+
+def get_stage_executor(request: Request) -> StageExecutor:
+    return request.app.state.stage_executor
+
+def get_result_cache(request: Request) -> ResultCache:
+    return request.app.state.result_cache
+
+def get_job_manager(request: Request) -> JobManager:
+    return request.app.state.job_manager
+
+def get_admission(request: Request) -> AdmissionController:
+    return request.app.state.admission
+
+@app.get("/api/health")
+async def health(request: Request):
+    pool = getattr(request.app.state, "client_pool", None)
+    if pool is None:
+        return {"status": "degraded", "client_pool": None}
+    return {
+        "status": "ok",
+        "client_pool": await pool.check_health(),
+        "result_cache": request.app.state.result_cache.stats(),
+        "job_queue_depth": request.app.state.job_manager.queue_depth(),
+        "admission": request.app.state.admission.stats(),
+        "profiler": {
+            "circuit": request.app.state.profiler_breaker.stats(),
+            "hedging": request.app.state.profiler_hedger.stats(),
+        },
+    }
+
+def format_sse(data: dict, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {dumps_str(data)}")
+    return "\n".join(lines) + "\n\n"
+
+async def process_document(
+    upload: SpooledUpload, client_pool: ClientPool, executor: StageExecutor, result_cache: ResultCache,
+    admission: AdmissionController
+):
+    """Runs the full pipeline for one spooled upload, yielding (event, data) pairs for the job log."""
+    filename = upload.filename
+    # Set when the job is cancelled so worker threads stop at their next checkpoint.
+    cancel_event = threading.Event()
+
+    # Results are cached per stage under a hash of the upload plus the settings that shape that
+    # stage's output; each stage's fingerprint folds in the previous one's, as its input depends on it.
+    digest = upload.sha256
+    extraction = config_fingerprint(os.path.splitext(filename)[1].lower(), stage_config(client_pool.config, "extraction"))
+    translation = config_fingerprint(extraction, stage_config(client_pool.config, "translation"))
+    profiling = config_fingerprint(translation, PROFILER_URL, PROFILER_OPTIONS, PROFILER_WINDOWING)
+    fingerprints = {
+        "extracted_text": extraction, "translated_text": translation, "raw_profile": profiling, "refined_profile": profiling,
+    }
+
+    async def cached(stage: str, compute, replay=None):
+        """Returns the stage's cached result, or computes and caches it. On a hit, `replay(value)`
+        re-sends the events the stage would have streamed, so clients see the same stream."""
+        key = stage_key(digest, stage, fingerprints[stage])
+        value = await asyncio.to_thread(result_cache.get, key)
+        if value is None:
+            value = await compute()
+            await asyncio.to_thread(result_cache.set, key, value)
+        else:
+            logger.info(f"Cache hit for stage '{stage}' of {filename}.")
+            if replay is not None:
+                await replay(value)
+        return value
+
+    progress = ProgressReporter()
+    stage_results = {}
+
+    # Files queue for a client set without a deadline: once a job has been admitted, a
+    # busy pool only delays its files instead of failing them partway through a bundle.
+    async def extract():
+        async with client_pool.acquire(timeout=None) as clients:
+            return await executor.run(
+                "extraction", extract_upload, upload, clients.docai_client, client_pool.config,
+                cancel_event=cancel_event, progress=progress.callback("extraction"), page_cache=result_cache,
+                admission=admission,
+            )
+
+    def on_delta(piece: int, delta: str) -> None:
+        progress.publish("translation_delta", {"piece": piece, "delta": delta})
+
+    async def translate():
+        async with client_pool.acquire(timeout=None) as clients:
+            return await executor.run(
+                "translation", translate_text, stage_results["extracted_text"], clients.translation_model, client_pool.config,
+                cancel_event=cancel_event, progress=progress.callback("translation"),
+                on_delta=on_delta if settings.STREAM_TRANSLATION else None, admission=admission,
+            )
+
+    async def replay_translation(text: str) -> None:
+        progress.cached("translation")
+        if settings.STREAM_TRANSLATION:
+            on_delta(0, text)
+
+    async def run_stage(stage: str, key: str, compute, replay=None):
+        """Runs one (possibly cached) stage, passing on its progress events as they happen."""
+        progress.start(stage)
+        if replay is None and stage in STAGE_MESSAGES:
+            async def replay(_):
+                progress.cached(stage)
+        task = asyncio.create_task(cached(key, compute, replay))
+        async for item in progress.follow(task):
+            yield item
+        stage_results[key] = task.result()
+
+    def done(message: str, stage: str):
+        return None, {"status": message, "stage": stage, "elapsed_seconds": progress.elapsed(stage)}
+
+    try:
+        yield None, {"status": "Initializing clients..."}
+
+        yield None, {"status": "Extracting text from document..."}
+        async for item in run_stage("extraction", "extracted_text", extract):
+            yield item
+        yield done("Extraction complete.", "extraction")
+
+        yield "language_mix", await asyncio.to_thread(language_mix, stage_results["extracted_text"])
+        yield None, {"status": "Translating text..."}
+        async for item in run_stage("translation", "translated_text", translate, replay_translation):
+            yield item
+        yield done("Translation complete.", "translation")
+
+        yield None, {"status": "Sending text to profiling model..."}
+        refiner = IncrementalRefiner()
+        # Serialises fragments so snapshots are published in the order they grow.
+        refiner_lock = asyncio.Lock()
+
+        async def on_fragment(fragment: dict):
+            def add_and_snapshot():
+                refiner.add(fragment)
+                return refiner.snapshot()
+            async with refiner_lock:
+                snapshot = await asyncio.to_thread(add_and_snapshot)
+                progress.publish("partial_result", {"profile": snapshot, "fragments": refiner.fragments})
+
+        profile = lambda: profile_text_remotely(
+            stage_results["translated_text"], progress=progress.callback("profiling"), on_fragment=on_fragment
+        )
+
+        async def replay_profile(raw_profile: dict) -> None:
+            progress.cached("profiling")
+            await on_fragment(raw_profile)
+
+        async for item in run_stage("profiling", "raw_profile", profile, replay_profile):
+            yield item
+        yield done("Profiling complete.", "profiling")
+
+        yield None, {"status": "Refining and structuring results..."}
+        async for item in run_stage("refinement", "refined_profile", lambda: asyncio.to_thread(refine, stage_results["raw_profile"])):
+            yield item
+        yield done("Process complete!", "refinement")
 
-@app.post("/api/upload_and_stream")
+        yield "final_result", stage_results["refined_profile"]
+
+    except Exception as e:
+        error_message = f"An error occurred: {str(e)}"
+        logger.error(f"Error processing file {filename}: {error_message}")
+        yield "error", {"error": error_message}
+    finally:
+        cancel_event.set()
+
+async def process_bundle(
+    uploads: List[SpooledUpload], client_pool: ClientPool, executor: StageExecutor, result_cache: ResultCache,
+    admission: AdmissionController
+):
+    """
+    Processes every file of one request concurrently (up to FILES_PER_REQUEST_CONCURRENCY,
+    and never more than the client pool has sets) and multiplexes their events onto one stream. Each event carries `file_id` and
+    `filename`; per-file outcomes arrive as `file_result` / `file_error`, and a last
+    `final_result` aggregates them.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    limit = asyncio.Semaphore(max(1, min(settings.FILES_PER_REQUEST_CONCURRENCY, client_pool.size)))
+    outcomes = {}
+    finished = object()
+
+    async def run_one(file_id: str, upload: SpooledUpload):
+        tag = {"file_id": file_id, "filename": upload.filename}
+        outcomes[file_id] = {**tag, "status": "pending"}
+        async with limit:
+            async for event, data in process_document(upload, client_pool, executor, result_cache, admission):
+                if event == "final_result":
+                    outcomes[file_id] = {**tag, "status": "completed", "result": data}
+                    queue.put_nowait(("file_result", {**tag, "result": data}))
+                elif event == "error":
+                    outcomes[file_id] = {**tag, "status": "failed", "error": data.get("error")}
+                    queue.put_nowait(("file_error", {**tag, **data}))
+                else:
+                    queue.put_nowait((event, {**data, **tag}))
+
+    async def run_all():
+        try:
+            await asyncio.gather(*(run_one(f"file-{i}", upload) for i, upload in enumerate(uploads)))
+        finally:
+            queue.put_nowait(finished)
+
+    runner = asyncio.create_task(run_all())
+    try:
+        while (item := await queue.get()) is not finished:
+            yield item
+        await runner
+    finally:
+        if not runner.done():
+            runner.cancel()
+
+    files = [outcomes[f"file-{i}"] for i in range(len(uploads))]
+    completed = sum(1 for f in files if f["status"] == "completed")
+    summary = {"files": files, "completed": completed, "failed": len(files) - completed}
+    if completed:
+        yield "final_result", summary
+    else:
+        yield "error", {"error": "None of the uploaded files could be processed.", **summary}
+
+@app.post("/api/upload_and_stream", status_code=status.HTTP_202_ACCEPTED)
 async def upload_and_stream_processing(
     files: List[UploadFile] = File(...),
+    client_pool: ClientPool = Depends(get_client_pool),
+    executor: StageExecutor = Depends(get_stage_executor),
+    result_cache: ResultCache = Depends(get_result_cache),
+    jobs: JobManager = Depends(get_job_manager),
+    admission: AdmissionController = Depends(get_admission),
     # user_id: str = Depends(verify_app_token) # User authentication is now active
 ):
+    """Queues all uploaded files as one background job; progress is read from the job's event stream."""
     if not files:
         raise HTTPException(status_code=400, detail="No files provided.")
-    
-    file = files[0]
-    
-    file_content = await file.read()
-    original_filename = file.filename
+    if len(files) > settings.MAX_FILES_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MAX_FILES_PER_REQUEST} files can be uploaded at once.")
+    if any(not file.filename for file in files):
+        raise HTTPException(status_code=400, detail="A file was uploaded without a filename.")
+    # Turn work away up front while a backend's wait queue is full, rather than fail it halfway.
+    if (retry_after := admission.retry_after()) is not None:
+        admission.note_rejected_upload()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="The processing services are busy. Please retry shortly.",
+            headers={"Retry-After": str(retry_after)},
+        )
 
-    async def event_generator(content_bytes: bytes, filename: str):
-        try:
-            yield f"data: {json.dumps({'status': 'Initializing clients...'})}\n\n"
-            await asyncio.sleep(1)
-            config = PipelineConfig.from_env()
-            docai_client, translation_model = initialize_clients(config)
-
-            yield f"data: {json.dumps({'status': 'Extracting text from document...'})}\n\n"
-            extracted_text = extraction_agent(content_bytes, filename, docai_client, config)
-            
-            yield f"data: {json.dumps({'status': 'Extraction complete.'})}\n\n"
-            await asyncio.sleep(1)
-
-            yield f"data: {json.dumps({'status': 'Translating text...'})}\n\n"
-            translated_text = translate_text(extracted_text, translation_model)
-            yield f"data: {json.dumps({'status': 'Translation complete.'})}\n\n"
-            await asyncio.sleep(1)
-
-            yield f"data: {json.dumps({'status': 'Sending text to profiling model...'})}\n\n"
-            raw_profile = await profile_text_remotely(translated_text)
-            yield f"data: {json.dumps({'status': 'Profiling complete.'})}\n\n"
-            await asyncio.sleep(1)
-
-            yield f"data: {json.dumps({'status': 'Refining and structuring results...'})}\n\n"
-            refined_profile = refine(raw_profile)
-            yield f"data: {json.dumps({'status': 'Process complete!'})}\n\n"
-            await asyncio.sleep(1)
-
-            yield f"event: final_result\ndata: {json.dumps(refined_profile)}\n\n"
+    uploads: List[SpooledUpload] = []
 
-        except Exception as e:
-            error_message = f"An error occurred: {str(e)}"
-            logger.error(f"Error processing file {filename}: {error_message}")
-            yield f"event: error\ndata: {json.dumps({'error': error_message})}\n\n"
+    def cleanup():
+        for upload in uploads:
+            upload.cleanup()
 
-    if not original_filename:
-        async def error_generator():
-            yield f"event: error\ndata: {json.dumps({'error': 'A file was uploaded without a filename.'})}\n\n"
-        return StreamingResponse(error_generator(), media_type="text/event-stream")
+    try:
+        for file in files:
+            uploads.append(await spool_upload(file, settings.MAX_UPLOAD_BYTES, settings.UPLOAD_SPOOL_DIR))
+    except UploadTooLargeError as e:
+        cleanup()
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except BaseException:
+        cleanup()
+        raise
+
+    try:
+        # The job owns the spool files and removes them once it finishes or is cancelled.
+        job = jobs.submit(
+            lambda: process_bundle(uploads, client_pool, executor, result_cache, admission),
+            meta={"files": [{"file_id": f"file-{i}", "filename": u.filename} for i, u in enumerate(uploads)]},
+            on_done=cleanup,
+        )
+    except JobQueueFullError as e:
+        cleanup()
+        admission.note_rejected_upload()
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e), headers={"Retry-After": "30"})
+
+    return {"job_id": job.job_id, "events_url": f"/api/jobs/{job.job_id}/events", **job.meta}
 
-    return StreamingResponse(event_generator(file_content, original_filename), media_type="text/event-stream")
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    try:
+        return jobs.get(job_id).to_dict()
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    try:
+        return jobs.cancel(job_id).to_dict()
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    jobs: JobManager = Depends(get_job_manager),
+):
+    """Replays the job's events after Last-Event-ID, then follows new ones until the job ends."""
+    try:
+        jobs.get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def event_stream():
+        async for item in jobs.subscribe(job_id, after):
+            if item is None:
+                yield ": keepalive\n\n"
+                continue
+            event_id, event, data = item
+            yield format_sse(data, event, event_id)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 # ```eof
 # ```markdown:Updated Dependencies:requirements.txt
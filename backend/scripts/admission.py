@@ -0,0 +1,165 @@
+import asyncio
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from scripts.extract_and_translate_pipeline import logger, raise_if_cancelled
+
+# ======================================================
+# 🚦 ADMISSION CONTROL FOR EXTERNAL BACKENDS
+# ======================================================
+# Smoothing factor for the moving average of how long a call holds its slot.
+HOLD_TIME_SMOOTHING = 0.2
+# Bounds for the Retry-After we hand back to rejected clients.
+MIN_RETRY_AFTER_SECONDS, MAX_RETRY_AFTER_SECONDS = 1, 120
+
+
+class _Limiter:
+    """
+    Concurrency limit plus a wait queue for one backend.
+
+    Calls beyond `limit` wait for a slot. Work that is already running always gets
+    to wait; once `max_waiting` calls are queued the backend counts as saturated,
+    and new uploads are turned away until the queue drains.
+    """
+
+    def __init__(self, name: str, limit: int, max_waiting: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_waiting = max(0, max_waiting)
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.avg_hold_seconds = 1.0
+
+    def _queued(self) -> None:
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def _acquired(self) -> float:
+        self.waiting -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        return time.perf_counter()
+
+    def _released(self, began: float) -> None:
+        self.in_flight -= 1
+        self.avg_hold_seconds += HOLD_TIME_SMOOTHING * (time.perf_counter() - began - self.avg_hold_seconds)
+
+    def saturated(self) -> bool:
+        return self.in_flight >= self.limit and self.waiting >= self.max_waiting
+
+    def retry_after(self) -> int:
+        """Rough time until the queue has drained: queued calls finish `limit` at a time."""
+        estimate = self.avg_hold_seconds * (self.waiting / self.limit + 1)
+        return int(min(MAX_RETRY_AFTER_SECONDS, max(MIN_RETRY_AFTER_SECONDS, math.ceil(estimate))))
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit, "in_flight": self.in_flight, "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting, "peak_queue_depth": self.peak_waiting,
+            "admitted": self.admitted, "rejected_uploads": self.rejected,
+            "avg_hold_seconds": round(self.avg_hold_seconds, 3),
+        }
+
+
+class BackendLimiter(_Limiter):
+    """Limiter for blocking calls made from worker threads (Document AI, Gemini)."""
+
+    def __init__(self, name: str, limit: int, max_waiting: int):
+        super().__init__(name, limit, max_waiting)
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self, cancel_event: Optional[threading.Event] = None):
+        with self._condition:
+            self._queued()
+            try:
+                while self.in_flight >= self.limit:
+                    # Wake up now and then so a cancelled job stops waiting.
+                    self._condition.wait(timeout=0.5)
+                    raise_if_cancelled(cancel_event)
+            except BaseException:
+                self.waiting -= 1
+                raise
+            began = self._acquired()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._released(began)
+                self._condition.notify()
+
+
+class AsyncBackendLimiter(_Limiter):
+    """Limiter for calls made from the event loop (the profiler)."""
+
+    def __init__(self, name: str, limit: int, max_waiting: int):
+        super().__init__(name, limit, max_waiting)
+        self._semaphore = asyncio.Semaphore(self.limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        self._queued()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.waiting -= 1
+            raise
+        began = self._acquired()
+        try:
+            yield
+        finally:
+            self._released(began)
+            self._semaphore.release()
+
+
+class AdmissionController:
+    """
+    Process-wide limits on calls to each external backend.
+
+    Pipeline stages take a slot per call (`slot` from worker threads, `async_slot`
+    on the event loop), and the upload endpoint asks `retry_after()` before
+    accepting work, so a spike is turned away with 429 at the door instead of
+    becoming quota errors halfway through a document.
+    """
+
+    def __init__(self, thread_limits: Dict[str, int], async_limits: Dict[str, int], max_waiting: int = 64):
+        self._limiters: Dict[str, _Limiter] = {}
+        for name, limit in thread_limits.items():
+            self._limiters[name] = BackendLimiter(name, limit, max_waiting)
+        for name, limit in async_limits.items():
+            self._limiters[name] = AsyncBackendLimiter(name, limit, max_waiting)
+        self.rejected_uploads = 0
+
+    def slot(self, backend: str, cancel_event: Optional[threading.Event] = None):
+        return self._limiters[backend].slot(cancel_event)
+
+    def async_slot(self, backend: str):
+        return self._limiters[backend].slot()
+
+    def retry_after(self) -> Optional[int]:
+        """
+        Seconds a new upload should wait if any backend's queue is full, else None.
+        A non-None answer counts as a rejection against the saturated backends.
+        """
+        busy = [limiter for limiter in self._limiters.values() if limiter.saturated()]
+        if not busy:
+            return None
+        for limiter in busy:
+            limiter.rejected += 1
+        logger.warning(f"Backend(s) saturated: {', '.join(limiter.name for limiter in busy)}; rejecting upload.")
+        return max(limiter.retry_after() for limiter in busy)
+
+    def note_rejected_upload(self) -> None:
+        self.rejected_uploads += 1
+
+    def stats(self) -> dict:
+        return {
+            "rejected_uploads": self.rejected_uploads,
+            "backends": {name: limiter.stats() for name, limiter in self._limiters.items()},
+        }
@@ -0,0 +1,191 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Tuple
+
+from google.api_core import exceptions as api_exceptions
+from google.cloud import documentai_v1 as documentai
+from vertexai.generative_models import GenerativeModel
+
+from scripts.extract_and_translate_pipeline import (
+    PipelineConfig, PipelineError, authenticate, create_clients, logger
+)
+
+# ======================================================
+# ♻️ SHARED CLIENT POOL
+# ======================================================
+class ClientPoolError(PipelineError): pass
+
+
+# Marker for `acquire()` to use the pool's own acquire timeout.
+POOL_TIMEOUT = object()
+
+# Errors that say something about a client set (the API or the connection to it).
+CLIENT_ERRORS = (api_exceptions.GoogleAPICallError, api_exceptions.RetryError, ConnectionError, TimeoutError)
+# API errors caused by the request's content (e.g. a malformed PDF), not by the client.
+INPUT_ERRORS = (api_exceptions.InvalidArgument,)
+
+
+def is_client_failure(error: BaseException) -> bool:
+    """
+    Whether `error`, or any error it was raised from, is an API or transport failure.
+    Input errors such as an unreadable upload don't count against the clients.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, CLIENT_ERRORS) and not isinstance(error, INPUT_ERRORS):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+@dataclass
+class PipelineClients:
+    """One borrowable set of clients used by the extraction and translation stages."""
+    docai_client: documentai.DocumentProcessorServiceClient
+    translation_model: GenerativeModel
+    created_at: float = field(default_factory=time.monotonic)
+    failures: int = 0
+
+
+ClientFactory = Callable[[PipelineConfig, object], Tuple[documentai.DocumentProcessorServiceClient, GenerativeModel]]
+
+
+class ClientPool:
+    """
+    A fixed-size pool of Document AI / Vertex AI clients built once at startup.
+
+    Credentials are discovered and `vertexai.init()` is called a single time; each
+    request then borrows a `PipelineClients` bundle with `acquire()` and returns it
+    when done. Bundles that are too old or keep failing with API or transport errors
+    are rebuilt on the next borrow or by the periodic health check.
+    """
+
+    def __init__(
+        self,
+        config: PipelineConfig,
+        size: int = 4,
+        max_age: float = 3600.0,
+        max_failures: int = 3,
+        acquire_timeout: Optional[float] = 30.0,
+        factory: ClientFactory = create_clients,
+        authenticator: Callable[[PipelineConfig], object] = authenticate,
+    ):
+        if size < 1:
+            raise ClientPoolError("Client pool size must be at least 1.")
+        self.config = config
+        self.size = size
+        self.max_age = max_age
+        self.max_failures = max_failures
+        self.acquire_timeout = acquire_timeout
+        self._factory = factory
+        self._authenticator = authenticator
+        self._credentials = None
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._in_use = 0
+        self._recycled = 0
+        self._closed = False
+
+    async def start(self) -> None:
+        """Authenticates once and fills the pool."""
+        self._credentials = await asyncio.to_thread(self._authenticator, self.config)
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._build())
+        logger.info(f"✅ Client pool ready with {self.size} client set(s).")
+
+    async def _build(self) -> PipelineClients:
+        docai_client, translation_model = await asyncio.to_thread(self._factory, self.config, self._credentials)
+        return PipelineClients(docai_client=docai_client, translation_model=translation_model)
+
+    def _is_healthy(self, clients: PipelineClients) -> bool:
+        if clients.failures >= self.max_failures:
+            return False
+        return time.monotonic() - clients.created_at < self.max_age
+
+    async def _replace(self, clients: PipelineClients) -> PipelineClients:
+        logger.info("Recycling unhealthy or expired client set...")
+        fresh = await self._build()
+        _close_clients(clients)
+        self._recycled += 1
+        return fresh
+
+    @asynccontextmanager
+    async def acquire(self, timeout=POOL_TIMEOUT):
+        """
+        Borrows a client set for the duration of the `async with` block. `timeout`
+        overrides the pool's acquire timeout; None waits in line until a set is free.
+        """
+        if self._closed:
+            raise ClientPoolError("Client pool is closed.")
+        if timeout is POOL_TIMEOUT:
+            timeout = self.acquire_timeout
+        try:
+            clients = await asyncio.wait_for(self._idle.get(), timeout=timeout)
+        except asyncio.TimeoutError as e:
+            raise ClientPoolError("Timed out waiting for a free pipeline client.") from e
+
+        self._in_use += 1
+        try:
+            if not self._is_healthy(clients):
+                clients = await self._replace(clients)
+            try:
+                yield clients
+            except Exception as e:
+                if is_client_failure(e):
+                    clients.failures += 1
+                raise
+            else:
+                clients.failures = 0
+        finally:
+            self._in_use -= 1
+            if self._closed:
+                _close_clients(clients)
+            else:
+                self._idle.put_nowait(clients)
+
+    async def check_health(self) -> dict:
+        """Rebuilds idle client sets that have expired or failed too often."""
+        for _ in range(self._idle.qsize()):
+            clients = self._idle.get_nowait()
+            if not self._is_healthy(clients):
+                try:
+                    clients = await self._replace(clients)
+                except Exception as e:
+                    logger.error(f"Failed to rebuild pipeline clients: {e}")
+                    self._idle.put_nowait(clients)
+                    continue
+            self._idle.put_nowait(clients)
+        return self.stats()
+
+    async def run_health_checks(self, interval: float) -> None:
+        """Background loop started from the FastAPI lifespan hook."""
+        while not self._closed:
+            await asyncio.sleep(interval)
+            await self.check_health()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "in_use": self._in_use,
+            "recycled": self._recycled,
+            "closed": self._closed,
+        }
+
+    async def close(self) -> None:
+        """Closes every idle client; borrowed ones are closed when returned."""
+        self._closed = True
+        while not self._idle.empty():
+            _close_clients(self._idle.get_nowait())
+        logger.info("Client pool shut down.")
+
+
+def _close_clients(clients: PipelineClients) -> None:
+    transport = getattr(clients.docai_client, "transport", None)
+    try:
+        if transport is not None:
+            transport.close()
+    except Exception as e:
+        logger.warning(f"Error while closing Document AI client: {e}")
@@ -1,11 +1,19 @@
 import os
 import sys
 import argparse
+import hashlib
 import logging
 import time
 import io
+import mmap
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Tuple
+from itertools import groupby
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 # Load environment variables from the .env file
 try:
@@ -24,6 +32,8 @@ from google.auth import default as default_credentials, exceptions as auth_excep
 from google.api_core import exceptions as api_exceptions
 from pypdf import PdfReader, PdfWriter
 from pypdf.errors import PdfReadError
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
 
 # ======================================================
 # 📝 LOGGING SETUP
@@ -40,6 +50,17 @@ class AuthenticationError(PipelineError): pass
 class FileProcessingError(PipelineError): pass
 class ExtractionError(PipelineError): pass
 class TranslationError(PipelineError): pass
+class PipelineCancelled(PipelineError): pass
+
+
+# Called with (done, total) as a stage makes progress; may be invoked from worker threads.
+ProgressCallback = Callable[[int, int], None]
+
+
+def raise_if_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    """Checkpoint for long-running stages; aborts once the caller has gone away."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise PipelineCancelled("Processing was cancelled by the client.")
 
 # ======================================================
 # ⚙️ CONFIGURATION
@@ -52,6 +73,22 @@ class PipelineConfig:
     docai_processor_id: str
     translation_model_name: str = "gemini-2.5-flash-lite"
     max_pdf_pages_per_chunk: int = 15
+    # Number of PDF chunks sent to Document AI at once (1 = serial).
+    max_concurrent_chunks: int = 4
+    chunk_max_retries: int = 2
+    chunk_retry_backoff_seconds: float = 1.0
+    # Estimated input tokens per translation request, and how many run at once.
+    translation_chunk_tokens: int = 3000
+    max_concurrent_translations: int = 4
+    # Retries for transient Document AI / Gemini errors use jittered exponential backoff from these bases.
+    translation_max_retries: int = 2
+    translation_retry_backoff_seconds: float = 1.0
+    # Pass paragraphs detected as English through instead of sending them to the model.
+    skip_english_segments: bool = True
+    # Read pages that carry a usable text layer locally instead of sending them to OCR.
+    use_pdf_text_layer: bool = True
+    # Non-space characters a page with images needs before its text layer is trusted.
+    min_text_layer_chars: int = 40
 
     @classmethod
     def from_env(cls):
@@ -62,39 +99,150 @@ class PipelineConfig:
             project_id=os.environ["GCP_PROJECT_ID"],
             docai_location=os.environ["GCP_LOCATION_For_docai"],
             vertex_location=os.environ["GCP_LOCATION_For_vertexai"],
-            docai_processor_id=os.environ["DOCAI_PROCESSOR_ID"]
+            docai_processor_id=os.environ["DOCAI_PROCESSOR_ID"],
+            max_pdf_pages_per_chunk=_env_number("MAX_PDF_PAGES_PER_CHUNK", cls.max_pdf_pages_per_chunk),
+            max_concurrent_chunks=_env_number("DOCAI_MAX_CONCURRENT_CHUNKS", cls.max_concurrent_chunks),
+            chunk_max_retries=_env_number("DOCAI_CHUNK_MAX_RETRIES", cls.chunk_max_retries),
+            chunk_retry_backoff_seconds=_env_number("DOCAI_CHUNK_RETRY_BACKOFF_SECONDS", cls.chunk_retry_backoff_seconds),
+            translation_chunk_tokens=_env_number("TRANSLATION_CHUNK_TOKENS", cls.translation_chunk_tokens),
+            max_concurrent_translations=_env_number("MAX_CONCURRENT_TRANSLATIONS", cls.max_concurrent_translations),
+            translation_max_retries=_env_number("TRANSLATION_MAX_RETRIES", cls.translation_max_retries),
+            translation_retry_backoff_seconds=_env_number("TRANSLATION_RETRY_BACKOFF_SECONDS", cls.translation_retry_backoff_seconds),
+            skip_english_segments=_env_number("SKIP_ENGLISH_SEGMENTS", cls.skip_english_segments),
+            use_pdf_text_layer=_env_number("USE_PDF_TEXT_LAYER", cls.use_pdf_text_layer),
+            min_text_layer_chars=_env_number("MIN_TEXT_LAYER_CHARS", cls.min_text_layer_chars),
         )
 
+
+def _env_number(name, default):
+    """Reads an optional numeric tuning knob, keeping the type of its default."""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if isinstance(default, bool):
+        if value.lower() in ("1", "true", "yes", "on"):
+            return True
+        if value.lower() in ("0", "false", "no", "off"):
+            return False
+        raise ConfigError(f"Environment variable {name} must be true or false, got {value!r}")
+    try:
+        return type(default)(value)
+    except ValueError as e:
+        raise ConfigError(f"Environment variable {name} must be a {type(default).__name__}, got {value!r}") from e
+
 # ======================================================
 # 🔐 AUTHENTICATION & CLIENT INITIALIZATION
 # ======================================================
-def initialize_clients(config: PipelineConfig) -> Tuple[documentai.DocumentProcessorServiceClient, GenerativeModel]:
+def authenticate(config: PipelineConfig):
+    """Discovers default credentials and initializes the Vertex AI SDK once."""
     try:
         logger.info("Authenticating with Google Cloud...")
         credentials, _ = default_credentials()
-        docai_client = documentai.DocumentProcessorServiceClient(credentials=credentials)
         vertexai.init(project=config.project_id, location=config.vertex_location, credentials=credentials)
-        translation_model = GenerativeModel(config.translation_model_name)
-        logger.info("✅ All clients initialized successfully.")
-        return docai_client, translation_model
+        return credentials
     except auth_exceptions.DefaultCredentialsError as e:
         raise AuthenticationError("Authentication failed. Ensure GOOGLE_APPLICATION_CREDENTIALS is set correctly.") from e
 
+
+def create_clients(config: PipelineConfig, credentials) -> Tuple[documentai.DocumentProcessorServiceClient, GenerativeModel]:
+    """Builds a Document AI client and a translation model from existing credentials."""
+    docai_client = documentai.DocumentProcessorServiceClient(credentials=credentials)
+    translation_model = GenerativeModel(config.translation_model_name)
+    return docai_client, translation_model
+
+
+def initialize_clients(config: PipelineConfig) -> Tuple[documentai.DocumentProcessorServiceClient, GenerativeModel]:
+    credentials = authenticate(config)
+    docai_client, translation_model = create_clients(config, credentials)
+    logger.info("✅ All clients initialized successfully.")
+    return docai_client, translation_model
+
+# ======================================================
+# 🔁 RETRIES & ADMISSION
+# ======================================================
+# Transient Document AI / Vertex AI failures that are worth retrying.
+RETRYABLE_API_ERRORS = (
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.TooManyRequests,
+    api_exceptions.ResourceExhausted,
+)
+# Upper bound on a single backoff sleep.
+MAX_BACKOFF_SECONDS = 30.0
+
+
+def call_with_backoff(
+    call: Callable[[], Any], retries: int, backoff: float, description: str,
+    cancel_event: Optional[threading.Event] = None, retry_if: Optional[Callable[[BaseException], bool]] = None
+) -> Tuple[Any, int]:
+    """
+    Calls `call()`, retrying `RETRYABLE_API_ERRORS` up to `retries` times with jittered
+    exponential backoff. Returns (result, attempts); re-raises the last error once
+    retries run out. `retry_if` can veto retrying a particular failure.
+    """
+    def sleep(seconds: float) -> None:
+        if cancel_event is not None:
+            cancel_event.wait(seconds)
+        else:
+            time.sleep(seconds)
+        raise_if_cancelled(cancel_event)
+
+    def should_retry(error: BaseException) -> bool:
+        return isinstance(error, RETRYABLE_API_ERRORS) and (retry_if is None or retry_if(error))
+
+    retrying = Retrying(
+        stop=stop_after_attempt(retries + 1),
+        wait=wait_random_exponential(multiplier=backoff, max=MAX_BACKOFF_SECONDS),
+        retry=retry_if_exception(should_retry),
+        sleep=sleep,
+        before_sleep=lambda state: logger.warning(
+            f"{description} failed: {state.outcome.exception()}. Retrying in {state.next_action.sleep:.1f}s..."
+        ),
+        reraise=True,
+    )
+    result = retrying(call)
+    return result, retrying.statistics.get("attempt_number", 1)
+
+
+def _admitted(admission: Optional[Any], backend: str, cancel_event: Optional[threading.Event]):
+    """A slot for one call to `backend` from the admission controller, if there is one."""
+    return admission.slot(backend, cancel_event) if admission is not None else nullcontext()
+
 # ======================================================
 # 📄 EXTRACTION LOGIC
 # ======================================================
-from typing import Optional
+# Uploaded documents arrive either as bytes or as a read-only buffer such as a
+# memory-mapped spool file, so large scans never need a second in-memory copy.
+DocumentSource = Union[bytes, bytearray, memoryview, mmap.mmap]
 
 
-def extract_with_docai(
+def _as_stream(content: DocumentSource):
+    """Returns a seekable binary stream over the document without copying it."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return io.BytesIO(content)
+    content.seek(0)
+    return content
+
+def _process_with_docai(
     docai_client: documentai.DocumentProcessorServiceClient,
     config: PipelineConfig,
     filename: str,  # Use filename to get the MIME type
-    content: bytes # Always expect the content
-) -> str:
-    """Processes document content from a direct bytes object."""
+    content: DocumentSource, # Always expect the content
+    cancel_event: Optional[threading.Event] = None,
+    admission: Optional[Any] = None,
+    label: Optional[str] = None
+) -> Tuple[documentai.Document, int]:
+    """
+    Sends document content to the Document AI processor, retrying transient errors.
+    Returns the parsed document and the number of attempts it took.
+    """
     if not content:
         raise FileProcessingError("Content bytes object is empty.")
+    if not isinstance(content, bytes):
+        # The Document AI request needs its own bytes; this is the only full copy we make.
+        content = bytes(content)
+    raise_if_cancelled(cancel_event)
 
     try:
         # Get the MIME type from the filename
@@ -118,54 +266,362 @@ def extract_with_docai(
         name = f"projects/{config.project_id}/locations/{config.docai_location}/processors/{config.docai_processor_id}"
         req = documentai.ProcessRequest(name=name, raw_document=doc)
         
-        logger.info(f"Sending document chunk to Document AI processor...")
-        result = docai_client.process_document(request=req)
-        return result.document.text
+        def call():
+            with _admitted(admission, "docai", cancel_event):
+                logger.info(f"Sending document chunk to Document AI processor...")
+                return docai_client.process_document(request=req)
+
+        label = label or filename
+        result, attempts = call_with_backoff(
+            call, config.chunk_max_retries, config.chunk_retry_backoff_seconds, f"Document AI request for {label}", cancel_event
+        )
+        return result.document, attempts
     except api_exceptions.InvalidArgument as e:
         raise ExtractionError(f"Document AI Error: Invalid argument. The file type may be unsupported or the document is malformed.") from e
+    except RETRYABLE_API_ERRORS as e:
+        raise ExtractionError(f"Document AI failed on {label} after {config.chunk_max_retries + 1} attempt(s): {e}") from e
 
 
-def smart_pdf_agent(file_content: bytes, filename: str, docai_client: documentai.DocumentProcessorServiceClient, config: PipelineConfig) -> str:
-    """Handles PDF splitting and processes large PDFs entirely in memory."""
+def extract_with_docai(
+    docai_client: documentai.DocumentProcessorServiceClient,
+    config: PipelineConfig,
+    filename: str,
+    content: DocumentSource,
+    cancel_event: Optional[threading.Event] = None,
+    admission: Optional[Any] = None
+) -> str:
+    """Processes document content from a direct bytes object."""
+    document, _ = _process_with_docai(
+        docai_client, config, filename=filename, content=content, cancel_event=cancel_event, admission=admission
+    )
+    return document.text
+
+
+def split_docai_pages(document: documentai.Document, page_count: int) -> Tuple[List[str], bool]:
+    """
+    Splits a Document AI result into per-page texts using each page's text anchor.
+    Returns the texts and whether the split is exact.
+
+    If the response doesn't describe exactly `page_count` pages, the whole text is
+    attributed to the first page so nothing is lost, and the split is not exact.
+    """
+    text = document.text
+    if len(document.pages) != page_count:
+        logger.warning(f"Document AI returned {len(document.pages)} page(s) for a {page_count}-page request; keeping its text unsplit.")
+        return [text] + [""] * (page_count - 1), False
+    return [
+        "".join(text[int(segment.start_index):int(segment.end_index)] for segment in page.layout.text_anchor.text_segments)
+        for page in document.pages
+    ], True
+
+
+# ======================================================
+# 🔎 PDF TEXT-LAYER CLASSIFICATION
+# ======================================================
+# Legacy (non-Unicode) Devanagari fonts: their text layer extracts as Latin gibberish, so OCR them.
+LEGACY_DEVANAGARI_FONTS = re.compile(r"kruti|devlys|chanakya|shusha|shivaji|walkman", re.IGNORECASE)
+# Share of garbage characters (replacement, control, private-use glyph codes) a text layer may have.
+MAX_GARBAGE_RATIO = 0.05
+
+
+# The inline-image operator (BI ... ID ... EI): scans are sometimes drawn this way instead of as XObjects.
+INLINE_IMAGE_REGEX = re.compile(rb"(?:^|\s)BI\s")
+
+
+def _page_fonts_and_images(page) -> Tuple[List[str], bool, bool]:
+    """
+    Returns a page's font names, whether it draws any image (XObject or inline), and
+    whether its content stream draws anything at all, following form XObjects.
+    """
+    fonts: List[str] = []
+    has_images = False
+    contents = page.get_contents()
+    streams = [contents.get_data()] if contents is not None else []
+    pending, seen = [page.get("/Resources")], set()
+    while pending:
+        resources = pending.pop()
+        resources = resources.get_object() if resources is not None else None
+        if not resources or id(resources) in seen:
+            continue
+        seen.add(id(resources))
+        for font in (resources.get("/Font") or {}).values():
+            fonts.append(str(font.get_object().get("/BaseFont", "")))
+        for xobject in (resources.get("/XObject") or {}).values():
+            xobject = xobject.get_object()
+            if xobject.get("/Subtype") == "/Image":
+                has_images = True
+            elif xobject.get("/Subtype") == "/Form":
+                streams.append(xobject.get_data())
+                pending.append(xobject.get("/Resources"))
+    has_images = has_images or any(INLINE_IMAGE_REGEX.search(data) for data in streams)
+    return fonts, has_images, bool(streams and streams[0].strip())
+
+
+def _is_garbled(text: str) -> bool:
+    chars = [ch for ch in text if not ch.isspace()]
+    garbage = sum(1 for ch in chars if ch == "\ufffd" or unicodedata.category(ch) in ("Cc", "Co", "Cn"))
+    return garbage > MAX_GARBAGE_RATIO * len(chars)
+
+
+def read_text_layer(page, config: PipelineConfig) -> Optional[str]:
+    """
+    Returns the page's own text when it can stand in for OCR, or None if the page
+    needs Document AI: scanned or image-only pages, pages that draw something but
+    have no text (e.g. text as vector outlines), legacy Devanagari fonts, and text
+    layers that extract as garbage.
+    """
     try:
-        reader = PdfReader(io.BytesIO(file_content))
+        text = page.extract_text() or ""
+        fonts, has_images, draws_anything = _page_fonts_and_images(page)
+    except Exception as e:
+        # pypdf can trip over malformed content streams; OCR the page instead.
+        logger.warning(f"Could not read the text layer of a page, sending it to OCR: {e}")
+        return None
+    if any(LEGACY_DEVANAGARI_FONTS.search(font) for font in fonts) or _is_garbled(text):
+        return None
+    characters = sum(1 for ch in text if not ch.isspace())
+    if characters >= config.min_text_layer_chars:
+        return text
+    if has_images or (characters == 0 and draws_anything):
+        return None
+    # A little text and no images (a short page), or a truly blank page: nothing for OCR to add.
+    return text
+
+
+def _join_pages(page_texts: List[str]) -> str:
+    """Concatenates per-page texts in order, making sure each page starts on a new line."""
+    parts: List[str] = []
+    for text in page_texts:
+        if not text:
+            continue
+        if parts and not parts[-1].endswith("\n"):
+            parts.append("\n")
+        parts.append(text)
+    return "".join(parts)
+
+
+# ======================================================
+# 🧾 PER-PAGE OCR CACHE KEYS
+# ======================================================
+# Page attributes besides contents and resources that change what OCR reads.
+PAGE_GEOMETRY_KEYS = ("/MediaBox", "/CropBox", "/Rotate")
+# Stream dictionary entries that describe only how the bytes are stored.
+STREAM_ENCODING_KEYS = ("/Length", "/Filter", "/DecodeParms")
+
+
+def _hash_pdf_object(obj, hasher, visiting: set) -> None:
+    """Feeds a PDF object graph into `hasher`, following indirect references (but not cycles)."""
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref in visiting:
+            hasher.update(b"<cycle>")
+            return
+        visiting.add(ref)
+        _hash_pdf_object(obj.get_object(), hasher, visiting)
+        visiting.discard(ref)
+    elif isinstance(obj, StreamObject):
+        # Decoded bytes through the public API, so the key doesn't depend on pypdf internals or
+        # on how the stream happens to be compressed; may raise for filters pypdf can't decode.
+        data = obj.get_data() or b""
+        hasher.update(b"stream%d:" % len(data))
+        hasher.update(data)
+        _hash_pdf_object(
+            DictionaryObject({k: v for k, v in obj.items() if k not in STREAM_ENCODING_KEYS}), hasher, visiting
+        )
+    elif isinstance(obj, DictionaryObject):
+        hasher.update(b"<<")
+        for key in sorted(obj):
+            if key == "/Parent":
+                continue
+            hasher.update(key.encode("utf-8"))
+            _hash_pdf_object(obj[key], hasher, visiting)
+        hasher.update(b">>")
+    elif isinstance(obj, ArrayObject):
+        hasher.update(b"[")
+        for item in obj:
+            _hash_pdf_object(item, hasher, visiting)
+        hasher.update(b"]")
+    else:
+        hasher.update(repr(obj).encode("utf-8") + b" ")
+
+
+def page_fingerprint(page) -> str:
+    """
+    Hash of what a page draws: its content streams, its resources (fonts, images,
+    forms) and its geometry. Object numbers are not part of it, so the same page
+    hashes the same across revisions and templated documents. Raises if a stream
+    can't be decoded.
+    """
+    hasher = hashlib.sha256()
+    for key in ("/Contents", "/Resources") + PAGE_GEOMETRY_KEYS:
+        hasher.update(key.encode("utf-8"))
+        if key in page:
+            _hash_pdf_object(page[key], hasher, set())
+    return hasher.hexdigest()
+
+
+def page_cache_key(config: PipelineConfig, fingerprint: str) -> str:
+    """Cache key for one page's OCR text; scoped to the processor, since another one reads differently."""
+    processor = f"{config.project_id}/{config.docai_location}/{config.docai_processor_id}"
+    return hashlib.sha256(f"ocr-page:{processor}:{fingerprint}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChunkTiming:
+    """Wall-clock timing of one Document AI chunk, used to tune chunk size against quotas."""
+    index: int
+    start_page: int
+    end_page: int
+    seconds: float
+    attempts: int
+
+
+def _extract_chunk(
+    index: int, pages: List[int], reader: PdfReader, reader_lock: threading.Lock,
+    filename: str, docai_client: documentai.DocumentProcessorServiceClient, config: PipelineConfig,
+    cancel_event: Optional[threading.Event], content: Optional[DocumentSource] = None, admission: Optional[Any] = None
+) -> Tuple[List[str], bool, ChunkTiming]:
+    """
+    Re-packs the given pages into a PDF and extracts it, retrying transient errors.
+    Returns one text per page, whether that split is exact (see `split_docai_pages`)
+    and the chunk's timing. Pass `content` to send an already complete PDF as is.
+    """
+    raise_if_cancelled(cancel_event)
+    first, last = pages[0] + 1, pages[-1] + 1
+    if content is None:
+        # PdfReader resolves objects lazily from a shared stream, so slicing must be serialised.
+        with reader_lock:
+            writer = PdfWriter()
+            for page_num in pages:
+                writer.add_page(reader.pages[page_num])
+            with io.BytesIO() as pdf_chunk_stream:
+                writer.write(pdf_chunk_stream)
+                content = pdf_chunk_stream.getvalue()
+
+    logger.info(f"Processing {len(pages)} page(s) between {first} and {last}...")
+    began = time.perf_counter()
+    document, attempt = _process_with_docai(
+        docai_client, config, content=content, filename=filename, cancel_event=cancel_event,
+        admission=admission, label=f"pages {first}-{last}"
+    )
+
+    timing = ChunkTiming(index=index, start_page=first, end_page=last, seconds=time.perf_counter() - began, attempts=attempt)
+    logger.info(f"Chunk {index} (pages {timing.start_page}-{timing.end_page}) took {timing.seconds:.2f}s in {attempt} attempt(s).")
+    texts, exact = split_docai_pages(document, len(pages))
+    return texts, exact, timing
+
+
+def smart_pdf_agent(
+    file_content: DocumentSource, filename: str, docai_client: documentai.DocumentProcessorServiceClient, config: PipelineConfig,
+    cancel_event: Optional[threading.Event] = None, chunk_timings: Optional[List[ChunkTiming]] = None,
+    progress: Optional[ProgressCallback] = None, page_cache: Optional[Any] = None, admission: Optional[Any] = None
+) -> str:
+    """
+    Extracts a PDF page by page from `file_content`.
+
+    Pages with a usable text layer are read locally; the rest are packed into chunks
+    of up to `config.max_pdf_pages_per_chunk` pages, sent to Document AI concurrently
+    (up to `config.max_concurrent_chunks`), and everything is merged in page order.
+    `page_cache` (anything with `get(key)` / `set(key, value)`, e.g. a `ResultCache`)
+    holds OCR text per page content hash, so only pages it hasn't seen are sent.
+    Each Document AI call takes a slot from `admission` (an `AdmissionController`).
+    If `chunk_timings` is given, a `ChunkTiming` per chunk is appended to it in page
+    order. `progress` receives pages done / total.
+    """
+    try:
+        reader = PdfReader(_as_stream(file_content))
     except PdfReadError as e:
         raise FileProcessingError(f"Could not read PDF. It may be corrupted.") from e
 
     num_pages = len(reader.pages)
-    logger.info(f"PDF detected with {num_pages} page(s).")
-
-    if num_pages <= config.max_pdf_pages_per_chunk:
-        # Pass the original content and filename directly
-        return extract_with_docai(docai_client, config, content=file_content, filename=filename)
-    
-    logger.info(f"PDF is large. Processing chunks in memory...")
-    full_text = []
-    for i in range(0, num_pages, config.max_pdf_pages_per_chunk):
-        writer = PdfWriter()
-        start, end = i, min(i + config.max_pdf_pages_per_chunk, num_pages)
-        logger.info(f"Processing pages {start + 1} through {end}...")
-        
-        for page_num in range(start, end):
-            writer.add_page(reader.pages[page_num])
-            
-        with io.BytesIO() as pdf_chunk_stream:
-            writer.write(pdf_chunk_stream)
-            pdf_chunk_bytes = pdf_chunk_stream.getvalue()
-            # Pass the bytes object and filename to the extraction function
-            chunk_text = extract_with_docai(docai_client, config, content=pdf_chunk_bytes, filename=filename)
-            full_text.append(chunk_text)
-            
-    return "\n\n".join(full_text)
-
-
-def extraction_agent(file_content: bytes, filename: str, docai_client: documentai.DocumentProcessorServiceClient, config: PipelineConfig) -> str:
+    page_texts: List[Optional[str]] = [None] * num_pages
+    if config.use_pdf_text_layer:
+        for page_num, page in enumerate(reader.pages):
+            raise_if_cancelled(cancel_event)
+            page_texts[page_num] = read_text_layer(page, config)
+    ocr_pages = [page_num for page_num, text in enumerate(page_texts) if text is None]
+    local_pages = num_pages - len(ocr_pages)
+
+    cache_keys = {}
+    if page_cache is not None:
+        for page_num in ocr_pages:
+            raise_if_cancelled(cancel_event)
+            try:
+                cache_keys[page_num] = page_cache_key(config, page_fingerprint(reader.pages[page_num]))
+            except Exception as e:
+                logger.warning(f"Could not fingerprint page {page_num + 1}; it won't be cached: {e}")
+                continue
+            page_texts[page_num] = page_cache.get(cache_keys[page_num])
+        ocr_pages = [page_num for page_num in ocr_pages if page_texts[page_num] is None]
+    pages_done = num_pages - len(ocr_pages)
+    logger.info(
+        f"PDF detected with {num_pages} page(s); {local_pages} read from the text layer, "
+        f"{pages_done - local_pages} cached, {len(ocr_pages)} need OCR."
+    )
+    if progress:
+        progress(pages_done, num_pages)
+    if not ocr_pages:
+        return _join_pages(page_texts)
+
+    size = config.max_pdf_pages_per_chunk
+    chunks = [ocr_pages[i:i + size] for i in range(0, len(ocr_pages), size)]
+    # A PDF that is OCR'd whole in a single request is sent as uploaded, without re-packing.
+    whole_file = file_content if len(ocr_pages) == num_pages and len(chunks) == 1 else None
+    workers = max(1, min(config.max_concurrent_chunks, len(chunks)))
+    logger.info(f"Sending {len(ocr_pages)} page(s) to Document AI in {len(chunks)} chunk(s) with {workers} worker(s)...")
+
+    reader_lock = threading.Lock()
+    timings: List[Optional[ChunkTiming]] = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docai-chunk") as pool:
+        futures = {
+            pool.submit(
+                _extract_chunk, idx, pages, reader, reader_lock, filename, docai_client, config, cancel_event, whole_file, admission
+            ): idx
+            for idx, pages in enumerate(chunks)
+        }
+        try:
+            for future in as_completed(futures):
+                idx = futures[future]
+                texts, exact, timings[idx] = future.result()
+                for page_num, text in zip(chunks[idx], texts):
+                    page_texts[page_num] = text
+                    # An inexact split put the chunk's text on its first page; that is no page's text.
+                    if exact and page_num in cache_keys:
+                        page_cache.set(cache_keys[page_num], text)
+                pages_done += len(chunks[idx])
+                if progress:
+                    progress(pages_done, num_pages)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    if chunk_timings is not None:
+        chunk_timings.extend(timings)
+    total = sum(timing.seconds for timing in timings)
+    logger.info(f"Extracted {len(chunks)} chunk(s); {total:.2f}s of Document AI time.")
+    return _join_pages(page_texts)
+
+
+def extraction_agent(
+    file_content: DocumentSource, filename: str, docai_client: documentai.DocumentProcessorServiceClient, config: PipelineConfig,
+    cancel_event: Optional[threading.Event] = None, chunk_timings: Optional[List[ChunkTiming]] = None,
+    progress: Optional[ProgressCallback] = None, page_cache: Optional[Any] = None, admission: Optional[Any] = None
+) -> str:
     """Routes the file to the correct extraction logic."""
     suffix = os.path.splitext(filename)[1].lower()
     if suffix == ".pdf":
-        return smart_pdf_agent(file_content, filename, docai_client, config)
+        return smart_pdf_agent(
+            file_content, filename, docai_client, config, cancel_event=cancel_event, chunk_timings=chunk_timings,
+            progress=progress, page_cache=page_cache, admission=admission
+        )
     else:
-        return extract_with_docai(docai_client, config, content=file_content, filename=filename)
+        text = extract_with_docai(
+            docai_client, config, content=file_content, filename=filename, cancel_event=cancel_event, admission=admission
+        )
+        if progress:
+            progress(1, 1)
+        return text
 
 # ======================================================
 # 🌐 TRANSLATION LOGIC
@@ -209,23 +665,288 @@ def create_translation_prompt(text: str) -> str:
 #     OUTPUT TRANSLATION (mirror of original, in English):
 #     """
 
-def translate_text(text: str, model: GenerativeModel) -> str:
-    """Translates text using a generative model."""
+PARAGRAPH_SPLIT_REGEX = re.compile(r"\n\s*\n")
+# Starts of numbered clauses ("12.", "4.2)", "(a)", "(iv)") at the beginning of a line.
+CLAUSE_SPLIT_REGEX = re.compile(r"\n(?=\s*(?:\d+(?:\.\d+)*[.)]|\([a-zA-Z0-9]{1,4}\))\s)")
+# Sentence ends, including the Devanagari danda used in Hindi and Marathi text.
+SENTENCE_SPLIT_REGEX = re.compile(r"(?<=[.;:?!\u0964])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: ~4 chars per token for ASCII, ~2 for other scripts (e.g. Devanagari)."""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) // 2 + 1
+
+
+def _split_oversized(piece: str, max_tokens: int) -> List[str]:
+    """Splits one paragraph at clause, then sentence, then character boundaries."""
+    if estimate_tokens(piece) <= max_tokens:
+        return [piece]
+    for splitter in (CLAUSE_SPLIT_REGEX, SENTENCE_SPLIT_REGEX):
+        parts = [p for p in splitter.split(piece) if p.strip()]
+        if len(parts) > 1:
+            sep = "\n" if splitter is CLAUSE_SPLIT_REGEX else " "
+            return _pack(parts, max_tokens, sep)
+    # No natural boundary left: fall back to a hard split.
+    step = max(1, len(piece) * max_tokens // estimate_tokens(piece))
+    return [piece[i:i + step] for i in range(0, len(piece), step)]
+
+
+def _pack(parts: List[str], max_tokens: int, sep: str) -> List[str]:
+    """Greedily packs consecutive parts into chunks that stay under the token budget."""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for part in parts:
+        for piece in _split_oversized(part, max_tokens):
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(sep.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append(sep.join(current))
+    return chunks
+
+
+def plan_translation_chunks(text: str, max_tokens: int) -> List[str]:
+    """Splits text into ordered chunks at paragraph and clause boundaries under `max_tokens` each."""
+    paragraphs = [p.strip() for p in PARAGRAPH_SPLIT_REGEX.split(text) if p.strip()]
+    return _pack(paragraphs, max(1, max_tokens), "\n\n")
+
+
+# ======================================================
+# 🈯 LANGUAGE DETECTION
+# ======================================================
+ENGLISH, HINDI, MARATHI, OTHER = "en", "hi", "mr", "other"
+WORD_REGEX = re.compile(r"\w+")
+ENGLISH_STOPWORDS = frozenset(
+    "the of and to in a an is are be been by for or that this shall any with as on not such under which "
+    "from at it its has have may other all no if where said herein thereof".split()
+)
+# Common function words that tell Hindi and Marathi apart once text is known to be Devanagari.
+HINDI_MARKERS = frozenset("है हैं और के की में से को का पर यह किया गया होगा".split())
+MARATHI_MARKERS = frozenset("आहे आहेत आणि च्या मध्ये हे ही या व केले करण्यात येईल".split())
+# Share of a Latin-script segment's words that must be English stopwords for it to count as English.
+MIN_ENGLISH_STOPWORD_RATIO = 0.15
+# A segment is sent to translation once this share of its letters (and at least
+# MIN_NON_LATIN_LETTERS of them) is in a non-Latin script, however short it is.
+MIN_SCRIPT_RATIO = 0.1
+MIN_NON_LATIN_LETTERS = 3
+# Latin-script segments with fewer letters (numbering, dates, names) take the language of their neighbours.
+MIN_DETECTABLE_LETTERS = 20
+
+
+def _script_counts(segment: str) -> Tuple[int, int, int]:
+    """(Latin, Devanagari, other-script) letter counts."""
+    latin = devanagari = other = 0
+    for ch in segment:
+        if "\u0900" <= ch <= "\u097f":
+            devanagari += 1  # Includes vowel signs, which aren't `isalpha`.
+        elif ch.isalpha():
+            if ch < "\u0250":  # Basic Latin through Latin Extended-B.
+                latin += 1
+            else:
+                other += 1
+    return latin, devanagari, other
+
+
+def _has_non_latin_share(latin: int, devanagari: int, other: int) -> bool:
+    non_latin = devanagari + other
+    return non_latin >= MIN_NON_LATIN_LETTERS and non_latin >= MIN_SCRIPT_RATIO * (latin + non_latin)
+
+
+def detect_language(segment: str) -> Optional[str]:
+    """Guesses a segment's language from its script and function words; None if it is too short to tell."""
+    latin, devanagari, other = _script_counts(segment)
+    if _has_non_latin_share(latin, devanagari, other):
+        if devanagari < other:
+            return OTHER
+        words = segment.split()
+        marathi = sum(1 for w in words if w in MARATHI_MARKERS)
+        return MARATHI if marathi > sum(1 for w in words if w in HINDI_MARKERS) else HINDI
+    if latin + devanagari + other < MIN_DETECTABLE_LETTERS:
+        return None
+    words = WORD_REGEX.findall(segment.lower())
+    stopwords = sum(1 for w in words if w in ENGLISH_STOPWORDS)
+    # Latin script without English function words: romanised Hindi, or another language.
+    return ENGLISH if stopwords >= MIN_ENGLISH_STOPWORD_RATIO * len(words) else OTHER
+
+
+def _split_by_script(paragraph: str) -> List[str]:
+    """
+    Splits a paragraph at the lines where it switches between Latin and non-Latin
+    script: OCR and text-layer output often separate lines with single newlines, so
+    a Hindi line can sit inside an otherwise English paragraph.
+    """
+    parts: List[str] = []
+    for _, lines in groupby(
+        (line for line in paragraph.splitlines() if line.strip()),
+        key=lambda line: _has_non_latin_share(*_script_counts(line)),
+    ):
+        parts.append("\n".join(lines).strip())
+    return parts
+
+
+def detect_segments(text: str) -> List[Tuple[str, str]]:
+    """
+    Splits text into paragraphs, and those into runs of Latin and non-Latin lines,
+    and labels each with its language, as (language, segment) pairs.
+    """
+    segments = [part for p in PARAGRAPH_SPLIT_REGEX.split(text) if p.strip() for part in _split_by_script(p)]
+    detected = [detect_language(segment) for segment in segments]
+    current = next((language for language in detected if language), ENGLISH)
+    labelled = []
+    for language, segment in zip(detected, segments):
+        current = language or current
+        labelled.append((current, segment))
+    return labelled
+
+
+def language_mix(text: str) -> dict:
+    """Share of the text's characters per detected language, plus how many segments need translating."""
+    segments = detect_segments(text)
+    total = sum(len(p) for _, p in segments) or 1
+    shares = {}
+    for language, paragraph in segments:
+        shares[language] = shares.get(language, 0) + len(paragraph)
+    return {
+        "languages": {language: round(size / total, 3) for language, size in sorted(shares.items(), key=lambda kv: -kv[1])},
+        "segments": len(segments),
+        "translated_segments": sum(1 for language, _ in segments if language != ENGLISH),
+    }
+
+
+# Called with (piece index, text delta) as translated text arrives; may be invoked from worker threads.
+DeltaCallback = Callable[[int, str], None]
+
+
+def _translate_chunk(
+    chunk: str, model: GenerativeModel, cancel_event: Optional[threading.Event] = None,
+    on_delta: Optional[Callable[[str], None]] = None, config: Optional[PipelineConfig] = None,
+    admission: Optional[Any] = None
+) -> str:
+    """
+    Translates one chunk, retrying transient errors; with `on_delta`, streams the
+    response and passes on each text delta. A stream that already produced output
+    is not retried, since its deltas can't be taken back.
+    """
+    raise_if_cancelled(cancel_event)
+    prompt = create_translation_prompt(chunk)
+    streamed = False
+
+    def call() -> str:
+        nonlocal streamed
+        with _admitted(admission, "gemini", cancel_event):
+            logger.info("Sending translation request to model...")
+            response = model.generate_content(
+                prompt,
+                generation_config={"temperature": 0.2, "top_p": 0.95, "top_k": 40},
+                stream=on_delta is not None
+            )
+            if on_delta is None:
+                return response.text.strip()
+            parts: List[str] = []
+            for part in response:
+                raise_if_cancelled(cancel_event)
+                delta = part.text
+                # The model opens with whitespace; don't forward it ahead of the first word.
+                if not parts:
+                    delta = delta.lstrip()
+                if delta:
+                    parts.append(delta)
+                    streamed = True
+                    on_delta(delta)
+            return "".join(parts).strip()
+
+    retries = config.translation_max_retries if config else PipelineConfig.translation_max_retries
+    backoff = config.translation_retry_backoff_seconds if config else PipelineConfig.translation_retry_backoff_seconds
+    try:
+        text, _ = call_with_backoff(call, retries, backoff, "Translation request", cancel_event, retry_if=lambda _: not streamed)
+        return text
+    except ValueError:
+        raise TranslationError("Translation failed. The model's response was blocked or empty.")
+    except RETRYABLE_API_ERRORS as e:
+        raise TranslationError(f"Translation failed after retrying: {e}") from e
+
+
+def translate_text(
+    text: str, model: GenerativeModel, config: Optional[PipelineConfig] = None,
+    cancel_event: Optional[threading.Event] = None, progress: Optional[ProgressCallback] = None,
+    on_delta: Optional[DeltaCallback] = None, admission: Optional[Any] = None
+) -> str:
+    """
+    Translates text using a generative model.
+
+    Segments detected as English are passed through unchanged (unless
+    `config.skip_english_segments` is off); runs of other segments are split with
+    `plan_translation_chunks`, translated concurrently, and everything is stitched
+    back together in its original order. With `on_delta`, responses are streamed and
+    the output is reported as it is generated: the result is its pieces joined with
+    blank lines, and piece `i` is (up to surrounding whitespace) the concatenation
+    of the deltas reported for `i`; English pieces arrive as a single delta. Each
+    model call takes a slot from `admission` (an `AdmissionController`).
+    """
     if not text.strip():
         logger.warning("Input text for translation is empty.")
        
         return ""
-    prompt = create_translation_prompt(text)
-    try:
-        logger.info("Sending translation request to model...")
-        response = model.generate_content(
-            prompt,
-            generation_config={"temperature": 0.2, "top_p": 0.95, "top_k": 40},
-            stream=False
-        )
-        return response.text.strip()
-    except ValueError:
-        raise TranslationError("Translation failed. The model's response was blocked or empty.")
+    raise_if_cancelled(cancel_event)
+    budget = config.translation_chunk_tokens if config else PipelineConfig.translation_chunk_tokens
+    fan_out = config.max_concurrent_translations if config else PipelineConfig.max_concurrent_translations
+    skip_english = config.skip_english_segments if config else PipelineConfig.skip_english_segments
+
+    # (needs translation, text) in document order.
+    pieces: List[Tuple[bool, str]] = []
+    if skip_english:
+        for is_english, group in groupby(detect_segments(text), key=lambda segment: segment[0] == ENGLISH):
+            run = "\n\n".join(segment for _, segment in group)
+            if is_english:
+                pieces.append((False, run))
+            else:
+                pieces.extend((True, chunk) for chunk in plan_translation_chunks(run, budget))
+    else:
+        pieces = [(True, chunk) for chunk in plan_translation_chunks(text, budget)]
+
+    pending = [idx for idx, (needs_translation, _) in enumerate(pieces) if needs_translation]
+    if on_delta is not None:
+        for idx, (needs_translation, piece) in enumerate(pieces):
+            if not needs_translation:
+                on_delta(idx, piece)
+
+    def streamer(idx: int) -> Optional[Callable[[str], None]]:
+        if on_delta is None:
+            return None
+        return lambda delta: on_delta(idx, delta)
+
+    if not pending:
+        logger.info("Text is already in English; skipping translation.")
+        return "\n\n".join(piece for _, piece in pieces)
+    if len(pieces) == 1:
+        translated_text = _translate_chunk(text, model, cancel_event, streamer(0), config, admission)
+        if progress:
+            progress(1, 1)
+        return translated_text
+
+    workers = max(1, min(fan_out, len(pending)))
+    logger.info(f"Translating {len(pending)} chunk(s) with {workers} concurrent request(s); {len(pieces) - len(pending)} English run(s) kept as is...")
+    translated: List[Optional[str]] = [None if needs_translation else piece for needs_translation, piece in pieces]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate-chunk") as pool:
+        futures = {
+            pool.submit(_translate_chunk, pieces[idx][1], model, cancel_event, streamer(idx), config, admission): idx
+            for idx in pending
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                translated[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(pending))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return "\n\n".join(t for t in translated if t)
 
 # ======================================================
 # 🚀 MAIN PIPELINE EXECUTION
@@ -240,7 +961,7 @@ def main(file_content: bytes, filename: str):
         extracted_text = extraction_agent(file_content,filename, docai_client, config)
         logger.info("✅ Text extracted successfully.")
 
-        translated_text = translate_text(extracted_text, translation_model)
+        translated_text = translate_text(extracted_text, translation_model, config)
         logger.info("✅ Text translated successfully.")
 
         print("\n" + "="*80)
@@ -0,0 +1,286 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from scripts.extract_and_translate_pipeline import PipelineError, logger
+from scripts.serialization import dumps_str, loads
+
+# ======================================================
+# 🗂️ BACKGROUND JOBS WITH A REPLAYABLE EVENT LOG
+# ======================================================
+class JobNotFoundError(PipelineError): pass
+class JobQueueFullError(PipelineError): pass
+
+
+PENDING, RUNNING, COMPLETED, FAILED, CANCELLED = "pending", "running", "completed", "failed", "cancelled"
+TERMINAL_STATES = {COMPLETED, FAILED, CANCELLED}
+
+# (event id, SSE event name or None for the default "message" event, JSON-able payload)
+JobEvent = Tuple[int, Optional[str], dict]
+# A job body: an async generator of (event name, payload) pairs.
+JobRunner = Callable[[], AsyncIterator[Tuple[Optional[str], dict]]]
+
+
+@dataclass
+class JobInfo:
+    job_id: str
+    status: str = PENDING
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    meta: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {"job_id": self.job_id, "status": self.status, "created_at": self.created_at,
+                "updated_at": self.updated_at, **self.meta}
+
+
+class MemoryJobStore:
+    """In-process job and event log; fine for a single instance and local testing."""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobInfo] = {}
+        self._events: Dict[str, List[JobEvent]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: JobInfo) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._events[job.job_id] = []
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        return self._jobs.get(job_id)
+
+    def set_status(self, job_id: str, status: str) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.status, job.updated_at = status, time.time()
+
+    def append(self, job_id: str, event: Optional[str], data: dict) -> int:
+        with self._lock:
+            log = self._events[job_id]
+            event_id = len(log) + 1
+            log.append((event_id, event, data))
+            return event_id
+
+    def events_after(self, job_id: str, last_event_id: int) -> List[JobEvent]:
+        log = self._events.get(job_id, [])
+        return log[last_event_id:] if last_event_id >= 0 else list(log)
+
+    def purge(self, older_than: float) -> List[str]:
+        with self._lock:
+            stale = [j for j, info in self._jobs.items() if info.status in TERMINAL_STATES and info.updated_at < older_than]
+            for job_id in stale:
+                del self._jobs[job_id]
+                del self._events[job_id]
+            return stale
+
+
+class SQLiteJobStore:
+    """Job and event log persisted in SQLite, so a local dev server can be restarted mid-debugging."""
+
+    def __init__(self, path: str = "jobs.sqlite3"):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY, status TEXT, created_at REAL, updated_at REAL, meta TEXT
+                );
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT, event_id INTEGER, event TEXT, data TEXT, PRIMARY KEY (job_id, event_id)
+                );
+            """)
+
+    def create(self, job: JobInfo) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?)",
+                (job.job_id, job.status, job.created_at, job.updated_at, dumps_str(job.meta)),
+            )
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return JobInfo(job_id=row[0], status=row[1], created_at=row[2], updated_at=row[3], meta=loads(row[4]))
+
+    def set_status(self, job_id: str, status: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?", (status, time.time(), job_id))
+
+    def append(self, job_id: str, event: Optional[str], data: dict) -> int:
+        with self._lock, self._conn:
+            (last,) = self._conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM job_events WHERE job_id = ?", (job_id,)).fetchone()
+            self._conn.execute("INSERT INTO job_events VALUES (?, ?, ?, ?)", (job_id, last + 1, event, dumps_str(data)))
+            return last + 1
+
+    def events_after(self, job_id: str, last_event_id: int) -> List[JobEvent]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event_id, event, data FROM job_events WHERE job_id = ? AND event_id > ? ORDER BY event_id",
+                (job_id, last_event_id),
+            ).fetchall()
+        return [(event_id, event, loads(data)) for event_id, event, data in rows]
+
+    def purge(self, older_than: float) -> List[str]:
+        with self._lock, self._conn:
+            stale = [r[0] for r in self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?, ?) AND updated_at < ?", (*TERMINAL_STATES, older_than)
+            )]
+            for job_id in stale:
+                self._conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            return stale
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded pool of worker tasks and fans their events out to subscribers.
+
+    `submit` only enqueues; the work keeps going if the browser disconnects, and
+    `subscribe` replays the stored events after a given id before following new
+    ones, which is what makes `Last-Event-ID` reconnects lossless.
+    """
+
+    def __init__(self, store, workers: int = 4, max_queue: int = 100, retention: float = 3600.0):
+        self.store = store
+        self.workers = workers
+        self.retention = retention
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._conditions: Dict[str, asyncio.Condition] = {}
+        self._versions: Dict[str, int] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._runners: Dict[str, Tuple[JobRunner, Optional[Callable[[], None]]]] = {}
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._worker_tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, *self._running.values(), return_exceptions=True)
+        # Jobs still waiting in the queue never ran; release their resources.
+        for job_id in list(self._runners):
+            self._finish(job_id, CANCELLED)
+
+    def submit(self, runner: JobRunner, meta: Optional[dict] = None, on_done: Optional[Callable[[], None]] = None) -> JobInfo:
+        """Enqueues a job; raises `JobQueueFullError` when the backlog is at capacity."""
+        job = JobInfo(job_id=uuid.uuid4().hex, meta=meta or {})
+        try:
+            self._queue.put_nowait(job.job_id)
+        except asyncio.QueueFull as e:
+            raise JobQueueFullError("Too many documents are queued for processing. Please retry shortly.") from e
+        self.store.create(job)
+        self._runners[job.job_id] = (runner, on_done)
+        self._conditions[job.job_id] = asyncio.Condition()
+        return job
+
+    def get(self, job_id: str) -> JobInfo:
+        job = self.store.get(job_id)
+        if job is None:
+            raise JobNotFoundError(f"Job {job_id} not found.")
+        return job
+
+    def cancel(self, job_id: str) -> JobInfo:
+        job = self.get(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        elif job.status == PENDING:
+            self._finish(job_id, CANCELLED)
+        return self.get(job_id)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def _notify(self, job_id: str) -> None:
+        self._versions[job_id] = self._versions.get(job_id, 0) + 1
+        condition = self._conditions.get(job_id)
+        if condition is not None:
+            async with condition:
+                condition.notify_all()
+
+    def _finish(self, job_id: str, status: str) -> None:
+        self.store.set_status(job_id, status)
+        _, on_done = self._runners.pop(job_id, (None, None))
+        if on_done is not None:
+            on_done()
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.store.get(job_id)
+                if job is None or job.status != PENDING:
+                    continue
+                task = asyncio.create_task(self._run(job_id))
+                self._running[job_id] = task
+                await asyncio.gather(task, return_exceptions=True)
+            finally:
+                self._running.pop(job_id, None)
+                self._queue.task_done()
+                await self._notify(job_id)
+                for stale_id in self.store.purge(time.time() - self.retention):
+                    self._conditions.pop(stale_id, None)
+                    self._versions.pop(stale_id, None)
+
+    async def _run(self, job_id: str) -> None:
+        runner, _ = self._runners[job_id]
+        self.store.set_status(job_id, RUNNING)
+        status = COMPLETED
+        try:
+            async for event, data in runner():
+                self.store.append(job_id, event, data)
+                if event == "error":
+                    status = FAILED
+                await self._notify(job_id)
+        except asyncio.CancelledError:
+            status = CANCELLED
+            self.store.append(job_id, "error", {"error": "Processing was cancelled."})
+        except Exception as e:
+            status = FAILED
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.append(job_id, "error", {"error": f"An error occurred: {e}"})
+        finally:
+            self._finish(job_id, status)
+            await self._notify(job_id)
+
+    async def subscribe(self, job_id: str, last_event_id: int = 0, keepalive: float = 15.0) -> AsyncIterator[Optional[JobEvent]]:
+        """
+        Yields stored events after `last_event_id`, then new ones until the job ends.
+        Yields None after `keepalive` seconds of silence so callers can send a ping.
+        """
+        self.get(job_id)
+        condition = self._conditions.get(job_id)
+        while True:
+            seen = self._versions.get(job_id, 0)
+            events = self.store.events_after(job_id, last_event_id)
+            for event in events:
+                last_event_id = event[0]
+                yield event
+            job = self.store.get(job_id)
+            if job is None or job.status in TERMINAL_STATES:
+                # Drain anything appended between the read above and the status check.
+                for event in self.store.events_after(job_id, last_event_id):
+                    yield event
+                return
+            if condition is None:
+                # Job created by another process (SQLite store): poll instead of waiting.
+                await asyncio.sleep(min(1.0, keepalive))
+                continue
+            try:
+                async with condition:
+                    await asyncio.wait_for(condition.wait_for(lambda: self._versions.get(job_id, 0) != seen), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield None
@@ -0,0 +1,419 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+import google.auth.transport.requests
+import google.oauth2.id_token
+import httpx
+import requests
+from google.auth import jwt as google_jwt
+
+from scripts.extract_and_translate_pipeline import AuthenticationError, PipelineError, logger
+
+# HTTP/2 needs the optional `h2` package; fall back to keep-alive HTTP/1.1 without it.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+T = TypeVar("T")
+
+# ======================================================
+# 🌍 SHARED HTTP CLIENT
+# ======================================================
+def create_http_client(
+    timeout: float = 300.0,
+    connect_timeout: float = 10.0,
+    max_connections: int = 50,
+    max_keepalive: int = 20,
+    keepalive_expiry: float = 60.0,
+    http2: bool = True,
+) -> httpx.AsyncClient:
+    """Long-lived keep-alive client shared by every outbound call; created in the lifespan hook."""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        http2=http2 and HTTP2_AVAILABLE,
+    )
+
+
+# Profiler responses that mean "try again": rate limiting and an overloaded or cold-starting service.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable_profiler_error(error: BaseException) -> bool:
+    """Timeouts, dropped connections and retryable statuses are worth retrying."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+# ======================================================
+# 🎫 CACHED ID TOKENS
+# ======================================================
+def _fetch_id_token(auth_request, audience: str) -> str:
+    return google.oauth2.id_token.fetch_id_token(auth_request, audience)
+
+
+def _token_expiry(token: str) -> float:
+    """Reads `exp` from the (already trusted) token without verifying its signature."""
+    try:
+        return float(google_jwt.decode(token, verify=False)["exp"])
+    except Exception:
+        # Google ID tokens live for an hour; be conservative if the claim is unreadable.
+        return time.time() + 3000
+
+
+class IdTokenCache:
+    """
+    Caches Google-signed ID tokens per audience for service-to-service calls.
+
+    `fetch_id_token` is synchronous and makes a network round trip, so it always
+    runs on a worker thread. A cached token is returned as-is until it gets within
+    `refresh_margin` seconds of expiry; from then on callers still get the current
+    token while a single background task fetches its replacement.
+    """
+
+    def __init__(self, refresh_margin: float = 300.0, fetcher: Callable[[object, str], str] = _fetch_id_token):
+        self.refresh_margin = refresh_margin
+        self._fetcher = fetcher
+        self._auth_request = google.auth.transport.requests.Request(session=requests.Session())
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def _fetch(self, audience: str) -> str:
+        try:
+            token = await asyncio.to_thread(self._fetcher, self._auth_request, audience)
+        except Exception as e:
+            raise AuthenticationError(f"Could not fetch an ID token for {audience}: {e}") from e
+        self._tokens[audience] = (token, _token_expiry(token))
+        logger.info("Fetched a new ID token for the profiling service.")
+        return token
+
+    async def _refresh(self, audience: str) -> None:
+        try:
+            async with self._locks[audience]:
+                await self._fetch(audience)
+        except AuthenticationError as e:
+            logger.warning(f"Background ID token refresh failed: {e}")
+        finally:
+            self._refreshing.pop(audience, None)
+
+    async def get(self, audience: str) -> str:
+        lock = self._locks.setdefault(audience, asyncio.Lock())
+        cached = self._tokens.get(audience)
+        now = time.time()
+        if cached and cached[1] - now > self.refresh_margin:
+            return cached[0]
+        if cached and cached[1] - now > 30:
+            if audience not in self._refreshing:
+                self._refreshing[audience] = asyncio.create_task(self._refresh(audience))
+            return cached[0]
+        async with lock:
+            # Another caller may have refreshed the token while we waited.
+            cached = self._tokens.get(audience)
+            if cached and cached[1] - time.time() > 30:
+                return cached[0]
+            return await self._fetch(audience)
+
+    async def close(self) -> None:
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        self._auth_request.session.close()
+
+
+# ======================================================
+# 🛡️ HEDGED REQUESTS & CIRCUIT BREAKER
+# ======================================================
+class CircuitOpenError(PipelineError): pass
+
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Fails profiler calls fast while the service is unhealthy.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls are
+    refused for `reset_timeout` seconds. Then it goes half-open: up to
+    `half_open_calls` probes are let through, and the first result decides whether
+    it closes again or re-opens. Only used from the event loop, so no locking.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_calls: int = 1):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = max(1, half_open_calls)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def before_call(self) -> None:
+        """Raises `CircuitOpenError` unless a call may go ahead now."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state, self.probes = HALF_OPEN, 0
+            logger.info("Profiler circuit half-open; probing the service.")
+        if self.state == HALF_OPEN and self.probes < self.half_open_calls:
+            self.probes += 1
+            return
+        if self.state != CLOSED:
+            self.rejected += 1
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            raise CircuitOpenError(f"The profiling service is unavailable; retrying it in {retry_in:.0f}s.")
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info("Profiler circuit closed again.")
+        self.state, self.failures = CLOSED, 0
+
+    def record_cancelled(self) -> None:
+        """An abandoned call (e.g. a losing hedge) says nothing about health; frees its probe."""
+        if self.state == HALF_OPEN and self.probes > 0:
+            self.probes -= 1
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.state, self.opened_at = OPEN, time.monotonic()
+            self.trips += 1
+            logger.warning(f"Profiler circuit opened after {self.failures} consecutive failure(s).")
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips, "rejected": self.rejected}
+
+
+class Hedger:
+    """
+    Hedged requests against a long latency tail.
+
+    Once an attempt has been running longer than the `percentile` of recent
+    successful latencies (and at least `min_delay`), a duplicate is sent and the
+    first success wins; the loser is cancelled. Hedges are paid for from a token
+    bucket that earns `budget` tokens per request (capped at `max_tokens`), so at
+    most that share of requests is duplicated, however slow the service gets.
+    Until `min_samples` latencies are known, nothing is hedged.
+    """
+
+    def __init__(
+        self, percentile: float = 95.0, min_delay: float = 2.0, budget: float = 0.1,
+        window: int = 256, min_samples: int = 20, max_tokens: float = 10.0,
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._tokens = 0.0
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def observe(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+
+    def delay(self) -> Optional[float]:
+        """How long to wait before hedging, or None while there's too little history."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        rank = min(len(ordered) - 1, max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1))
+        return max(self.min_delay, ordered[rank])
+
+    def _take_token(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    async def call(self, request: Callable[[], Awaitable[T]]) -> T:
+        """Runs `request()`, hedging it with a second `request()` if the first is slow."""
+        self.requests += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.budget)
+        delay = self.delay()
+        tasks = [asyncio.ensure_future(request())]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._take_token():
+                    self.hedges += 1
+                    logger.info(f"Profiler request still running after {delay:.1f}s; sending a hedged duplicate.")
+                    tasks.append(asyncio.ensure_future(request()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        delay = self.delay()
+        return {
+            "requests": self.requests, "hedges": self.hedges, "hedge_wins": self.hedge_wins,
+            "hedge_delay_seconds": round(delay, 3) if delay is not None else None,
+        }
+
+
+# ======================================================
+# 🪟 WINDOWED PROFILING
+# ======================================================
+def plan_profile_windows(text: str, window_chars: int, overlap_chars: int) -> List[Tuple[int, str]]:
+    """
+    Splits text into overlapping `(offset, window)` pairs for parallel profiling.
+
+    Windows end on a paragraph or whitespace boundary where possible, and each
+    one starts `overlap_chars` before the previous end so clauses cut by a
+    boundary are seen whole by at least one window.
+    """
+    if len(text) <= window_chars:
+        return [(0, text)]
+    overlap_chars = min(overlap_chars, window_chars // 2)
+    windows = []
+    start = 0
+    while start < len(text):
+        end = min(start + window_chars, len(text))
+        if end < len(text):
+            floor = start + window_chars // 2
+            cut = text.rfind("\n\n", floor, end)
+            if cut == -1:
+                cut = text.rfind(" ", floor, end)
+            if cut != -1:
+                end = cut
+        windows.append((start, text[start:end]))
+        if end >= len(text):
+            break
+        start = max(end - overlap_chars, start + 1)
+    return windows
+
+
+def _rebase(items: List[dict], offset: int) -> List[dict]:
+    rebased = []
+    for item in items:
+        item = dict(item)
+        for field in ("start", "end"):
+            if isinstance(item.get(field), int):
+                item[field] += offset
+        rebased.append(item)
+    return rebased
+
+
+def _has_offsets(item: dict) -> bool:
+    return isinstance(item.get("start"), int) and isinstance(item.get("end"), int)
+
+
+def _span_length(item: dict) -> int:
+    return item["end"] - item["start"] if _has_offsets(item) else len(item.get("text", "") or "")
+
+
+def _same_finding(a: dict, b: dict, min_overlap: float) -> bool:
+    """Spans from neighbouring windows match if they share a category and mostly overlap."""
+    if a.get("category") != b.get("category"):
+        return False
+    if not (_has_offsets(a) and _has_offsets(b)):
+        return a.get("text") == b.get("text")
+    overlap = min(a["end"], b["end"]) - max(a["start"], b["start"])
+    shorter = min(_span_length(a), _span_length(b))
+    return overlap > 0 and (shorter == 0 or overlap / shorter >= min_overlap)
+
+
+def _same_date(a: dict, b: dict) -> bool:
+    if _has_offsets(a) and _has_offsets(b):
+        return a["start"] == b["start"] and a["end"] == b["end"]
+    return a.get("text") == b.get("text") and (a.get("evidence") or "").strip() == (b.get("evidence") or "").strip()
+
+
+def _drop_overlap_duplicates(
+    per_window: List[List[dict]], regions: List[Tuple[int, int]], same: Callable[[dict, dict], bool]
+) -> List[dict]:
+    """
+    Removes findings reported twice because they fall in the overlap between two
+    windows. Only items touching an overlap region are compared, and of each
+    duplicate pair the longer (then more confident) one is kept.
+    """
+    dropped = set()
+    for k, (region_start, region_end) in enumerate(regions):
+        tail = [c for c in per_window[k] if not _has_offsets(c) or c["end"] > region_start]
+        head = [c for c in per_window[k + 1] if not _has_offsets(c) or c["start"] < region_end]
+        for a in tail:
+            if id(a) in dropped:
+                continue
+            for b in head:
+                if id(b) in dropped:
+                    continue
+                if same(a, b):
+                    rank_a = (_span_length(a), a.get("confidence", 0))
+                    rank_b = (_span_length(b), b.get("confidence", 0))
+                    dropped.add(id(b) if rank_a >= rank_b else id(a))
+                    if id(a) in dropped:
+                        break
+    return [item for items in per_window for item in items if id(item) not in dropped]
+
+
+def window_fragment(windows: List[Tuple[int, str]], k: int, profile: dict) -> dict:
+    """
+    Window `k`'s profile, rebased onto the full text and cut to the range the window
+    owns (overlaps are split at their midpoint), so fragments from different windows
+    can be refined incrementally without double-counting the overlaps. Findings
+    without offsets are kept as they are. `merge_window_profiles` stays the source
+    of the final profile.
+    """
+    offset, text = windows[k]
+    own_start = 0 if k == 0 else (offset + windows[k - 1][0] + len(windows[k - 1][1])) // 2
+    own_end = None if k == len(windows) - 1 else (windows[k + 1][0] + offset + len(text)) // 2
+
+    def owned(item: dict) -> bool:
+        return not _has_offsets(item) or (item["start"] >= own_start and (own_end is None or item["start"] < own_end))
+
+    fragment = {key: value for key, value in profile.items() if key not in ("clauses", "important_dates")}
+    fragment["clauses"] = [c for c in _rebase(profile.get("clauses", []) or [], offset) if owned(c)]
+    fragment["important_dates"] = [d for d in _rebase(profile.get("important_dates", []) or [], offset) if owned(d)]
+    return fragment
+
+
+def merge_window_profiles(windows: List[Tuple[int, str]], profiles: List[dict], min_overlap: float = 0.5) -> dict:
+    """
+    Combines per-window profiler responses into one profile for the whole text.
+
+    `start`/`end` offsets of clauses and dates are rebased onto the full document,
+    duplicates from the overlaps are removed, and document-level fields are taken
+    from the first window that reports them.
+    """
+    if len(windows) == 1 and windows[0][0] == 0:
+        return profiles[0]
+    merged: dict = {}
+    statutes: List = []
+    clauses, dates = [], []
+    for (offset, _), profile in zip(windows, profiles):
+        for key, value in profile.items():
+            if key not in ("clauses", "important_dates", "statutes_or_codes") and merged.get(key) is None:
+                merged[key] = value
+        clauses.append(_rebase(profile.get("clauses", []) or [], offset))
+        dates.append(_rebase(profile.get("important_dates", []) or [], offset))
+        for statute in profile.get("statutes_or_codes", []) or []:
+            if statute not in statutes:
+                statutes.append(statute)
+
+    regions = [(windows[k + 1][0], windows[k][0] + len(windows[k][1])) for k in range(len(windows) - 1)]
+    merged["clauses"] = _drop_overlap_duplicates(clauses, regions, lambda a, b: _same_finding(a, b, min_overlap))
+    merged["important_dates"] = _drop_overlap_duplicates(dates, regions, _same_date)
+    merged["statutes_or_codes"] = statutes
+    return merged
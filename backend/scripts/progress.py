@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from scripts.extract_and_translate_pipeline import ProgressCallback
+
+# ======================================================
+# 📊 PIPELINE PROGRESS REPORTING
+# ======================================================
+STAGE_MESSAGES = {
+    "extraction": "Extracted {done} of {total} page(s)",
+    "translation": "Translated {done} of {total} chunk(s)",
+    "profiling": "Profiled {done} of {total} window(s)",
+}
+
+
+class ProgressReporter:
+    """
+    Collects progress from pipeline stages and hands it to the SSE generator.
+
+    Stages get a plain `callback(done, total)` that is safe to call from worker
+    threads, and can `publish` other events (e.g. partial results); `follow(task)`
+    then yields `(event, data)` pairs while the stage's task runs, so the stream
+    reports real work instead of sleeping between steps.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._stage_started: Dict[str, float] = {}
+
+    def start(self, stage: str) -> None:
+        self._stage_started[stage] = time.perf_counter()
+
+    def elapsed(self, stage: str) -> float:
+        return round(time.perf_counter() - self._stage_started.get(stage, time.perf_counter()), 3)
+
+    def callback(self, stage: str) -> ProgressCallback:
+        template = STAGE_MESSAGES.get(stage, "{done} of {total}")
+
+        def report(done: int, total: int) -> None:
+            event = {
+                "stage": stage,
+                "message": template.format(done=done, total=total),
+                "progress": int(100 * done / total) if total else 100,
+                "done": done,
+                "total": total,
+                "elapsed_seconds": self.elapsed(stage),
+            }
+            self.publish("progress", event)
+
+        return report
+
+    def cached(self, stage: str) -> None:
+        """Reports a stage whose result came from the result cache as complete."""
+        self.publish("progress", {
+            "stage": stage, "message": "Loaded from cache", "progress": 100, "done": 1, "total": 1,
+            "elapsed_seconds": self.elapsed(stage), "cached": True,
+        })
+
+    def publish(self, event: Optional[str], data: dict) -> None:
+        """Queues an arbitrary SSE event; safe to call from worker threads."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (event, data))
+
+    async def follow(self, task: asyncio.Task) -> AsyncIterator[Tuple[Optional[str], dict]]:
+        """Yields queued events until `task` finishes; cancels it if the consumer goes away."""
+        try:
+            while not task.done():
+                getter = asyncio.ensure_future(self._queue.get())
+                done, _ = await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            # Events reported just before the task finished.
+            while not self._queue.empty():
+                yield self._queue.get_nowait()
+        finally:
+            if not task.done():
+                task.cancel()
@@ -1,6 +1,12 @@
-import json, re
+import json, re, threading
+from bisect import bisect_right
 from collections import defaultdict, Counter
-from datetime import date
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 from dateutil import parser as dtp
 
 # --- Refinement Script Logic (Copied from your file) ---
@@ -9,6 +15,7 @@ from dateutil import parser as dtp
 MIN_SPAN_CONF = 0.55
 MIN_SPAN_LEN = 25
 MERGE_GAP_CHARS = 8
+DATE_CACHE_SIZE = 4096
 
 DATE_ROLE_PATTERNS = [
     ("EFFECTIVE_START",  r"\beffective\s+from\b|\bcomes?\s+into\s+force\b|\bcommence(?:s|ment)\b", 2.0),
@@ -36,58 +43,219 @@ BUCKETS = {
     "cross_references": {"Cross_Reference"},
 }
 
-DATE_TEXT_REGEX = re.compile(r"\b(\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4}|\d{1,2}\s*[/-]\s*\d{1,2}\s*[/-]\s*\d{2,4}|[A-Za-z]{3,9}\s+\d{4}|\d{4})\b")
+# category -> bucket names (in BUCKETS order), so bucketing is one lookup per clause
+CATEGORY_BUCKETS = {}
+for _bucket, _cats in BUCKETS.items():
+    for _cat in _cats:
+        CATEGORY_BUCKETS.setdefault(_cat, []).append(_bucket)
 
-def _norm_space(s): return re.sub(r"\s+", " ", s).strip()
+# One scan finds every role: the lookahead matches at each position without consuming text,
+# so overlapping phrases from different roles are all seen, like separate searches would.
+DATE_ROLE_REGEX = re.compile(
+    "(?=" + "|".join(f"(?P<{role}>{pat})" for role, pat, _ in DATE_ROLE_PATTERNS) + ")"
+)
+DUE_REGEX = re.compile(r"\bdue\b|\bdeadline\b")
 
-def robust_parse_date(txt):
+# Date mentions in evidence, by how much they pin down: a full date, a month and year, or a bare year.
+DATE_TEXT_REGEX = re.compile(
+    r"\b(?:(?P<full>\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4}|\d{1,2}\s*[/-]\s*\d{1,2}\s*[/-]\s*\d{2,4})"
+    r"|(?P<month>(?P<month_name>[A-Za-z]{3,9})\s+\d{4})|(?P<year>\d{4}))\b"
+)
+BARE_YEAR_REGEX = re.compile(r"\d{4}")
+
+# Same result as re.sub(r"\s+", " ", s).strip(): `\s` and str.split() share one definition of whitespace.
+def _norm_space(s): return " ".join(s.split())
+
+# --- Date resolution ---
+MONTHS = {
+    name: i
+    for i, full in enumerate(
+        ["january", "february", "march", "april", "may", "june", "july",
+         "august", "september", "october", "november", "december"], start=1)
+    for name in (full, full[:3])
+}
+MONTHS["sept"] = 9
+
+ISO_DATE_REGEX = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+NUMERIC_DATE_REGEX = re.compile(r"(\d{1,2})\s*[/.-]\s*(\d{1,2})\s*[/.-]\s*(\d{4})")
+LONG_DATE_REGEX = re.compile(r"(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?([A-Za-z]{3,9})\.?,?\s+(\d{4})", re.IGNORECASE)
+
+def _strict_parse_date(txt) -> Optional[date]:
+    """ISO, dd/mm/yyyy and "12 March 2024" forms; None if the text is anything else."""
     try:
-        d = dtp.parse(txt, dayfirst=True, fuzzy=True, default=date(1900,1,1))
-        if d.year < 1900 or d.year > 2100: return None
-        return d.date().isoformat()
-    except Exception:
+        if m := ISO_DATE_REGEX.fullmatch(txt):
+            return date(int(m[1]), int(m[2]), int(m[3]))
+        if m := NUMERIC_DATE_REGEX.fullmatch(txt):
+            return date(int(m[3]), int(m[2]), int(m[1]))
+        if (m := LONG_DATE_REGEX.fullmatch(txt)) and m[2].lower() in MONTHS:
+            return date(int(m[3]), MONTHS[m[2].lower()], int(m[1]))
+    except ValueError:
+        pass  # e.g. 13/31/2024: let dateutil decide.
+    return None
+
+# dateutil fills fields the text doesn't give from its `default`; a year no real date has
+# marks text without a year token ("clause 4", "within 30 days"), which is not a date.
+NO_YEAR = datetime(1, 1, 1)
+
+def robust_parse_date(txt):
+    """
+    Resolves a date string to ISO format, or None. Strict formats are tried first and
+    dateutil's fuzzy parser only when they fail; results are memoized because the
+    same dates recur throughout a document.
+    """
+    if not isinstance(txt, str):  # Profilers occasionally return lists or dicts, which can't be cache keys.
         return None
+    return _parse_date_cached(txt)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date_cached(txt):
+    d = _strict_parse_date(txt.strip())
+    if d is None:
+        try:
+            parsed = dtp.parse(txt, dayfirst=True, fuzzy=True, default=NO_YEAR)
+        except Exception:
+            return None
+        if parsed.year == NO_YEAR.year:
+            return None
+        d = parsed.date()
+    if d.year < 1900 or d.year > 2100: return None
+    return d.isoformat()
 
 def choose_date_role(date_item):
     text = date_item.get("evidence","") + " " + date_item.get("context","")
     section = date_item.get("section")
     score = Counter()
     window = text.lower()
-    for role, pat, w in DATE_ROLE_PATTERNS:
-        if re.search(pat, window):
+    found = {m.lastgroup for m in DATE_ROLE_REGEX.finditer(window)}
+    for role, _, w in DATE_ROLE_PATTERNS:  # pattern order keeps most_common()'s tie-breaking
+        if role in found:
             score[role] += w
     if section in SECTION_PRIORS:
         for role, w in SECTION_PRIORS[section].items():
             score[role] += w
     if not score:
-        if re.search(r"\bdue\b|\bdeadline\b", window): return "FILING_DEADLINE", 0.5
+        if DUE_REGEX.search(window): return "FILING_DEADLINE", 0.5
         return "EFFECTIVE_START", 0.4
     role, s = score.most_common(1)[0]
     conf = min(0.5 + 0.1*s, 0.95)
     return role, conf
 
+# --- Columnar span engine ---
+@dataclass
+class SpanColumns:
+    """
+    Clauses that passed `filter_spans`, stored column-wise: numeric fields as numpy
+    arrays, section/category as integer codes, plus each clause's normalised text
+    (computed once and reused by merging and bucketing).
+    """
+    rows: List[dict]
+    text: List[str]
+    start: np.ndarray
+    end: np.ndarray
+    section: np.ndarray
+    category: np.ndarray
+
+    def __len__(self): return len(self.rows)
+
+
+def _codes(values):
+    """Integer codes whose order follows the sorted order of the distinct values."""
+    index = {v: i for i, v in enumerate(sorted(set(values)))}
+    return np.fromiter((index[v] for v in values), dtype=np.int64, count=len(values))
+
+
+def _columns(rows, texts) -> SpanColumns:
+    return SpanColumns(
+        rows=rows,
+        text=texts,
+        start=np.array([c["start"] for c in rows]),
+        end=np.array([c["end"] for c in rows]),
+        section=_codes([c.get("section", "") for c in rows]),
+        category=_codes([c.get("category", "") for c in rows]),
+    )
+
+
+def span_columns(clauses) -> SpanColumns:
+    """Applies the confidence/length filter and lays the surviving clauses out as columns."""
+    conf = np.fromiter((c.get("confidence", 0) for c in clauses), dtype=np.float64, count=len(clauses))
+    # `~(conf < x)` rather than `conf >= x` so a NaN confidence is kept, as the scalar check did.
+    candidates = np.flatnonzero(~(conf < MIN_SPAN_CONF)).tolist()
+    texts = [_norm_space(clauses[i].get("text", "")) for i in candidates]
+    long_enough = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) >= MIN_SPAN_LEN
+    keep = np.flatnonzero(long_enough).tolist()
+    return _columns([clauses[candidates[i]] for i in keep], [texts[i] for i in keep])
+
+
+def _sweep(members, rows):
+    """
+    Groups `members` (row indices of one section/category, sorted by start/end) into
+    runs whose spans are at most MERGE_GAP_CHARS apart: [member indices, end, confidence].
+    """
+    runs = []
+    for i in members:
+        row = rows[i]
+        if runs and row["start"] - runs[-1][1] <= MERGE_GAP_CHARS:
+            run = runs[-1]
+            run[0].append(i)
+            run[1] = max(run[1], row["end"])
+            run[2] = max(run[2], row.get("confidence", 0))
+        else:
+            runs.append([[i], row["end"], row["confidence"]])
+    return runs
+
+
+def _emit_run(run, rows, texts):
+    """Builds a run's merged clause; its text is joined once here rather than span by span."""
+    members, end, conf = run
+    out = dict(rows[members[0]])
+    if len(members) == 1:
+        return out, texts[members[0]]
+    text = " ".join(t for t in (texts[m] for m in members) if t)
+    out["text"], out["end"], out["confidence"] = text, end, conf
+    return out, text
+
+
+def merge_span_columns(cols: SpanColumns):
+    """
+    Merges same section/category spans at most MERGE_GAP_CHARS apart in a single sweep.
+    Returns the merged clause dicts and their normalised texts.
+    """
+    if not len(cols):
+        return [], []
+    # np.lexsort is stable and sorts by its last key first.
+    order = np.lexsort((cols.end, cols.start, cols.category, cols.section))
+    section, category = cols.section[order], cols.category[order]
+    cuts = np.flatnonzero((section[1:] != section[:-1]) | (category[1:] != category[:-1])) + 1
+    merged, texts = [], []
+    for group in np.split(order, cuts):
+        for run in _sweep(group.tolist(), cols.rows):
+            out, text = _emit_run(run, cols.rows, cols.text)
+            merged.append(out)
+            texts.append(text)
+    return merged, texts
+
+
+def bucketize_columns(merged, texts):
+    """Buckets merged clauses via CATEGORY_BUCKETS; `texts` are the clauses' normalised texts."""
+    res = {k: [] for k in BUCKETS}
+    seen = {k: set() for k in BUCKETS}
+    for cl, text in zip(merged, texts):
+        if not text:
+            continue
+        for b in CATEGORY_BUCKETS.get(cl.get("category"), ()):
+            if text not in seen[b]:
+                seen[b].add(text)
+                res[b].append(text)
+    return res
+
+
+# --- List-of-dicts entry points (kept for callers of the original API) ---
 def filter_spans(clauses):
-    cleaned = []
-    for c in clauses:
-        if c.get("confidence", 0) < MIN_SPAN_CONF: continue
-        if len(_norm_space(c.get("text",""))) < MIN_SPAN_LEN: continue
-        cleaned.append(c)
-    return cleaned
+    return span_columns(clauses).rows
 
 def merge_adjacent_spans(spans):
-    spans = sorted(spans, key=lambda x: (x.get("section",""), x.get("category",""), x["start"], x["end"]))
-    out = []
-    for s in spans:
-        if out and \
-           out[-1]["section"] == s["section"] and \
-           out[-1]["category"] == s["category"] and \
-           s["start"] - out[-1]["end"] <= MERGE_GAP_CHARS:
-            out[-1]["text"] = _norm_space(out[-1]["text"] + " " + s["text"])
-            out[-1]["end"]  = max(out[-1]["end"], s["end"])
-            out[-1]["confidence"] = max(out[-1]["confidence"], s.get("confidence",0))
-        else:
-            out.append(dict(s))
-    return out
+    spans = list(spans)
+    return merge_span_columns(_columns(spans, [_norm_space(c.get("text", "")) for c in spans]))[0]
 
 def dedupe_keep_longer(items):
     seen = set(); out=[]
@@ -98,16 +266,7 @@ def dedupe_keep_longer(items):
     return out
 
 def bucketize(items):
-    res = {k:[] for k in BUCKETS}
-    for cl in items:
-        cat = cl.get("category")
-        text = _norm_space(cl.get("text",""))
-        for b, cats in BUCKETS.items():
-            if cat in cats and text:
-                res[b].append(text)
-    for b in res:
-        res[b] = dedupe_keep_longer(res[b])
-    return res
+    return bucketize_columns(items, [_norm_space(cl.get("text","")) for cl in items])
 
 def select_doc_type(doc_type, clauses, statutes):
     if doc_type: return doc_type
@@ -116,29 +275,32 @@ def select_doc_type(doc_type, clauses, statutes):
     if "policy" in text_blob and "compliance" in text_blob: return "Compliance Policy"
     return "Legal Summary"
 
-def refine(profile):
-    doc_type = profile.get("document_type")
-    statutes = profile.get("statutes_or_codes", [])
-    juris = profile.get("jurisdiction")
-    clauses = profile.get("clauses", [])
-    raw_dates = profile.get("important_dates", [])
-    
-    keep = filter_spans(clauses)
-    merged = merge_adjacent_spans(keep)
-    
-    dates = []
-    for d in raw_dates:
-        txt = d.get("text","")
-        iso = robust_parse_date(txt) or d.get("iso")
-        evid = d.get("evidence","") or ""
-        m = DATE_TEXT_REGEX.search(evid)
-        if m:
-            iso_from_evid = robust_parse_date(m.group(0))
-            if iso_from_evid: iso = iso_from_evid
-        role, conf = choose_date_role({"evidence": evid, "section": d.get("section"), "context": ""})
-        dates.append({"text": txt, "iso": iso, "role": role, "confidence": round(conf,3), "evidence": _norm_space(evid)[:240]})
-        
-    buckets = bucketize(merged)
+def _date_from_evidence(evid):
+    """The most specific date mentioned in the evidence: a full date first, then a month and year."""
+    full = month = None
+    for m in DATE_TEXT_REGEX.finditer(evid):
+        if m["full"] and full is None:
+            full = m["full"]
+        elif m["month"] and month is None and m["month_name"].lower() in MONTHS:
+            month = m["month"]
+    # A bare year is usually a statute's ("Code on Wages, 2019"), not the date itself.
+    for candidate in (full, month):
+        if candidate and (iso := robust_parse_date(candidate)):
+            return iso
+    return None
+
+def refine_date(d):
+    txt = d.get("text","")
+    evid = d.get("evidence","") or ""
+    # The profiler's own date comes first. A lone year would resolve to 1 January, so it
+    # never stands in for a date.
+    parsed = None if BARE_YEAR_REGEX.fullmatch(str(txt).strip()) else robust_parse_date(txt)
+    iso = d.get("iso") or parsed or _date_from_evidence(evid)
+    role, conf = choose_date_role({"evidence": evid, "section": d.get("section"), "context": ""})
+    return {"text": txt, "iso": iso, "role": role, "confidence": round(conf,3), "evidence": _norm_space(evid)[:240]}
+
+def _assemble(doc_type, juris, statutes, merged, merged_texts, dates, spans_dropped):
+    buckets = bucketize_columns(merged, merged_texts)
     
     scope_clause = next((c for c in merged if c["category"] in ("Definitions","Applicability")), None)
     legal_context = {"scope": _norm_space(scope_clause["text"]) if scope_clause else None, "exemptions": None}
@@ -158,7 +320,7 @@ def refine(profile):
             "source_quality": {
                 "mean_span_confidence": round(mean_conf,3),
                 "spans_used": len(merged),
-                "spans_dropped": len(clauses) - len(keep)
+                "spans_dropped": spans_dropped
             }
         }
     }
@@ -167,4 +329,107 @@ def refine(profile):
             del out[k]
     return out
 
+def refine(profile):
+    clauses = profile.get("clauses", [])
+    keep = span_columns(clauses)
+    merged, merged_texts = merge_span_columns(keep)
+    dates = [refine_date(d) for d in profile.get("important_dates", [])]
+    return _assemble(
+        profile.get("document_type"), profile.get("jurisdiction"), profile.get("statutes_or_codes", []),
+        merged, merged_texts, dates, len(clauses) - len(keep),
+    )
+
+# --- Incremental refinement ---
+class _SpanGroup:
+    """Kept spans of one (section, category), in merge order, with their cached runs."""
+
+    def __init__(self):
+        self.keys: List[tuple] = []      # (start, end, arrival seq), sorted
+        self.members: List[int] = []     # row index per key
+        self.run_starts: List[int] = []  # position in `keys` where each run begins
+        self.outputs: List[tuple] = []   # (merged clause, normalised text) per run
+
+    def add(self, key: tuple, row_index: int) -> int:
+        pos = bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.members.insert(pos, row_index)
+        return pos
+
+    def remerge(self, first_changed: int, rows, texts) -> None:
+        """Re-sweeps from the run that precedes the first inserted span; earlier runs cannot change."""
+        r = max(bisect_right(self.run_starts, first_changed - 1) - 1, 0)
+        resume = self.run_starts[r] if r < len(self.run_starts) else 0
+        del self.run_starts[r:], self.outputs[r:]
+        pos = resume
+        for run in _sweep(self.members[resume:], rows):
+            self.run_starts.append(pos)
+            self.outputs.append(_emit_run(run, rows, texts))
+            pos += len(run[0])
+
+
+class IncrementalRefiner:
+    """
+    Builds the refined profile from profile fragments as they arrive.
+
+    `add(fragment)` takes a partial profile (clauses and dates for a range of the
+    document, offsets relative to the whole text). Clauses are filtered and dates
+    resolved once; merged runs are only re-swept from where new spans land. A
+    `snapshot()` equals `refine()` of the fragments seen so far, combined the way
+    `merge_window_profiles` does: clauses and dates concatenated in arrival order,
+    the first non-empty document-level field, and the union of statutes.
+    Safe to use from worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fields: Dict[str, object] = {}
+        self._statutes: List = []
+        self._rows: List[dict] = []
+        self._texts: List[str] = []
+        self._groups: Dict[Tuple, _SpanGroup] = {}
+        self._dates: List[dict] = []
+        self._clauses_seen = 0
+        self.fragments = 0
+
+    def add(self, fragment: dict) -> None:
+        clauses = fragment.get("clauses", []) or []
+        keep = span_columns(clauses)
+        dates = [refine_date(d) for d in fragment.get("important_dates", []) or []]
+        with self._lock:
+            self.fragments += 1
+            for field in ("document_type", "jurisdiction"):
+                if self._fields.get(field) is None:
+                    self._fields[field] = fragment.get(field)
+            for statute in fragment.get("statutes_or_codes", []) or []:
+                if statute not in self._statutes:
+                    self._statutes.append(statute)
+            self._clauses_seen += len(clauses)
+            self._dates.extend(dates)
+
+            first_changed: Dict[Tuple, int] = {}
+            for row, text in zip(keep.rows, keep.text):
+                index = len(self._rows)
+                self._rows.append(row)
+                self._texts.append(text)
+                group_key = (row.get("section", ""), row.get("category", ""))
+                group = self._groups.setdefault(group_key, _SpanGroup())
+                pos = group.add((row["start"], row["end"], index), index)
+                # Later inserts can shift an earlier one right, never left of it.
+                first_changed[group_key] = min(first_changed.get(group_key, pos), pos)
+            for group_key, pos in first_changed.items():
+                self._groups[group_key].remerge(pos, self._rows, self._texts)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            merged, merged_texts = [], []
+            for group_key in sorted(self._groups):
+                for out, text in self._groups[group_key].outputs:
+                    merged.append(out)
+                    merged_texts.append(text)
+            spans_dropped = self._clauses_seen - len(self._rows)
+            return _assemble(
+                self._fields.get("document_type"), self._fields.get("jurisdiction"), list(self._statutes),
+                merged, merged_texts, list(self._dates), spans_dropped,
+            )
+
 # --- End of Refinement Script Logic ---
\ No newline at end of file
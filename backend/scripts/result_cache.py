@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from typing import Any, Optional
+
+from scripts.extract_and_translate_pipeline import logger
+from scripts.serialization import dumps, dumps_str, loads
+
+# ======================================================
+# 🗃️ CONTENT-ADDRESSED RESULT CACHE
+# ======================================================
+# PipelineConfig fields that change a stage's output. Concurrency, retry and chunk-size
+# settings only change how the work is done, so they stay out of the cache keys.
+STAGE_CONFIG_FIELDS = {
+    "extraction": ("project_id", "docai_location", "docai_processor_id", "use_pdf_text_layer", "min_text_layer_chars"),
+    "translation": ("translation_model_name", "translation_chunk_tokens", "skip_english_segments"),
+}
+
+
+def stage_config(config: Any, stage: str) -> dict:
+    """The subset of `config` that shapes `stage`'s output, for `config_fingerprint`."""
+    return {name: getattr(config, name) for name in STAGE_CONFIG_FIELDS[stage]}
+
+
+def config_fingerprint(*parts: Any) -> str:
+    """Stable hash of everything (stage config, model names, profiler params) that changes a result."""
+    normalised = [asdict(p) if is_dataclass(p) else p for p in parts]
+    blob = json.dumps(normalised, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def stage_key(digest: str, stage: str, fingerprint: str) -> str:
+    return hashlib.sha256(f"{digest}:{stage}:{fingerprint}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache for per-stage pipeline outputs (text and JSON-able dicts).
+
+    The memory tier is an LRU bounded by the encoded size of its values; the
+    optional disk tier keeps entries under `disk_dir` and is pruned oldest-first
+    once it grows past `disk_max_bytes`. Every entry expires after `ttl` seconds.
+    Safe to use from worker threads.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 128 * 1024 * 1024,
+        ttl: float = 24 * 3600,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    # --- memory tier ---
+    def _remember(self, key: str, expires_at: float, size: int, value: Any) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def _recall(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    # --- disk tier ---
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                record = loads(fh.read())
+        except (OSError, ValueError):
+            return None
+        if record.get("expires_at", 0) <= time.time():
+            self._unlink(path)
+            return None
+        os.utime(path)  # Refresh recency for oldest-first pruning.
+        return record["expires_at"], record["value"]
+
+    def _write_disk(self, key: str, expires_at: float, encoded: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(f'{{"expires_at": {expires_at}, "value": {encoded}}}')
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk_bytes += os.path.getsize(path)
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._prune_disk()
+
+    def _disk_files(self):
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _prune_disk(self) -> None:
+        """Deletes least recently used files until the disk tier fits its budget again."""
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            self._unlink(path)
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # --- public API ---
+    def get(self, key: str) -> Optional[Any]:
+        value = self._recall(key)
+        if value is None and self.disk_dir:
+            record = self._read_disk(key)
+            if record is not None:
+                expires_at, value = record
+                self._remember(key, expires_at, len(dumps(value)), value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        encoded = dumps_str(value)
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, len(encoded), value)
+        if self.disk_dir:
+            try:
+                self._write_disk(key, expires_at, encoded)
+            except OSError as e:
+                logger.warning(f"Could not write result cache entry to disk: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
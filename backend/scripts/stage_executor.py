@@ -0,0 +1,50 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from scripts.extract_and_translate_pipeline import logger
+
+# ======================================================
+# 🧵 BLOCKING STAGE EXECUTION
+# ======================================================
+class StageExecutor:
+    """
+    Runs the blocking pipeline stages (Document AI, Vertex AI) in a bounded
+    thread pool so they never stall the event loop.
+
+    Each stage name gets its own concurrency limit. When the awaiting task is
+    cancelled (e.g. the SSE client disconnected) the stage's `cancel_event` is
+    set, and the pipeline stops at its next checkpoint instead of finishing work
+    nobody will read.
+    """
+
+    def __init__(self, max_workers: int = 8, stage_limits: Optional[Dict[str, int]] = None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-stage")
+        self._limits = dict(stage_limits or {})
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._default_limit = max_workers
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        if stage not in self._semaphores:
+            self._semaphores[stage] = asyncio.Semaphore(self._limits.get(stage, self._default_limit))
+        return self._semaphores[stage]
+
+    async def run(self, stage: str, fn: Callable, *args, cancel_event: Optional[threading.Event] = None, **kwargs):
+        """Runs `fn(*args, **kwargs)` on a worker thread under the stage's limit."""
+        if cancel_event is not None:
+            kwargs["cancel_event"] = cancel_event
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(stage):
+            future = loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+            try:
+                return await future
+            except asyncio.CancelledError:
+                if cancel_event is not None:
+                    cancel_event.set()
+                logger.info(f"Stage '{stage}' cancelled; worker will stop at its next checkpoint.")
+                raise
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
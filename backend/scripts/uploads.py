@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import UploadFile
+
+from scripts.extract_and_translate_pipeline import (
+    FileProcessingError, PipelineConfig, ProgressCallback, extraction_agent, logger
+)
+
+# ======================================================
+# 📥 SPOOLED UPLOADS
+# ======================================================
+class UploadTooLargeError(FileProcessingError): pass
+
+
+@dataclass
+class SpooledUpload:
+    """An uploaded file copied to a private temp file, read back through a memory map."""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+    @contextmanager
+    def mapped(self):
+        """Yields a read-only memory map of the file (or b"" for an empty upload)."""
+        if self.size == 0:
+            yield b""
+            return
+        with open(self.path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+    def cleanup(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def spool_upload(
+    upload: UploadFile, max_bytes: int, spool_dir: Optional[str] = None, chunk_size: int = 1024 * 1024
+) -> SpooledUpload:
+    """
+    Streams an `UploadFile` to disk in `chunk_size` pieces, hashing as it goes.
+
+    FastAPI closes request files once the endpoint returns, before a streaming
+    response runs, so the pipeline needs its own copy; writing it chunk by chunk
+    keeps at most one chunk of the upload in memory. Raises `UploadTooLargeError`
+    past `max_bytes`.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(upload.filename or "")[1], dir=spool_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds the maximum size of {max_bytes // (1024 * 1024)} MB.")
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    logger.info(f"Spooled upload {upload.filename} ({size} bytes) to {path}.")
+    return SpooledUpload(path=path, filename=upload.filename or "", size=size, sha256=digest.hexdigest())
+
+
+def extract_upload(
+    upload: SpooledUpload, docai_client, config: PipelineConfig, cancel_event: Optional[threading.Event] = None,
+    progress: Optional[ProgressCallback] = None, page_cache: Optional[Any] = None, admission: Optional[Any] = None
+) -> str:
+    """Runs `extraction_agent` over the memory-mapped upload; meant to run on a worker thread."""
+    with upload.mapped() as content:
+        return extraction_agent(
+            content, upload.filename, docai_client, config, cancel_event=cancel_event, progress=progress,
+            page_cache=page_cache, admission=admission
+        )
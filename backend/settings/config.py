@@ -30,6 +30,87 @@ class Settings(BaseSettings):
     APP_NAME: str = "Default App Name"
     MAX_CONNECTIONS: int = 25
 
+    # Shared Document AI / Vertex AI client pool
+    CLIENT_POOL_SIZE: int = 4
+    CLIENT_MAX_AGE_SECONDS: float = 3600.0
+    CLIENT_ACQUIRE_TIMEOUT_SECONDS: float = 30.0
+    CLIENT_HEALTH_CHECK_INTERVAL_SECONDS: float = 300.0
+
+    # Thread pool for the blocking pipeline stages, with per-stage limits
+    STAGE_EXECUTOR_MAX_WORKERS: int = 16
+    EXTRACTION_CONCURRENCY: int = 4
+    TRANSLATION_CONCURRENCY: int = 4
+    # Forward translated text to the event stream as `translation_delta` events while it is generated
+    STREAM_TRANSLATION: bool = True
+
+    # Admission control: concurrent calls per backend across all jobs, and how many more may
+    # wait for a slot before new uploads are turned away with 429
+    DOCAI_MAX_CONCURRENT_CALLS: int = 8
+    GEMINI_MAX_CONCURRENT_CALLS: int = 8
+    PROFILER_MAX_CONCURRENT_CALLS: int = 8
+    BACKEND_MAX_WAITING_CALLS: int = 64
+    # Retries for transient profiler errors, with jittered exponential backoff
+    PROFILER_MAX_RETRIES: int = 2
+    PROFILER_RETRY_BACKOFF_SECONDS: float = 1.0
+    # Hedged profiler requests: a duplicate is sent once an attempt outlives this percentile of
+    # recent latencies (never sooner than the minimum delay), for at most PROFILER_HEDGE_BUDGET of requests
+    PROFILER_HEDGING_ENABLED: bool = True
+    PROFILER_HEDGE_PERCENTILE: float = 95.0
+    PROFILER_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    PROFILER_HEDGE_BUDGET: float = 0.1
+    # The profiler circuit opens after this many consecutive failures and is probed again after the cooldown
+    PROFILER_BREAKER_FAILURE_THRESHOLD: int = 5
+    PROFILER_BREAKER_RESET_SECONDS: float = 30.0
+
+    # JSON encoding for responses, SSE events and stored results ("auto": orjson when installed, else "json")
+    JSON_SERIALIZER: str = "auto"
+
+    # Negotiated gzip / brotli (when installed) compression of JSON and SSE responses; streams flush per event
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 500
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+
+    # Content-addressed cache of per-stage results (memory LRU + optional disk tier)
+    RESULT_CACHE_MAX_BYTES: int = 128 * 1024 * 1024
+    RESULT_CACHE_TTL_SECONDS: float = 24 * 3600
+    RESULT_CACHE_DIR: Optional[str] = None
+    RESULT_CACHE_DISK_MAX_BYTES: int = 1024 * 1024 * 1024
+
+    # Uploads are spooled to disk (UPLOAD_SPOOL_DIR, default: system temp dir) up to this size
+    MAX_UPLOAD_BYTES: int = 100 * 1024 * 1024
+    UPLOAD_SPOOL_DIR: Optional[str] = None
+    # Files of one request are processed concurrently, up to this many at a time (at most CLIENT_POOL_SIZE)
+    MAX_FILES_PER_REQUEST: int = 25
+    FILES_PER_REQUEST_CONCURRENCY: int = 8
+
+    # Shared outbound HTTP client and cached service-to-service ID tokens
+    PROFILER_URL: str = "https://doc-profiler-gpu-service-918379302610.asia-southeast1.run.app/profile"
+    PROFILER_TIMEOUT_SECONDS: float = 300.0
+    HTTP_MAX_CONNECTIONS: int = 50
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP2_ENABLED: bool = True
+    ID_TOKEN_REFRESH_MARGIN_SECONDS: float = 300.0
+
+    # Long texts are profiled as overlapping windows sent in parallel
+    PROFILER_WINDOW_CHARS: int = 20000
+    PROFILER_WINDOW_OVERLAP_CHARS: int = 1500
+    PROFILER_MAX_CONCURRENT_WINDOWS: int = 4
+
+    # Per-process caches for /auth/me: decoded app tokens (until their expiry) and user documents
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 300.0
+    # Index the emails of users created before `user_emails` existed (idempotent; skipped once complete)
+    EMAIL_INDEX_BACKFILL_ON_STARTUP: bool = True
+
+    # Background document jobs ("memory" or "sqlite" store for the job/event log)
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_MAX: int = 100
+    JOB_STORE: str = "memory"
+    JOB_STORE_PATH: str = "jobs.sqlite3"
+    JOB_RETENTION_SECONDS: float = 3600.0
+
     google_application_credentials: str
     gcp_project_id: str
     gcp_location_for_docai: str
@@ -0,0 +1,22 @@
+import os
+import sys
+
+# Tests run from backend/, like the app.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Required settings get dummies; nothing here talks to Google. Set before any app module
+# is imported, since `settings` and the Firestore client are created at import time.
+TEST_ENV = {
+    "DATABASE_URL": "unused", "SECRET_KEY": "test-secret-key-of-sufficient-length", "ALGORITHM": "HS256",
+    "GOOGLE_CLIENT_ID": "unused", "GOOGLE_CLIENT_SECRET": "unused", "REDIRECT_URI": "http://localhost",
+    "REDIRECT_RESPONSE": "http://localhost", "FRONTEND_URL": '["http://localhost"]',
+    "GOOGLE_APPLICATION_CREDENTIALS": "unused", "GCP_PROJECT_ID": "test", "GCP_LOCATION_FOR_DOCAI": "us",
+    "GCP_LOCATION_For_docai": "us", "DOCAI_PROCESSOR_ID": "test", "GCP_LOCATION_FOR_VERTEXAI": "us",
+    "GCP_LOCATION_For_vertexai": "us", "GOOGLE_CLOUD_PROJECT": "test",
+    # The emulator host keeps the Firestore client from looking up credentials; tests pass in fakes.
+    "FIRESTORE_EMULATOR_HOST": "localhost:8681",
+    "EMAIL_INDEX_BACKFILL_ON_STARTUP": "false",
+}
+
+for name, value in TEST_ENV.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,63 @@
+"""Small hand-built PDFs for the extraction tests."""
+import io
+from typing import List, Optional
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+TEXT = "Every establishment in the State shall display the notice under section 12 of this Act."
+
+
+def text_page(text: str = TEXT) -> bytes:
+    return b"BT /F1 10 Tf 54 740 Td (" + text.encode("latin-1") + b") Tj ET"
+
+
+def image_page() -> bytes:
+    return b"q 400 0 0 400 100 200 cm /Im0 Do Q"
+
+
+def inline_image_page() -> bytes:
+    return b"q 400 0 0 400 100 200 cm BI /W 2 /H 2 /CS /G /BPC 8 ID \x00\xff\xff\x00 EI Q"
+
+
+def vector_page() -> bytes:
+    # Glyphs drawn as filled paths, as some exporters do with "text to outlines".
+    return b"0 0 0 rg 100 700 m 120 740 l 140 700 l h f 150 700 m 150 740 l 170 740 l 170 700 l h f"
+
+
+def make_pdf(pages: List[bytes], images: Optional[List[str]] = None, compress: bool = False) -> bytes:
+    """
+    A PDF with one page per content stream. Every page gets Helvetica and an 8x8 image
+    `/Im0` whose pixels come from `images[n]` (default: the page number).
+    """
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for number, content in enumerate(pages):
+        page = writer.add_blank_page(612, 792)
+        image = DecodedStreamObject()
+        pixels = images[number] if images else f"image{number}"
+        image.set_data(pixels.encode("ascii")[:64].ljust(64, b"\0"))
+        image.update({
+            NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(8), NameObject("/Height"): NumberObject(8),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"), NameObject("/BitsPerComponent"): NumberObject(8),
+        })
+        resources = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+        if b"/Im0" in content:
+            resources[NameObject("/XObject")] = DictionaryObject({NameObject("/Im0"): writer._add_object(image)})
+        page[NameObject("/Resources")] = resources
+        stream = DecodedStreamObject()
+        stream.set_data(content)
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        if compress:
+            page.compress_content_streams()
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def read_pages(pdf: bytes):
+    return PdfReader(io.BytesIO(pdf)).pages
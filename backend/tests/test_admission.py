@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from scripts.admission import AdmissionController
+
+
+def _hold(admission: AdmissionController, backend: str, entered: threading.Event, release: threading.Event):
+    with admission.slot(backend):
+        entered.set()
+        release.wait(5)
+
+
+def _saturate(admission: AdmissionController, backend: str):
+    """Fills the backend's only slot and its wait queue; returns the waiter's entry event and the release switch."""
+    release = threading.Event()
+    holding, waiting = threading.Event(), threading.Event()
+    threads = [threading.Thread(target=_hold, args=(admission, backend, holding, release))]
+    threads[0].start()
+    assert holding.wait(5)
+    threads.append(threading.Thread(target=_hold, args=(admission, backend, waiting, release)))
+    threads[1].start()
+    while admission.stats()["backends"][backend]["queue_depth"] < 1:
+        time.sleep(0.01)
+    return threads, waiting, release
+
+
+def test_saturated_backend_turns_uploads_away_but_lets_queued_calls_finish():
+    admission = AdmissionController({"docai": 1}, {}, max_waiting=1)
+    threads, waiting, release = _saturate(admission, "docai")
+
+    retry_after = admission.retry_after()
+    assert retry_after is not None and retry_after >= 1
+    assert not waiting.is_set()
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    # Work that was already queued got its slot; nothing was dropped.
+    assert waiting.is_set()
+    assert admission.retry_after() is None
+    stats = admission.stats()["backends"]["docai"]
+    assert stats["admitted"] == 2 and stats["rejected_uploads"] == 1 and stats["in_flight"] == 0
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    async def scenario():
+        admission = AdmissionController({}, {"profiler": 1}, max_waiting=1)
+        async with admission.async_slot("profiler"):
+            async def wait_for_slot():
+                async with admission.async_slot("profiler"):
+                    pass
+            waiter = asyncio.create_task(wait_for_slot())
+            await asyncio.sleep(0.01)
+            saturated = admission.retry_after() is not None
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        return saturated, admission.stats()["backends"]["profiler"]
+
+    saturated, stats = asyncio.run(scenario())
+    assert saturated
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0
+
+
+def test_upload_endpoint_answers_429_with_retry_after_while_saturated():
+    admission = AdmissionController({"docai": 1}, {}, max_waiting=1)
+    threads, _, release = _saturate(admission, "docai")
+    main.app.dependency_overrides.update({
+        main.get_admission: lambda: admission,
+        main.get_client_pool: lambda: None,
+        main.get_stage_executor: lambda: None,
+        main.get_result_cache: lambda: None,
+        main.get_job_manager: lambda: None,
+    })
+    try:
+        response = TestClient(main.app).post(
+            "/api/upload_and_stream", files={"files": ("a.pdf", b"%PDF-1.4", "application/pdf")}
+        )
+    finally:
+        main.app.dependency_overrides.clear()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert admission.stats()["rejected_uploads"] == 1
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import main
+from scripts.admission import AdmissionController
+from scripts.client_pool import ClientPool
+from scripts.extract_and_translate_pipeline import PipelineConfig
+from scripts.result_cache import ResultCache
+from scripts.stage_executor import StageExecutor
+from scripts.uploads import SpooledUpload
+
+OCR_SECONDS = 0.2
+
+
+def _slow_extract(upload, docai_client, config, cancel_event=None, progress=None, page_cache=None, admission=None):
+    time.sleep(OCR_SECONDS)
+    return f"Text of {upload.filename}."
+
+
+def _translate(text, model, config, cancel_event=None, progress=None, on_delta=None, admission=None):
+    if on_delta is not None:
+        on_delta(0, text)
+    return text
+
+
+async def _profile(text, progress=None, on_fragment=None):
+    return {"clauses": [], "important_dates": []}
+
+
+def _fake_stages(monkeypatch):
+    monkeypatch.setattr(main, "extract_upload", _slow_extract)
+    monkeypatch.setattr(main, "translate_text", _translate)
+    monkeypatch.setattr(main, "profile_text_remotely", _profile)
+    monkeypatch.setattr(main, "refine", lambda profile: profile)
+
+
+async def _pipeline(pool_size: int = 2):
+    # A wait far shorter than one file's extraction.
+    pool = ClientPool(
+        PipelineConfig.from_env(), size=pool_size, acquire_timeout=OCR_SECONDS / 4,
+        factory=lambda config, credentials: (object(), object()), authenticator=lambda config: None,
+    )
+    await pool.start()
+    return pool, StageExecutor(max_workers=8), ResultCache(max_bytes=1024 * 1024, ttl=60), AdmissionController({}, {})
+
+
+def test_bundle_larger_than_pool_queues_instead_of_failing(monkeypatch):
+    _fake_stages(monkeypatch)
+
+    async def scenario():
+        pool, executor, cache, admission = await _pipeline(pool_size=2)
+
+        async def bundle(name: str):
+            uploads = [SpooledUpload(path="", filename=f"{name}-{i}.pdf", size=0, sha256=f"{name}{i}") for i in range(5)]
+            return [item async for item in main.process_bundle(uploads, pool, executor, cache, admission)]
+
+        # Two bundles at once, as two job workers would run them.
+        try:
+            return await asyncio.gather(bundle("a"), bundle("b"))
+        finally:
+            await pool.close()
+            executor.shutdown()
+
+    for events in asyncio.run(scenario()):
+        assert not [data for event, data in events if event == "file_error"]
+        event, summary = events[-1]
+        assert event == "final_result"
+        assert summary["completed"] == 5 and summary["failed"] == 0
+
+
+def test_cached_stages_replay_their_events(monkeypatch):
+    _fake_stages(monkeypatch)
+    monkeypatch.setattr(main.settings, "STREAM_TRANSLATION", True)
+
+    async def scenario():
+        pool, executor, cache, admission = await _pipeline()
+        upload = SpooledUpload(path="", filename="notice.pdf", size=0, sha256="same-bytes")
+        try:
+            runs = []
+            for _ in range(2):
+                runs.append([item async for item in main.process_document(upload, pool, executor, cache, admission)])
+            return runs
+        finally:
+            await pool.close()
+            executor.shutdown()
+
+    fresh, cached = asyncio.run(scenario())
+    assert fresh[-1] == cached[-1]
+    deltas = [data["delta"] for event, data in cached if event == "translation_delta"]
+    assert deltas == ["Text of notice.pdf."]
+    assert [event for event, _ in cached].count("partial_result") == 1
+    done = {data["stage"] for event, data in cached if event == "progress" and data["progress"] == 100}
+    assert {"extraction", "translation", "profiling"} <= done
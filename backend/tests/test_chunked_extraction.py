@@ -0,0 +1,69 @@
+import io
+import threading
+import time
+from dataclasses import replace
+
+import pytest
+from google.api_core import exceptions as api_exceptions
+from google.cloud import documentai
+from pypdf import PdfReader
+
+from pdf_helpers import image_page, make_pdf
+from scripts.extract_and_translate_pipeline import ExtractionError, PipelineConfig, smart_pdf_agent
+
+
+class ImageEchoDocAI:
+    """
+    'OCRs' each page as the label stored in its image's pixels. The chunk holding
+    page "p0" answers last, so results arrive out of order.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.in_flight = self.peak = 0
+        self.lock = threading.Lock()
+
+    def process_document(self, request):
+        reader = PdfReader(io.BytesIO(request.raw_document.content))
+        labels = [
+            page["/Resources"]["/XObject"]["/Im0"].get_object().get_data().rstrip(b"\0").decode() for page in reader.pages
+        ]
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.2 if "p0" in labels else 0.05)
+        with self.lock:
+            self.in_flight -= 1
+        if self.fail:
+            raise api_exceptions.InvalidArgument("malformed")
+        text, pages = "", []
+        for label in labels:
+            page_text = f"{label}\n"
+            segment = documentai.Document.TextAnchor.TextSegment(start_index=len(text), end_index=len(text) + len(page_text))
+            pages.append(documentai.Document.Page(
+                layout=documentai.Document.Page.Layout(text_anchor=documentai.Document.TextAnchor(text_segments=[segment]))
+            ))
+            text += page_text
+        return documentai.ProcessResponse(document=documentai.Document(text=text, pages=pages))
+
+
+def _config() -> PipelineConfig:
+    return replace(PipelineConfig.from_env(), max_pdf_pages_per_chunk=2, max_concurrent_chunks=3)
+
+
+def test_chunks_run_concurrently_and_reassemble_in_page_order():
+    labels = [f"p{i}" for i in range(7)]
+    docai, timings, reported = ImageEchoDocAI(), [], []
+    text = smart_pdf_agent(
+        make_pdf([image_page()] * 7, images=labels), "scan.pdf", docai, _config(),
+        chunk_timings=timings, progress=lambda done, total: reported.append((done, total)),
+    )
+    assert text.split() == labels
+    assert docai.peak > 1
+    assert [(t.start_page, t.end_page) for t in timings] == [(1, 2), (3, 4), (5, 6), (7, 7)]
+    assert reported[-1] == (7, 7)
+
+
+def test_a_failing_chunk_fails_the_document():
+    with pytest.raises(ExtractionError):
+        smart_pdf_agent(make_pdf([image_page()] * 4), "scan.pdf", ImageEchoDocAI(fail=True), _config())
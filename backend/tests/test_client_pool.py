@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as api_exceptions
+
+from scripts.client_pool import ClientPool, ClientPoolError
+from scripts.extract_and_translate_pipeline import ExtractionError, FileProcessingError, PipelineConfig
+
+
+def _pool(**options) -> ClientPool:
+    return ClientPool(
+        PipelineConfig.from_env(), factory=lambda config, credentials: (object(), object()),
+        authenticator=lambda config: None, **options,
+    )
+
+
+async def _fail_with(pool: ClientPool, error: Exception) -> None:
+    with pytest.raises(type(error)):
+        async with pool.acquire():
+            raise error
+
+
+async def _borrow(pool: ClientPool) -> None:
+    async with pool.acquire(timeout=None):
+        pass
+
+
+def test_bad_input_does_not_retire_clients():
+    async def scenario():
+        pool = _pool(size=1, max_failures=2)
+        await pool.start()
+        for _ in range(3):
+            await _fail_with(pool, FileProcessingError("Could not read PDF. It may be corrupted."))
+        try:
+            raise ExtractionError("Invalid argument") from api_exceptions.InvalidArgument("malformed document")
+        except ExtractionError as e:
+            await _fail_with(pool, e)
+        async with pool.acquire():
+            pass
+        return pool.stats()
+
+    assert asyncio.run(scenario())["recycled"] == 0
+
+
+def test_api_failures_retire_clients():
+    async def scenario():
+        pool = _pool(size=1, max_failures=2)
+        await pool.start()
+        async with pool.acquire() as first:
+            pass
+        for _ in range(2):
+            try:
+                raise ExtractionError("Document AI failed") from api_exceptions.ServiceUnavailable("outage")
+            except ExtractionError as e:
+                await _fail_with(pool, e)
+        async with pool.acquire() as rebuilt:
+            pass
+        return first, rebuilt, pool.stats()
+
+    first, rebuilt, stats = asyncio.run(scenario())
+    assert rebuilt is not first
+    assert stats["recycled"] == 1
+
+
+def test_acquire_times_out_unless_told_to_wait():
+    async def scenario():
+        pool = _pool(size=1, acquire_timeout=0.05)
+        await pool.start()
+        async with pool.acquire():
+            with pytest.raises(ClientPoolError):
+                async with pool.acquire():
+                    pass
+
+            waiter = asyncio.create_task(_borrow(pool))
+            await asyncio.sleep(0.1)
+            assert not waiter.done()
+        await asyncio.wait_for(waiter, timeout=1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,104 @@
+import asyncio
+import gzip
+import zlib
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse, StreamingResponse
+
+from compression import CompressionMiddleware, negotiate_encoding
+from scripts import serialization
+from scripts.serialization import FastJSONResponse
+
+PAYLOAD = {"clauses": [{"text": "The tenant shall pay rent monthly.", "start": i * 40} for i in range(50)]}
+EVENTS = [f"event: progress\ndata: {{\"step\": {i}, \"message\": \"Translating page {i}\"}}\n\n" for i in range(5)]
+
+
+def _app() -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/profile")
+    async def profile():
+        return PAYLOAD
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("x" * 1000, headers={"content-encoding": "identity"})
+
+    return app
+
+
+@pytest.mark.parametrize(("header", "expected"), [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("*", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiation_prefers_brotli(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.mark.parametrize(("encoding", "decompress"), [("gzip", gzip.decompress), ("br", brotli.decompress)])
+def test_json_responses_are_compressed_when_large_enough(encoding, decompress):
+    client = TestClient(_app())
+    with client.stream("GET", "/profile", headers={"Accept-Encoding": encoding}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert serialization.loads(decompress(raw)) == PAYLOAD
+
+    small = client.get("/small", headers={"Accept-Encoding": encoding})
+    assert "content-encoding" not in small.headers and small.json() == {"ok": True}
+    # Already-encoded bodies are passed through untouched.
+    assert client.get("/text", headers={"Accept-Encoding": encoding}).headers["content-encoding"] == "identity"
+
+
+def test_each_sse_event_is_decodable_as_soon_as_it_is_sent():
+    async def event_stream():
+        for event in EVENTS:
+            yield event
+
+    inner = StreamingResponse(event_stream(), media_type="text/event-stream")
+    middleware = CompressionMiddleware(inner, minimum_size=500)
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(middleware(scope, receive, send))
+
+    start, bodies = sent[0], [m["body"] for m in sent[1:] if m["type"] == "http.response.body"]
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for event, body in zip(EVENTS, bodies):
+        assert decoder.decompress(body).decode() == event
+    assert decoder.decompress(b"".join(bodies[len(EVENTS):])) + decoder.flush() == b""
+    assert decoder.eof
+
+
+def test_serializer_can_be_switched_and_extended():
+    previous = serialization.serializer_name()
+    try:
+        assert serialization.use("json") == "json"
+        assert serialization.dumps({"a": "ü"}) == '{"a":"ü"}'.encode()
+        serialization.register("upper", lambda value: b'"UPPER"', lambda data: "upper")
+        assert serialization.use("upper") == "upper"
+        assert FastJSONResponse({"a": 1}).body == b'"UPPER"'
+        with pytest.raises(ValueError):
+            serialization.use("missing")
+    finally:
+        serialization.SERIALIZERS.pop("upper", None)
+        serialization.use(previous)
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from scripts.profiler_client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, Hedger
+
+
+def _warm_hedger(**options) -> Hedger:
+    hedger = Hedger(min_samples=5, min_delay=0.05, **options)
+    for _ in range(5):
+        hedger.observe(0.01)
+    return hedger
+
+
+def test_no_hedging_without_latency_history():
+    hedger = Hedger(min_samples=5)
+    assert hedger.delay() is None
+    for seconds in (0.1, 0.2, 0.3, 0.4, 5.0):
+        hedger.observe(seconds)
+    assert hedger.delay() == 5.0
+
+
+def test_slow_attempt_is_hedged_and_the_fast_duplicate_wins():
+    hedger = _warm_hedger(budget=1.0)
+    started, cancelled = [], []
+
+    async def request():
+        n = len(started)
+        started.append(n)
+        try:
+            await asyncio.sleep(1.0 if n == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        return n
+
+    async def scenario():
+        began = time.perf_counter()
+        result = await hedger.call(request)
+        await asyncio.sleep(0)
+        return result, time.perf_counter() - began
+
+    result, elapsed = asyncio.run(scenario())
+    assert result == 1 and elapsed < 0.5
+    assert cancelled == [0]
+    assert hedger.hedges == 1 and hedger.hedge_wins == 1
+
+
+def test_hedges_stay_within_the_budget():
+    hedger = _warm_hedger(budget=0.25)
+
+    async def request():
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    async def scenario():
+        for _ in range(8):
+            await hedger.call(request)
+
+    asyncio.run(scenario())
+    assert hedger.requests == 8
+    assert hedger.hedges == 2
+
+
+def test_breaker_opens_after_consecutive_failures_and_rejects_fast():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1 and breaker.stats()["trips"] == 1
+
+
+def test_half_open_probe_decides_whether_the_circuit_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05, half_open_calls=1)
+    breaker.before_call()
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time.
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.trips == 2
+
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_cancelled()
+    # An abandoned probe frees its place for the next one.
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
@@ -0,0 +1,90 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from scripts.extract_and_translate_pipeline import AuthenticationError
+from scripts.profiler_client import IdTokenCache
+
+AUDIENCE = "https://profiler.example"
+
+
+def _token(expires_in: float, n: int) -> str:
+    def part(value: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+    return f"{part({'alg': 'RS256', 'typ': 'JWT'})}.{part({'exp': int(time.time() + expires_in), 'n': n})}.c2ln"
+
+
+class Fetcher:
+    """Stands in for `fetch_id_token`: counts calls and records the thread they ran on."""
+
+    def __init__(self, expires_in: float = 3600, delay: float = 0.0, fail: bool = False):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.threads = set()
+
+    def __call__(self, auth_request, audience):
+        self.calls += 1
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("metadata server unreachable")
+        return _token(self.expires_in, self.calls)
+
+
+def test_token_is_fetched_once_off_the_event_loop_and_reused():
+    fetcher = Fetcher(delay=0.05)
+
+    async def scenario():
+        cache = IdTokenCache(fetcher=fetcher)
+        try:
+            tokens = await asyncio.gather(*(cache.get(AUDIENCE) for _ in range(10)))
+            tokens.append(await cache.get(AUDIENCE))
+            return tokens
+        finally:
+            await cache.close()
+
+    tokens = asyncio.run(scenario())
+    assert fetcher.calls == 1
+    assert len(set(tokens)) == 1
+    assert threading.get_ident() not in fetcher.threads
+
+
+def test_token_near_expiry_is_served_while_one_refresh_runs_in_the_background():
+    # Expires in 200 s: inside the 300 s refresh margin, but still usable.
+    fetcher = Fetcher(expires_in=200)
+
+    async def scenario():
+        cache = IdTokenCache(fetcher=fetcher)
+        try:
+            first = await cache.get(AUDIENCE)
+            during = await asyncio.gather(*(cache.get(AUDIENCE) for _ in range(5)))
+            while cache._refreshing:
+                await asyncio.sleep(0.01)
+            calls = fetcher.calls
+            return first, during, await cache.get(AUDIENCE), calls
+        finally:
+            await cache.close()
+
+    first, during, after, calls = asyncio.run(scenario())
+    assert set(during) == {first}
+    assert after != first
+    # One blocking fetch plus one background refresh, however many callers saw the stale token.
+    assert calls == 2
+
+
+def test_fetch_failure_raises_authentication_error():
+    async def scenario():
+        cache = IdTokenCache(fetcher=Fetcher(fail=True))
+        try:
+            await cache.get(AUDIENCE)
+        finally:
+            await cache.close()
+
+    with pytest.raises(AuthenticationError):
+        asyncio.run(scenario())
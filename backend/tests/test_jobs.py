@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from scripts.jobs import (
+    CANCELLED, COMPLETED, FAILED, JobManager, JobQueueFullError, MemoryJobStore, SQLiteJobStore
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryJobStore()
+        return
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+def _runner(events: int, gate: asyncio.Event = None, fail: bool = False):
+    async def run():
+        for i in range(events):
+            if gate is not None and i == events // 2:
+                await gate.wait()
+            yield "progress", {"step": i}
+        if fail:
+            raise RuntimeError("profiler exploded")
+        yield "complete", {"done": True}
+    return run
+
+
+async def _collect(jobs: JobManager, job_id: str, after: int = 0, limit: int = None):
+    seen = []
+    async for item in jobs.subscribe(job_id, after, keepalive=1.0):
+        if item is not None:
+            seen.append(item)
+        if limit is not None and len(seen) == limit:
+            break
+    return seen
+
+
+def test_job_outlives_its_subscriber_and_a_reconnect_resumes_after_the_last_event(store):
+    async def scenario():
+        jobs = JobManager(store, workers=1)
+        jobs.start()
+        gate = asyncio.Event()
+        job = jobs.submit(_runner(6, gate))
+        try:
+            # The browser reads two events and drops the connection.
+            first = await _collect(jobs, job.job_id, limit=2)
+            gate.set()
+            while jobs.get(job.job_id).status != COMPLETED:
+                await asyncio.sleep(0.01)
+            resumed = await _collect(jobs, job.job_id, after=first[-1][0])
+            return first, resumed
+        finally:
+            await jobs.close()
+
+    first, resumed = asyncio.run(scenario())
+    ids = [event_id for event_id, _, _ in first + resumed]
+    assert ids == list(range(1, 8))
+    assert resumed[-1][1:] == ("complete", {"done": True})
+
+
+def test_failed_and_cancelled_jobs_end_their_streams(store):
+    cleaned = []
+
+    async def scenario():
+        jobs = JobManager(store, workers=1)
+        jobs.start()
+        try:
+            failing = jobs.submit(_runner(2, fail=True), on_done=lambda: cleaned.append("failing"))
+            blocked = jobs.submit(_runner(2, asyncio.Event()), on_done=lambda: cleaned.append("blocked"))
+            pending = jobs.submit(_runner(2), on_done=lambda: cleaned.append("pending"))
+            failed_events = await _collect(jobs, failing.job_id)
+            # `pending` is still queued behind `blocked`; cancelling it must not wait for a worker.
+            assert jobs.cancel(pending.job_id).status == CANCELLED
+            while jobs.get(blocked.job_id).status == "pending":
+                await asyncio.sleep(0.01)
+            jobs.cancel(blocked.job_id)
+            cancelled_events = await _collect(jobs, blocked.job_id)
+            return failed_events, cancelled_events, jobs.get(failing.job_id).status, jobs.get(blocked.job_id).status
+        finally:
+            await jobs.close()
+
+    failed_events, cancelled_events, failed_status, cancelled_status = asyncio.run(scenario())
+    assert failed_status == FAILED and failed_events[-1][1] == "error"
+    assert cancelled_status == CANCELLED and cancelled_events[-1][2] == {"error": "Processing was cancelled."}
+    assert sorted(cleaned) == ["blocked", "failing", "pending"]
+
+
+def test_full_queue_rejects_new_jobs():
+    async def scenario():
+        jobs = JobManager(MemoryJobStore(), workers=1, max_queue=1)
+        jobs.submit(_runner(1))
+        with pytest.raises(JobQueueFullError):
+            jobs.submit(_runner(1))
+        await jobs.close()
+
+    asyncio.run(scenario())
+
+
+def test_event_stream_honours_last_event_id():
+    jobs = JobManager(MemoryJobStore(), workers=1)
+
+    async def run_job():
+        jobs.start()
+        job = jobs.submit(_runner(3))
+        await _collect(jobs, job.job_id)
+        await jobs.close()
+        return job.job_id
+
+    job_id = asyncio.run(run_job())
+    main.app.dependency_overrides[main.get_job_manager] = lambda: jobs
+    try:
+        response = TestClient(main.app).get(f"/api/jobs/{job_id}/events", headers={"Last-Event-ID": "2"})
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    ids = [line.split(":", 1)[1].strip() for line in response.text.splitlines() if line.startswith("id:")]
+    assert ids == ["3", "4"]
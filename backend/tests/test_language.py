@@ -0,0 +1,24 @@
+from benchmarks.fakes import FakeBackend, FakeGenerativeModel
+from scripts.extract_and_translate_pipeline import PipelineConfig, language_mix, translate_text
+
+ENGLISH_LINES = (
+    "The employer shall maintain audit records of every transaction for seven years.\n"
+    "Returns are due by the end of July and any contravention shall attract a penalty.\n"
+)
+HINDI_LINE = "नियोक्ता सभी रिकॉर्ड रखेगा।\n"
+
+
+def test_hindi_line_inside_english_block_is_translated():
+    text = ENGLISH_LINES + HINDI_LINE + ENGLISH_LINES  # Single newlines only, as OCR produces.
+    mix = language_mix(text)
+    assert mix["languages"].get("hi", 0) > 0
+    assert mix["translated_segments"] == 1
+
+    model = FakeGenerativeModel(FakeBackend(latency=0, jitter=0))
+    config = PipelineConfig.from_env()
+    assert HINDI_LINE.strip() in translate_text(text, model, config)
+    assert model.calls == 1
+
+
+def test_short_hindi_heading_is_not_taken_for_english():
+    assert language_mix("धारा 5\n" + ENGLISH_LINES)["translated_segments"] == 1
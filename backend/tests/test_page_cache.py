@@ -0,0 +1,61 @@
+from benchmarks.fakes import FakeBackend, FakeDocumentProcessorServiceClient
+from google.cloud import documentai
+from pdf_helpers import image_page, make_pdf, read_pages, text_page
+from scripts.extract_and_translate_pipeline import PipelineConfig, page_fingerprint, smart_pdf_agent
+from scripts.result_cache import ResultCache
+
+
+class CountingDocAI(FakeDocumentProcessorServiceClient):
+    """Records how many pages each request carried."""
+
+    def __init__(self):
+        super().__init__(FakeBackend(latency=0, jitter=0), chars_per_page=60)
+        self.pages_sent = 0
+
+    def process_document(self, request):
+        response = super().process_document(request)
+        self.pages_sent += len(response.document.pages)
+        return response
+
+
+class UnsplittableDocAI:
+    """Answers with text but no page layout, as Document AI occasionally does."""
+
+    def process_document(self, request):
+        return documentai.ProcessResponse(document=documentai.Document(text="whole chunk text"))
+
+
+class DictCache(dict):
+    def set(self, key, value):
+        self[key] = value
+
+
+def test_revision_only_sends_changed_pages_to_ocr():
+    config, cache = PipelineConfig.from_env(), ResultCache(max_bytes=1024 * 1024, ttl=60)
+    original = make_pdf([image_page()] * 4, images=["a", "b", "c", "d"])
+    revised = make_pdf([text_page()] + [image_page()] * 4, images=["", "a", "b", "x", "d"])
+
+    docai = CountingDocAI()
+    first = smart_pdf_agent(original, "v1.pdf", docai, config, page_cache=cache)
+    assert docai.pages_sent == 4
+
+    docai = CountingDocAI()
+    second = smart_pdf_agent(revised, "v2.pdf", docai, config, page_cache=cache)
+    assert docai.pages_sent == 1  # Only the changed scan; the text page is read locally.
+    assert second.count("Page ") == 4 and first.count("Page ") == 4
+
+
+def test_inexact_page_split_is_not_cached():
+    cache = DictCache()
+    text = smart_pdf_agent(make_pdf([image_page()] * 3), "scan.pdf", UnsplittableDocAI(), PipelineConfig.from_env(), page_cache=cache)
+    assert text == "whole chunk text"
+    assert not cache
+
+
+def test_page_fingerprint_ignores_stream_compression():
+    pages = [image_page(), text_page()]
+    plain, compressed = read_pages(make_pdf(pages)), read_pages(make_pdf(pages, compress=True))
+    assert compressed[0]["/Contents"].get_object().get("/Filter") == "/FlateDecode"
+    for a, b in zip(plain, compressed):
+        assert page_fingerprint(a) == page_fingerprint(b)
+    assert page_fingerprint(plain[0]) != page_fingerprint(plain[1])
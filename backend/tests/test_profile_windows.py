@@ -0,0 +1,57 @@
+from scripts.profiler_client import merge_window_profiles, plan_profile_windows, window_fragment
+
+TEXT = " ".join(f"Clause {i} binds the tenant to pay rent on time." for i in range(40))
+
+
+def _clause(window_text: str, phrase: str, **extra) -> dict:
+    start = window_text.index(phrase)
+    return {"category": "obligation", "text": phrase, "start": start, "end": start + len(phrase), **extra}
+
+
+def test_windows_overlap_end_on_spaces_and_cover_the_text():
+    windows = plan_profile_windows(TEXT, window_chars=400, overlap_chars=80)
+    assert len(windows) > 1
+    for offset, window in windows:
+        assert TEXT[offset:offset + len(window)] == window
+        assert len(window) <= 400
+    for (offset, window), (next_offset, _) in zip(windows, windows[1:]):
+        end = offset + len(window)
+        assert TEXT[end] == " "
+        assert next_offset < end
+    assert windows[-1][0] + len(windows[-1][1]) == len(TEXT)
+    assert plan_profile_windows("short", 400, 80) == [(0, "short")]
+
+
+def test_merge_rebases_offsets_and_drops_overlap_duplicates():
+    windows = plan_profile_windows(TEXT, window_chars=400, overlap_chars=80)
+    (first_offset, first), (second_offset, second) = windows[0], windows[1]
+    # A clause inside the overlap is reported by both windows.
+    overlap = TEXT[second_offset:first_offset + len(first)]
+    shared = next(f"Clause {i} binds" for i in range(40) if f"Clause {i} binds" in overlap)
+    profiles = [{"document_type": None, "clauses": [], "important_dates": [], "statutes_or_codes": []} for _ in windows]
+    profiles[0].update(document_type="lease", statutes_or_codes=["Civ. Code 1950"])
+    profiles[0]["clauses"] = [_clause(first, shared, confidence=0.6)]
+    profiles[1]["clauses"] = [_clause(second, shared, confidence=0.9)]
+    profiles[1]["statutes_or_codes"] = ["Civ. Code 1950", "Civ. Code 1942"]
+
+    merged = merge_window_profiles(windows, profiles)
+
+    assert merged["document_type"] == "lease"
+    assert merged["statutes_or_codes"] == ["Civ. Code 1950", "Civ. Code 1942"]
+    assert len(merged["clauses"]) == 1
+    clause = merged["clauses"][0]
+    assert TEXT[clause["start"]:clause["end"]] == shared
+
+
+def test_fragments_split_the_overlap_between_windows():
+    windows = plan_profile_windows(TEXT, window_chars=400, overlap_chars=80)
+    (first_offset, first), (second_offset, second) = windows[0], windows[1]
+    overlap = TEXT[second_offset:first_offset + len(first)]
+    phrase = next(f"Clause {i} binds" for i in range(40) if f"Clause {i} binds" in overlap)
+    profiles = [
+        {"clauses": [_clause(first, phrase)], "important_dates": []},
+        {"clauses": [_clause(second, phrase)], "important_dates": []},
+    ]
+    owners = [len(window_fragment(windows, k, profiles[k])["clauses"]) for k in range(2)]
+    # Exactly one of the two windows owns a finding from their overlap.
+    assert sorted(owners) == [0, 1]
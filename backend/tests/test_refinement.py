@@ -0,0 +1,33 @@
+from scripts.refinement import refine_date, robust_parse_date
+
+STATUTE_AND_DEADLINE = "Under the Code on Wages, 2019, returns are due by 31 July 2025."
+
+
+def test_statute_year_does_not_override_the_deadline():
+    for item in (
+        {"text": "31 July 2025", "evidence": STATUTE_AND_DEADLINE},
+        {"text": "31 July 2025", "iso": "2025-07-31", "evidence": STATUTE_AND_DEADLINE},
+        {"text": "2019", "iso": "2025-07-31", "evidence": STATUTE_AND_DEADLINE},
+    ):
+        refined = refine_date(item)
+        assert refined["iso"] == "2025-07-31"
+        assert refined["role"] == "FILING_DEADLINE"
+
+
+def test_bare_year_alone_is_not_a_date():
+    assert refine_date({"text": "1948", "evidence": "as defined in the Factories Act 1948"})["iso"] is None
+
+
+def test_spans_without_a_year_fall_back_to_the_evidence_date():
+    for text in ("clause 4", "within 30 days", "Q1", "Day 1"):
+        assert refine_date({"text": text, "evidence": STATUTE_AND_DEADLINE})["iso"] == "2025-07-31"
+
+
+def test_profiler_iso_comes_before_the_text():
+    assert refine_date({"text": "clause 4", "iso": "2024-03-12", "evidence": ""})["iso"] == "2024-03-12"
+
+
+def test_unhashable_text_is_not_a_date():
+    assert robust_parse_date(["31 July 2025"]) is None
+    assert robust_parse_date({"text": "31 July 2025"}) is None
+    assert refine_date({"text": ["31 July 2025"], "evidence": STATUTE_AND_DEADLINE})["iso"] == "2025-07-31"
@@ -0,0 +1,15 @@
+from dataclasses import replace
+
+from scripts.extract_and_translate_pipeline import PipelineConfig
+from scripts.result_cache import config_fingerprint, stage_config
+
+
+def test_concurrency_and_retry_settings_do_not_change_stage_keys():
+    config = PipelineConfig.from_env()
+    tuned = replace(config, max_concurrent_chunks=16, chunk_max_retries=5, max_concurrent_translations=1, max_pdf_pages_per_chunk=5)
+    for stage in ("extraction", "translation"):
+        assert config_fingerprint(stage_config(config, stage)) == config_fingerprint(stage_config(tuned, stage))
+
+    other_model = replace(config, translation_model_name="another-model")
+    assert stage_config(config, "extraction") == stage_config(other_model, "extraction")
+    assert stage_config(config, "translation") != stage_config(other_model, "translation")
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+from scripts.stage_executor import StageExecutor
+
+
+def test_blocking_stages_leave_the_event_loop_free():
+    async def scenario():
+        executor = StageExecutor(max_workers=4)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        clock = asyncio.create_task(ticker())
+        try:
+            await executor.run("extraction", time.sleep, 0.3)
+        finally:
+            clock.cancel()
+            executor.shutdown()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+
+
+def test_stage_limit_bounds_concurrency():
+    running = peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    async def scenario():
+        executor = StageExecutor(max_workers=8, stage_limits={"translation": 2})
+        try:
+            await asyncio.gather(*(executor.run("translation", work) for _ in range(6)))
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
+    assert peak == 2
+
+
+def test_cancelling_the_caller_signals_the_worker():
+    stopped = threading.Event()
+
+    def work(cancel_event=None):
+        while not cancel_event.wait(0.01):
+            pass
+        stopped.set()
+
+    async def scenario():
+        executor = StageExecutor(max_workers=2)
+        cancel_event = threading.Event()
+        task = asyncio.create_task(executor.run("extraction", work, cancel_event=cancel_event))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        executor.shutdown()
+        return cancel_event
+
+    assert asyncio.run(scenario()).is_set()
+    assert stopped.wait(1)
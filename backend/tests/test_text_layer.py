@@ -0,0 +1,38 @@
+from pdf_helpers import TEXT, image_page, inline_image_page, make_pdf, read_pages, text_page, vector_page
+from scripts.extract_and_translate_pipeline import PipelineConfig, read_text_layer
+
+
+def _classify(content: bytes):
+    return read_text_layer(read_pages(make_pdf([content]))[0], PipelineConfig.from_env())
+
+
+def test_born_digital_page_is_read_locally():
+    assert TEXT in _classify(text_page())
+
+
+def test_blank_page_needs_no_ocr():
+    assert _classify(b"") == ""
+
+
+def test_scanned_pages_go_to_ocr():
+    assert _classify(image_page()) is None
+    assert _classify(inline_image_page()) is None
+
+
+def test_page_that_draws_but_has_no_text_goes_to_ocr():
+    assert _classify(vector_page()) is None
+
+
+def test_mixed_document_keeps_page_order_and_ocrs_only_scans():
+    from benchmarks.fakes import FakeBackend, FakeDocumentProcessorServiceClient
+    from scripts.extract_and_translate_pipeline import smart_pdf_agent
+
+    pdf = make_pdf([text_page(TEXT + " One"), image_page(), text_page(TEXT + " Three"), inline_image_page()])
+    docai = FakeDocumentProcessorServiceClient(FakeBackend(latency=0, jitter=0), chars_per_page=60)
+    text = smart_pdf_agent(pdf, "mixed.pdf", docai, PipelineConfig.from_env())
+
+    one, three = text.index(TEXT + " One"), text.index(TEXT + " Three")
+    ocr_pages = [i for i in range(len(text)) if text.startswith("Page ", i)]
+    assert len(ocr_pages) == 2
+    assert one < ocr_pages[0] < three < ocr_pages[1]
+    assert docai.calls == 1
@@ -0,0 +1,54 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from pdf_helpers import TEXT, make_pdf, text_page
+from scripts.extract_and_translate_pipeline import PipelineConfig
+from scripts.uploads import UploadTooLargeError, extract_upload, spool_upload
+
+
+class CountingFile(io.BytesIO):
+    """Remembers the largest read, to show the upload is never read whole."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.largest_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.largest_read = max(self.largest_read, len(chunk))
+        return chunk
+
+
+def test_upload_is_spooled_in_chunks_and_hashed(tmp_path):
+    data = os.urandom(300_000)
+    source = CountingFile(data)
+    spooled = asyncio.run(spool_upload(UploadFile(source, filename="a.pdf"), max_bytes=10**6, spool_dir=tmp_path, chunk_size=64 * 1024))
+    try:
+        assert source.largest_read <= 64 * 1024
+        assert spooled.size == len(data) and spooled.sha256 == hashlib.sha256(data).hexdigest()
+        with spooled.mapped() as content:
+            assert content[:] == data
+    finally:
+        spooled.cleanup()
+    assert not os.listdir(tmp_path)
+
+
+def test_oversized_upload_is_rejected_and_removed(tmp_path):
+    upload = UploadFile(io.BytesIO(b"x" * 5000), filename="big.pdf")
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(spool_upload(upload, max_bytes=4096, spool_dir=tmp_path, chunk_size=1024))
+    assert not os.listdir(tmp_path)
+
+
+def test_extraction_reads_the_memory_mapped_spool(tmp_path):
+    pdf = make_pdf([text_page()])
+    spooled = asyncio.run(spool_upload(UploadFile(io.BytesIO(pdf), filename="notice.pdf"), max_bytes=10**6, spool_dir=tmp_path))
+    try:
+        assert TEXT in extract_upload(spooled, docai_client=None, config=PipelineConfig.from_env())
+    finally:
+        spooled.cleanup()
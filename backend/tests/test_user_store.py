@@ -0,0 +1,133 @@
+import asyncio
+import itertools
+
+import pytest
+from google.api_core.exceptions import AlreadyExists
+
+from firestore_db import EmailAlreadyRegisteredError, UserStore, email_key
+
+_ids = itertools.count()
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _Document:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+    async def get(self):
+        return _Snapshot(self.id, self.collection.docs.get(self.id))
+
+    async def set(self, data):
+        self.collection.docs[self.id] = dict(data)
+
+    async def update(self, fields):
+        self.collection.docs[self.id].update(fields)
+
+    async def create(self, data):
+        if self.id in self.collection.docs:
+            raise AlreadyExists(self.id)
+        self.collection.docs[self.id] = dict(data)
+
+
+class _Query:
+    def __init__(self, collection, field=None, value=None):
+        self.collection, self.field, self.value = collection, field, value
+
+    def limit(self, _):
+        return self
+
+    async def stream(self):
+        for doc_id, data in list(self.collection.docs.items()):
+            if self.field is None or data.get(self.field) == self.value:
+                yield _Snapshot(doc_id, data)
+
+
+class _Collection:
+    def __init__(self):
+        self.docs = {}
+
+    def document(self, doc_id=None):
+        return _Document(self, doc_id or f"user-{next(_ids)}")
+
+    def where(self, field, op, value):
+        return _Query(self, field, value)
+
+    def stream(self):
+        return _Query(self).stream()
+
+
+class _Batch:
+    def __init__(self):
+        self.writes = []
+
+    def create(self, ref, data):
+        self.writes.append((ref, data))
+
+    async def commit(self):
+        if any(ref.id in ref.collection.docs for ref, _ in self.writes):
+            raise AlreadyExists("document exists")
+        for ref, data in self.writes:
+            ref.collection.docs[ref.id] = dict(data)
+
+
+class FakeFirestore:
+    """Just enough of the async Firestore client for UserStore."""
+
+    def __init__(self):
+        self.collections = {}
+
+    def collection(self, name):
+        return self.collections.setdefault(name, _Collection())
+
+    def batch(self):
+        return _Batch()
+
+
+def test_legacy_user_without_index_entry_cannot_reregister():
+    async def scenario():
+        db = FakeFirestore()
+        # Created before the email index existed.
+        db.collection("users").docs["legacy"] = {"email": "old@example.com", "password": "x"}
+        store = UserStore(db)
+
+        with pytest.raises(EmailAlreadyRegisteredError):
+            await store.create({"email": "old@example.com"}, email="old@example.com")
+        assert email_key("old@example.com") in db.collection("user_emails").docs
+        assert await store.create({"email": "new@example.com"}, email="new@example.com")
+
+        # After the backfill, the index alone catches duplicates.
+        db.collection("users").docs["legacy-2"] = {"email": "older@example.com"}
+        assert await store.backfill_email_index() == 3
+        assert await store.backfill_email_index() == 0
+        with pytest.raises(EmailAlreadyRegisteredError):
+            await store.create({"email": "older@example.com"}, email="older@example.com")
+
+    asyncio.run(scenario())
+
+
+def test_update_invalidates_the_cached_user():
+    async def scenario():
+        db = FakeFirestore()
+        db.collection("users").docs["u1"] = {"username": "Old Name", "profile_pic": "old.png"}
+        store = UserStore(db)
+
+        assert (await store.get("u1"))["username"] == "Old Name"
+        db.collection("users").docs["u1"]["profile_pic"] = "changed-elsewhere.png"
+        assert (await store.get("u1"))["profile_pic"] == "old.png"  # Served from the cache.
+
+        await store.update("u1", {"username": "New Name"})
+        user = await store.get("u1")
+        assert user["username"] == "New Name"
+        assert user["profile_pic"] == "changed-elsewhere.png"
+
+    asyncio.run(scenario())
@@ -30,6 +30,19 @@ const UploadDoc = ({
     "Process complete!": { stepId: 4, message: "Document processing completed!" },
   };
 
+  // Maps backend pipeline stages (sent with "progress" events) to frontend pipeline steps
+  const stageToStepId = { extraction: 1, translation: 2, profiling: 3 };
+
+  const updateStepProgress = (stage, progress, message) => {
+    const stepId = stageToStepId[stage];
+    if (!stepId) return;
+    setProcessingSteps(steps =>
+      steps.map(step =>
+        step.id === stepId ? { ...step, status: "processing", currentMessage: message, progress } : step
+      )
+    );
+  };
+
   const updateProcessingState = (statusMessage, additionalData = null) => {
     const mappedStatus = statusToStepMap[statusMessage];
     if (!mappedStatus) {
@@ -58,10 +71,10 @@ const UploadDoc = ({
     );
   };
 
-  const processFile = async (file) => {
-    const fileId = Date.now() + Math.random();
-    const newFileEntry = {
-      id: fileId,
+  const processFiles = async (files) => {
+    const batchId = Date.now();
+    const entries = files.map((file, index) => ({
+      id: `${batchId}-${index}`,
       name: file.name,
       size: file.size,
       type: file.type,
@@ -69,12 +82,17 @@ const UploadDoc = ({
       status: "Processing: Starting...",
       profile: null,
       processingDetails: []
+    }));
+    // The server tags every event with the file's position in the upload ("file-<index>").
+    const entryIdFor = (serverFileId) => {
+      const index = Number(String(serverFileId || "").replace("file-", ""));
+      return entries[index]?.id;
     };
     
-    setUploadedFiles((prev) => [newFileEntry, ...prev]);
-    setCurrentProcessingFile(newFileEntry);
+    setUploadedFiles((prev) => [...entries, ...prev]);
+    setCurrentProcessingFile(entries[0]);
     
-    // Show and reset sidebar for each new file
+    // Show and reset sidebar for each new upload
     setShowProcessingSidebar(true);
     setProcessingSteps(steps => steps.map(step => ({ 
       ...step, 
@@ -83,16 +101,20 @@ const UploadDoc = ({
       progress: null
     })));
 
-    const updateFileState = (newStatus, data = null) => {
+    const updateFileState = (entryId, newStatus, data = null) => {
       setUploadedFiles((prev) =>
         prev.map((f) => {
-          if (f.id === fileId) {
+          if (entryId === null ? entries.some(e => e.id === f.id && (!f.profile || f.partial)) : f.id === entryId) {
             const updatedFile = { 
               ...f, 
               status: newStatus,
               lastUpdated: new Date()
             };
-            if (data?.profile) updatedFile.profile = data.profile;
+            if (data?.profile) {
+              updatedFile.profile = data.profile;
+              updatedFile.partial = !!data.partial;
+            }
+            if (data?.translation !== undefined) updatedFile.translation = data.translation;
             if (data?.error) updatedFile.status = `Failed: ${data.error}`;
             if (data?.processingDetail) {
               updatedFile.processingDetails = [...(f.processingDetails || []), {
@@ -110,8 +132,9 @@ const UploadDoc = ({
 
     try {
       const formData = new FormData();
-      formData.append("files", file);
+      files.forEach(file => formData.append("files", file));
 
+      // All files are queued as one background job; progress is read from its event stream.
       const response = await fetch(
         `${import.meta.env.VITE_API_URL}/api/upload_and_stream`,
         {
@@ -120,78 +143,126 @@ const UploadDoc = ({
         }
       );
 
-      if (!response.ok || !response.body) {
+      if (!response.ok) {
         throw new Error(`Server error: ${response.statusText}`);
       }
+      const { events_url } = await response.json();
 
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
-      let buffer = "";
+      // Reconnects send Last-Event-ID so the server resumes where the dropped stream stopped.
+      let lastEventId = null;
+      let jobError = null;
+      // Translated text per file as it streams in, one slot per translated section.
+      const translations = {};
+      for (let attempt = 0; attempt < 5 && !jobError; attempt++) {
+        const eventsResponse = await fetch(`${import.meta.env.VITE_API_URL}${events_url}`, {
+          headers: lastEventId ? { "Last-Event-ID": lastEventId } : {},
+        });
+        if (!eventsResponse.ok || !eventsResponse.body) {
+          throw new Error(`Server error: ${eventsResponse.statusText}`);
+        }
 
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
+        const reader = eventsResponse.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
 
-        buffer += decoder.decode(value, { stream: true });
-        let boundary;
-        
-        while ((boundary = buffer.indexOf("\n\n")) >= 0) {
-          const message = buffer.slice(0, boundary);
-          buffer = buffer.slice(boundary + 2);
+        try {
+          while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
 
-          let eventType = "message";
-          let eventData = "";
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            
+            while ((boundary = buffer.indexOf("\n\n")) >= 0) {
+              const message = buffer.slice(0, boundary);
+              buffer = buffer.slice(boundary + 2);
 
-          message.split("\n").forEach(line => {
-            if (line.startsWith("event:")) eventType = line.replace("event:", "").trim();
-            else if (line.startsWith("data:")) eventData = line.replace("data:", "").trim();
-          });
+              let eventType = "message";
+              let eventData = "";
 
-          if (eventData) {
-            try {
-              const data = JSON.parse(eventData);
-              
-              if (eventType === "message") {
-                const statusText = `Processing: ${data.status}`;
-                updateFileState(statusText, { 
-                  processingDetail: data.status,
-                  type: 'processing'
-                });
-                updateProcessingState(data.status, data);
-                
-              } else if (eventType === "progress") {
-                // Handle progress updates
-                updateFileState(`Processing: ${data.message}`, {
-                  processingDetail: `${data.message} (${data.progress}%)`,
-                  type: 'progress'
-                });
-                
-              } else if (eventType === "final_result") {
-                updateFileState("Completed", { 
-                  profile: data,
-                  processingDetail: "Document analysis completed successfully",
-                  type: 'success'
-                });
-                setProcessingSteps(steps => steps.map(s => ({
-                  ...s, 
-                  status: 'completed',
-                  currentMessage: s.id === 4 ? "Analysis report ready!" : null
-                })));
-                reader.cancel();
-                return;
-                
-              } else if (eventType === "error") {
-                throw new Error(data.error);
+              message.split("\n").forEach(line => {
+                if (line.startsWith("id:")) lastEventId = line.replace("id:", "").trim();
+                else if (line.startsWith("event:")) eventType = line.replace("event:", "").trim();
+                else if (line.startsWith("data:")) eventData = line.replace("data:", "").trim();
+              });
+
+              if (eventData) {
+                try {
+                  const data = JSON.parse(eventData);
+                  const entryId = entryIdFor(data.file_id);
+                  
+                  if (eventType === "message") {
+                    const statusText = `Processing: ${data.status}`;
+                    updateFileState(entryId, statusText, { 
+                      processingDetail: data.status,
+                      type: 'processing'
+                    });
+                    updateProcessingState(data.status, data);
+                    
+                  } else if (eventType === "progress") {
+                    // Handle progress updates
+                    updateFileState(entryId, `Processing: ${data.message}`, {
+                      processingDetail: `${data.message} (${data.progress}%)`,
+                      type: 'progress'
+                    });
+                    updateStepProgress(data.stage, data.progress, data.message);
+                    
+                  } else if (eventType === "translation_delta") {
+                    const pieces = (translations[data.file_id] ||= []);
+                    pieces[data.piece] = (pieces[data.piece] || "") + data.delta;
+                    const translation = pieces.filter(Boolean).map(p => p.trim()).join("\n\n");
+                    updateFileState(entryId, `Processing: Translating (${translation.length} characters so far)`, { translation });
+
+                  } else if (eventType === "partial_result") {
+                    // Preview refined from the profiler windows finished so far.
+                    updateFileState(entryId, "Processing: Partial results ready", {
+                      profile: data.profile,
+                      partial: true,
+                      processingDetail: `Partial results from ${data.fragments} section(s)`,
+                      type: 'progress'
+                    });
+
+                  } else if (eventType === "file_result") {
+                    updateFileState(entryId, "Completed", { 
+                      profile: data.result,
+                      processingDetail: "Document analysis completed successfully",
+                      type: 'success'
+                    });
+
+                  } else if (eventType === "file_error") {
+                    updateFileState(entryId, "Failed", {
+                      error: data.error,
+                      processingDetail: `Error: ${data.error}`,
+                      type: 'error'
+                    });
+
+                  } else if (eventType === "final_result") {
+                    setProcessingSteps(steps => steps.map(s => ({
+                      ...s, 
+                      status: 'completed',
+                      currentMessage: s.id === 4 ? "Analysis report ready!" : null
+                    })));
+                    reader.cancel();
+                    return;
+                    
+                  } else if (eventType === "error") {
+                    jobError = data.error;
+                  }
+                } catch (parseError) {
+                  console.error("Error parsing event data:", parseError);
+                }
               }
-            } catch (parseError) {
-              console.error("Error parsing event data:", parseError);
             }
           }
+        } catch (streamError) {
+          console.warn("Event stream interrupted, resuming...", streamError);
         }
       }
+      throw new Error(jobError || "Lost connection to the processing job.");
     } catch (error) {
-      console.error(`Processing failed for ${file.name}:`, error);
-      updateFileState("Failed", { 
+      console.error(`Processing failed for ${files.map(f => f.name).join(", ")}:`, error);
+      // Files that already have a result keep it; the rest are marked failed.
+      updateFileState(null, "Failed", { 
         error: error.message,
         processingDetail: `Error: ${error.message}`,
         type: 'error'
@@ -213,10 +284,8 @@ const UploadDoc = ({
     });
 
     if (validFiles.length > 0) {
-      // Process files one by one to show the pipeline for each
-      for (const file of validFiles) {
-        await processFile(file);
-      }
+      // Every file goes up in one request; the server processes them concurrently.
+      await processFiles(validFiles);
     }
   };
 